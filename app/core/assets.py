@@ -0,0 +1,181 @@
+# app/core/assets.py
+"""
+Static asset pipeline: content-hash nomlar + oldindan siqilgan variantlar.
+
+build_assets() (startupda yoki `python -m app.core.assets`) app/static ichidagi
+har bir faylni STATIC_BUILD_DIR ga `style.<hash>.css` ko'rinishida yozadi,
+matnli fayllar uchun `.gz` va (brotli o'rnatilgan bo'lsa) `.br` ham.
+
+- shablonlarda: {{ static_url('css/style.css') }} -> /static/css/style.<hash>.css
+- AssetStaticFiles: hashed fayl so'ralsa Accept-Encoding bo'yicha .br/.gz
+  variantini `Cache-Control: immutable` bilan beradi; qolganlari - oddiy StaticFiles.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Tuple
+
+import anyio
+from fastapi.staticfiles import StaticFiles
+from starlette.staticfiles import NotModifiedResponse
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.types import Scope
+
+from app.core import config
+
+try:  # ixtiyoriy: bo'lmasa faqat .gz yoziladi
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"  # app/static
+BUILD_DIR = Path(config.STATIC_BUILD_DIR or STATIC_DIR.parent / "static_build").resolve()
+
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".html", ".map"}
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@dataclass
+class AssetManifest:
+    # "css/style.css" -> "css/style.3f9a1c2b7d.css"
+    files: Dict[str, str] = field(default_factory=dict)
+    # "css/style.3f9a1c2b7d.css" -> ("br", "gzip")
+    encodings: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+
+
+manifest = AssetManifest()
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _hashed_name(rel: Path, data: bytes) -> Path:
+    digest = hashlib.sha256(data).hexdigest()[:10]
+    return rel.with_name(f"{rel.stem}.{digest}{rel.suffix}")
+
+
+def build_assets(src: Path = STATIC_DIR, out: Path = BUILD_DIR) -> AssetManifest:
+    """
+    src ichidagi fayllarni fingerprint qilib out ga yozadi, manifestni yangilaydi.
+    Idempotent: fayl allaqachon bor bo'lsa qayta yozilmaydi.
+    """
+    files: Dict[str, str] = {}
+    encodings: Dict[str, Tuple[str, ...]] = {}
+
+    for path in sorted(p for p in src.rglob("*") if p.is_file()):
+        data = path.read_bytes()
+        if not data:
+            continue
+
+        rel = path.relative_to(src)
+        hashed = _hashed_name(rel, data)
+        target = out / hashed
+        if not target.exists():
+            _write_atomic(target, data)
+
+        found = []
+        if rel.suffix in COMPRESSIBLE:
+            variants = [("br", ".br", brotli.compress if brotli else None),
+                        ("gzip", ".gz", lambda d: gzip.compress(d, 9, mtime=0))]
+            for encoding, ext, compress in variants:
+                if compress is None:
+                    continue
+                variant = target.with_name(target.name + ext)
+                if not variant.exists():
+                    packed = compress(data)
+                    if len(packed) >= len(data):
+                        continue
+                    _write_atomic(variant, packed)
+                found.append(encoding)
+
+        files[rel.as_posix()] = hashed.as_posix()
+        encodings[hashed.as_posix()] = tuple(found)
+
+    _write_atomic(out / "manifest.json", json.dumps(files, indent=2, sort_keys=True).encode("utf-8"))
+
+    manifest.files = files
+    manifest.encodings = encodings
+    return manifest
+
+
+def static_url(name: str) -> str:
+    """Shablon helperi: hashed URL (build qilinmagan bo'lsa - oddiy /static/...)."""
+    return "/static/" + manifest.files.get(name, name)
+
+
+def _pick_encoding(accept_encoding: str, available: Tuple[str, ...]) -> str | None:
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        params = params.strip()
+        try:
+            q = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            q = 0.0
+        if q > 0:
+            accepted.add(name.strip().lower())
+    for encoding in available:  # br afzal
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+class AssetStaticFiles(StaticFiles):
+    """StaticFiles + fingerprint qilingan fayllar uchun immutable cache va .br/.gz."""
+
+    def __init__(self, *, directory: str, build_directory: str | os.PathLike = BUILD_DIR, **kwargs) -> None:
+        super().__init__(directory=directory, **kwargs)
+        self.build_directory = Path(build_directory)
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        rel = Path(path).as_posix()
+        available = manifest.encodings.get(rel)
+        if available is None or scope["method"] not in ("GET", "HEAD"):
+            return await super().get_response(path, scope)
+
+        request_headers = Headers(scope=scope)
+        encoding = _pick_encoding(request_headers.get("accept-encoding", ""), available)
+        full_path = self.build_directory / rel
+        if encoding:
+            full_path = full_path.with_name(full_path.name + (".br" if encoding == "br" else ".gz"))
+
+        try:
+            stat_result = await anyio.to_thread.run_sync(os.stat, full_path)
+        except FileNotFoundError:
+            return await super().get_response(path, scope)
+
+        headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL}
+        if available:
+            headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            headers["Content-Encoding"] = encoding
+
+        response = FileResponse(
+            full_path,
+            stat_result=stat_result,
+            media_type=mimetypes.guess_type(rel)[0],
+            headers=headers,
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+if __name__ == "__main__":
+    m = build_assets()
+    for src_name, hashed in sorted(m.files.items()):
+        print(f"{src_name} -> {hashed} {m.encodings[hashed]}")
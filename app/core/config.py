@@ -0,0 +1,106 @@
+# app/core/config.py
+import os
+
+# Invite tokenlarini HMAC bilan imzolash uchun kalit.
+# Bo'sh bo'lsa - eski format (tasodifiy token, DB index orqali qidiriladi).
+INVITE_TOKEN_SECRET = os.getenv("INVITE_TOKEN_SECRET", "")
+
+# Deploy versiyasi: ETag'lar shablon/kod o'zgarganda ham yangilanishi uchun
+APP_VERSION = os.getenv("APP_VERSION") or os.getenv("RENDER_GIT_COMMIT", "dev")
+
+# finished invite sahifalari/JSON uchun Cache-Control max-age (soniya)
+FINISHED_CACHE_MAX_AGE = int(os.getenv("FINISHED_CACHE_MAX_AGE", "86400"))
+
+# Jinja2 bytecode cache papkasi (bo'sh bo'lsa - tizim temp papkasi)
+JINJA_BYTECODE_CACHE_DIR = os.getenv("JINJA_BYTECODE_CACHE_DIR") or None
+
+# DEV: shablon fayli o'zgarsa qayta o'qish (har renderda stat). PRODda o'chiq.
+TEMPLATES_AUTO_RELOAD = os.getenv("TEMPLATES_AUTO_RELOAD", "0") == "1"
+
+# DEV: javoblarga X-DB-Queries / Server-Timing header'lari (app/db/query_stats.py)
+DEBUG = os.getenv("DEBUG", "0") == "1"
+# shundan sekin SQL statement log'ga yoziladi (ms)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# bitta so'rovda bir xil statement shakli shuncha marta takrorlansa - N+1 ogohlantirish
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+# Fingerprint qilingan (style.<hash>.css) va siqilgan (.gz/.br) static fayllar papkasi
+# (bo'sh bo'lsa - app/static_build)
+STATIC_BUILD_DIR = os.getenv("STATIC_BUILD_DIR") or None
+
+# ---- Worker'lar va DB pool (app/db/database.py: pool_options) ----
+# gunicorn post_fork haqiqiy worker sonini yozadi (-w/--workers, TTIN/TTOU ham hisobga olinadi)
+APP_WORKERS = max(1, int(os.getenv("APP_WORKERS", "1")))
+# host bo'yicha JAMI ulanishlar byudjeti (PostgreSQL max_connections ulushi):
+# barcha worker'lar x har worker'dagi barcha engine'lar (sync + async, SQLite'da + reader'lar).
+# 1 worker, 2 engine: har engine 5 + 10 (SQLAlchemy default)
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "30"))
+# berilsa - HAR ENGINE uchun qat'iy qiymat (byudjet hisoblanmaydi)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE") or 0) or None
+DB_MAX_OVERFLOW = int(os.environ["DB_MAX_OVERFLOW"]) if os.getenv("DB_MAX_OVERFLOW") else None
+
+# ---- SQLite production rejimi (app/db/sqlite.py) ----
+# WAL + pragmalar, bitta writer ulanishi + reader pool (fayl SQLite bo'lsa)
+SQLITE_PRODUCTION = os.getenv("SQLITE_PRODUCTION", "1") == "1"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# manfiy - KiB (-65536 = 64 MiB), musbat - sahifalar soni
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+# writer ulanishini kutish chegarasi (soniya)
+SQLITE_WRITER_TIMEOUT = float(os.getenv("SQLITE_WRITER_TIMEOUT", "30"))
+
+# /api/stats uchun kalit (?key=...). Bo'sh bo'lsa - endpoint ochiq.
+STATS_TOKEN = os.getenv("STATS_TOKEN", "")
+
+# /metrics uchun Bearer token (Prometheus: authorization.credentials). Bo'sh bo'lsa - ochiq.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# ---- Retention (app/services/retention_service.py) ----
+# created (ochilmagan) invite shuncha kundan keyin expired bo'ladi
+INVITE_TTL_DAYS = int(os.getenv("INVITE_TTL_DAYS", "14"))
+# expired invite yana shuncha kundan keyin o'chiriladi
+EXPIRED_RETENTION_DAYS = int(os.getenv("EXPIRED_RETENTION_DAYS", "30"))
+# finished invite shuncha kundan keyin gzip NDJSON arxivga ko'chiriladi (0 - o'chiq)
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./archive")
+# bitta tranzaksiyada nechta invite (SQLite yozish lock'i qisqa bo'lsin)
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+# fon vazifasi oralig'i, soniya (0 - o'chiq; cron: python -m app.services.retention_service)
+RETENTION_INTERVAL = int(os.getenv("RETENTION_INTERVAL", "3600"))
+
+# ---- To'lovlar (app/services/payment_service.py) ----
+PAYMENT_AMOUNT = int(os.getenv("PAYMENT_AMOUNT", "14999"))
+# provider HTTP API: umumiy (pool) ulanishlar soni va timeout'lar (soniya)
+PAYMENT_POOL_SIZE = int(os.getenv("PAYMENT_POOL_SIZE", "20"))
+PAYMENT_CONNECT_TIMEOUT = float(os.getenv("PAYMENT_CONNECT_TIMEOUT", "3"))
+PAYMENT_TIMEOUT = float(os.getenv("PAYMENT_TIMEOUT", "10"))
+# demo provider: to'lovsiz darhol "paid" - faqat lokal/dev uchun, prod'da o'chiq
+PAYMENT_DEMO_ENABLED = os.getenv("PAYMENT_DEMO_ENABLED", "0") == "1"
+# provider yoqilgan bo'lishi uchun API_URL kerak; SECRET - so'rov/webhook HMAC imzosi
+PAYME_API_URL = os.getenv("PAYME_API_URL", "")
+PAYME_MERCHANT_ID = os.getenv("PAYME_MERCHANT_ID", "")
+PAYME_SECRET_KEY = os.getenv("PAYME_SECRET_KEY", "")
+CLICK_API_URL = os.getenv("CLICK_API_URL", "")
+CLICK_MERCHANT_ID = os.getenv("CLICK_MERCHANT_ID", "")
+CLICK_SECRET_KEY = os.getenv("CLICK_SECRET_KEY", "")
+
+# ---- Outbox worker (app/services/outbox_service.py) ----
+# bo'sh navbatni tekshirish oralig'i, soniya (0 - worker o'chiq)
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "2"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+# olingan hodisa shu vaqt ichida boshqa worker'ga berilmaydi
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "60"))
+# bajarilgan hodisalar shuncha kundan keyin o'chiriladi (retention_service)
+OUTBOX_RETENTION_DAYS = int(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+
+# ---- Telegram xabarnomalar (app/services/notification_service.py) ----
+# bo'sh bo'lsa - xabarnoma o'chiq
+TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+TELEGRAM_QUEUE_SIZE = int(os.getenv("TELEGRAM_QUEUE_SIZE", "1000"))
+TELEGRAM_BATCH_SIZE = int(os.getenv("TELEGRAM_BATCH_SIZE", "20"))
+# Bot API: ~30 xabar/soniya umumiy limit - biroz pastroq
+TELEGRAM_RATE = float(os.getenv("TELEGRAM_RATE", "25"))
+# xabardagi natija linki uchun
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "https://sevgi-testi-7jd2.onrender.com")
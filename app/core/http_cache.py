@@ -0,0 +1,82 @@
+# app/core/http_cache.py
+"""
+Token sahifalari va API uchun HTTP conditional caching (ETag / Last-Modified / 304).
+
+Validatorlar Invite.updated_at + status dan olinadi: invite o'zgarmagan bo'lsa
+shablon render qilinmaydi, faqat bo'sh 304 qaytadi.
+
+Last-Modified soniya aniqligida: bir soniya ichida ikki o'zgarish bir xil sanani beradi va
+If-Modified-Since yolg'on 304 qaytaradi. Shuning uchun Last-Modified faqat updated_at butun
+soniyada bo'lsa yuboriladi; aks holda faqat ETag ishlaydi.
+"""
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+from app.core import config
+from app.db.models import Invite, InviteStatus
+
+
+def _last_modified(inv: Invite) -> Optional[datetime]:
+    # updated_at naive UTC saqlanadi; HTTP sanasi uni aniq ifodalay olmasa - None
+    if inv.updated_at.microsecond:
+        return None
+    return inv.updated_at.replace(tzinfo=timezone.utc)
+
+
+def invite_etag(inv: Invite, variant: str) -> str:
+    raw = f"{variant}:{inv.id}:{inv.status.value}:{inv.updated_at.isoformat()}:{config.APP_VERSION}"
+    return 'W/"' + hashlib.blake2b(raw.encode("utf-8"), digest_size=10).hexdigest() + '"'
+
+
+def invite_cache_headers(inv: Invite, variant: str) -> Dict[str, str]:
+    """
+    variant - bir invite uchun turli javoblarni ajratadi ("result", "share", "api-result"...).
+    finished invite o'zgarmaydi -> uzoq muddatli cache.
+    """
+    if inv.status == InviteStatus.finished:
+        cache_control = f"private, max-age={config.FINISHED_CACHE_MAX_AGE}"
+    else:
+        cache_control = "private, no-cache"
+
+    headers = {"ETag": invite_etag(inv, variant), "Cache-Control": cache_control}
+    last_modified = _last_modified(inv)
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # weak comparison: W/ prefiksiga qaramaymiz
+    wanted = etag.removeprefix("W/")
+    return any(t.strip().removeprefix("W/") == wanted for t in header.split(","))
+
+
+def is_not_modified(request: Request, headers: Dict[str, str]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match bo'lsa, If-Modified-Since e'tiborga olinmaydi (RFC 9110)
+        return _etag_matches(if_none_match, headers["ETag"])
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and "Last-Modified" in headers:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return parsedate_to_datetime(headers["Last-Modified"]) <= since
+
+    return False
+
+
+def not_modified_response(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
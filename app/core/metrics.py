@@ -0,0 +1,309 @@
+# app/core/metrics.py
+"""
+Prometheus metrikalari: route shabloni bo'yicha latency, in-flight, status kodlar, DB pool.
+
+    http_request_duration_seconds{method, route}      histogram  (route = "/i/{token}", URL emas)
+    http_requests_total{method, route, status}        counter
+    http_requests_in_flight                           gauge
+    db_pool_checkout_seconds{engine}                  histogram  (pooldan ulanish olish kutishi)
+    db_pool_checked_out{engine}                       gauge      (scrape paytida o'qiladi)
+
+GET /metrics - Prometheus text format (METRICS_TOKEN bo'lsa: Authorization: Bearer <token>).
+
+Arzon yo'l: so'rovda faqat bir nechta ro'yxat/dict inkrementi. Qulf yo'q - har thread
+o'z "shard"iga yozadi (event loop bitta thread, sync engine esa threadpool'da),
+yig'ish va formatlash faqat /metrics so'ralganda. Har worker process o'z qiymatlarini
+beradi (Prometheus har target'ni alohida scrape qiladi).
+/metrics va /static so'rovlari umuman o'lchanmaydi.
+"""
+from __future__ import annotations
+
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+
+from app.core import config
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# shu prefikslar o'lchanmaydi
+SKIP_PREFIXES = ("/metrics", "/static")
+
+UNMATCHED = "<unmatched>"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Thread bo'yicha shard'lar: yozish qulfsiz, o'qish (scrape) shard'larni qo'shadi."""
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._local = threading.local()
+        self._shards: list[dict] = []
+        self._shards_lock = threading.Lock()  # faqat yangi thread birinchi marta yozganda
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _merged(self) -> dict[tuple, list]:
+        merged: dict[tuple, list] = {}
+        for shard in list(self._shards):
+            for key, row in list(shard.items()):
+                acc = merged.get(key)
+                if acc is None:
+                    merged[key] = list(row)
+                else:
+                    for i, v in enumerate(row):
+                        acc[i] += v
+        return merged
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+    def collect(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, *labels: str, n: float = 1) -> None:
+        shard = self._shard()
+        row = shard.get(labels)
+        if row is None:
+            shard[labels] = [n]
+        else:
+            row[0] += n
+
+    def collect(self) -> list[str]:
+        lines = self.header()
+        for key, (value,) in sorted(self._merged().items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_num(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """inc/dec bir xil thread'da bo'lishi kerak (masalan, event loop)."""
+
+    type = "gauge"
+
+    def dec(self, *labels: str, n: float = 1) -> None:
+        self.inc(*labels, n=-n)
+
+
+class CallbackGauge(_Metric):
+    """Qiymat faqat scrape paytida hisoblanadi: fn() -> {label_values: qiymat}."""
+
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames, fn: Callable[[], dict[tuple, float]]):
+        super().__init__(name, documentation, labelnames)
+        self.fn = fn
+
+    def collect(self) -> list[str]:
+        lines = self.header()
+        for key, value in sorted(self.fn().items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_num(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: tuple[float, ...] = HTTP_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._shard()
+        row = shard.get(labels)
+        if row is None:
+            # [bucket'lar..., +Inf, sum]
+            row = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        row[bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def collect(self) -> list[str]:
+        lines = self.header()
+        bounds = self.buckets + (float("inf"),)
+        for key, row in sorted(self._merged().items()):
+            cumulative = 0
+            for bound, count in zip(bounds, row):
+                cumulative += count
+                le = f'le="{_num(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_num(row[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+# ----------------------------
+# Registry
+# ----------------------------
+REGISTRY: list[_Metric] = []
+
+
+def register(metric: _Metric) -> _Metric:
+    REGISTRY.append(metric)
+    return metric
+
+
+REQUEST_DURATION = register(Histogram(
+    "http_request_duration_seconds", "HTTP so'rov davomiyligi (route shabloni bo'yicha)",
+    ("method", "route"), HTTP_BUCKETS,
+))
+REQUESTS_TOTAL = register(Counter(
+    "http_requests_total", "HTTP so'rovlar soni", ("method", "route", "status"),
+))
+IN_FLIGHT = register(Gauge(
+    "http_requests_in_flight", "Hozir bajarilayotgan HTTP so'rovlar",
+))
+POOL_CHECKOUT = register(Histogram(
+    "db_pool_checkout_seconds", "DB pooldan ulanish olish vaqti (yangi ulanish ochish ham kiradi)",
+    ("engine",), POOL_BUCKETS,
+))
+
+_engines: dict[str, object] = {}
+
+
+def _pool_checked_out() -> dict[tuple, float]:
+    out = {}
+    for name, engine in _engines.items():
+        checkedout = getattr(engine.pool, "checkedout", None)
+        if checkedout is not None:
+            out[(name,)] = checkedout()
+    return out
+
+
+POOL_CHECKED_OUT = register(CallbackGauge(
+    "db_pool_checked_out", "Hozir pooldan olingan ulanishlar", ("engine",), _pool_checked_out,
+))
+
+
+def render() -> str:
+    lines: list[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+# ----------------------------
+# DB pool
+# ----------------------------
+_timed_pool_classes: dict[tuple[type, str], type] = {}
+
+
+def _timed_pool_class(base: type, name: str) -> type:
+    cls = _timed_pool_classes.get((base, name))
+    if cls is None:
+        def _do_get(self):
+            t0 = time.perf_counter()
+            try:
+                return base._do_get(self)
+            finally:
+                POOL_CHECKOUT.observe(time.perf_counter() - t0, name)
+
+        cls = type(f"Timed{base.__name__}", (base,), {"_do_get": _do_get})
+        _timed_pool_classes[(base, name)] = cls
+    return cls
+
+
+def instrument_engine(engine, name: str) -> None:
+    """
+    Pool checkout vaqtini o'lchash. Pool klassi o'lchaydigan subklassga almashtiriladi -
+    engine.dispose() yangi pool'ni shu klass bilan yaratadi (fork'dan keyin ham ishlaydi).
+    AsyncEngine uchun engine.sync_engine beriladi.
+    """
+    pool = engine.pool
+    if type(pool) not in _timed_pool_classes.values():
+        pool.__class__ = _timed_pool_class(type(pool), name)
+    _engines[name] = engine
+
+
+# ----------------------------
+# ASGI middleware
+# ----------------------------
+class MetricsMiddleware:
+    def __init__(self, app, skip_prefixes: tuple[str, ...] = SKIP_PREFIXES):
+        self.app = app
+        self.skip_prefixes = skip_prefixes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.skip_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - t0
+            IN_FLIGHT.dec()
+            # router scope["route"] ni qo'yadi -> "/i/{token}"; topilmagan URL'lar bitta label
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED
+            method = scope["method"]
+            REQUEST_DURATION.observe(elapsed, method, route)
+            REQUESTS_TOTAL.inc(method, route, str(status))
+
+
+def _authorized(request: Request) -> bool:
+    if not config.METRICS_TOKEN:
+        return True
+    auth = request.headers.get("authorization", "")
+    return hmac.compare_digest(auth, f"Bearer {config.METRICS_TOKEN}")
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    if not _authorized(request):
+        return PlainTextResponse("forbidden\n", status_code=403)
+    return Response(render(), media_type=CONTENT_TYPE)
+
+
+def reset() -> None:
+    """Testlar uchun: yig'ilgan qiymatlarni tozalash."""
+    for metric in REGISTRY:
+        for shard in list(metric._shards):
+            shard.clear()
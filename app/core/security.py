@@ -0,0 +1,66 @@
+# app/core/security.py
+"""
+O'z-o'zini tasvirlaydigan (self-describing) invite tokenlar.
+
+Format: "{invite_id}.{nonce}.{signature}"
+- invite_id  - Invite.id (primary key)
+- nonce      - tasodifiy 8 belgi (id qayta ishlatilsa ham token boshqacha bo'ladi)
+- signature  - HMAC-SHA256(secret, "{invite_id}.{nonce}"), 16 bayt, base64url
+
+Imzo xotirada tekshiriladi: soxta/buzilgan token DBga umuman bormaydi,
+to'g'ri token esa db.get(Invite, id) bilan primary key orqali topiladi.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import re
+import secrets
+from typing import Optional
+
+from app.core import config
+
+
+SIGNED_TOKEN_RE = re.compile(r"^([1-9][0-9]{0,17})\.([A-Za-z0-9_-]{8})\.([A-Za-z0-9_-]{22})$")
+LEGACY_TOKEN_RE = re.compile(r"^[A-Za-z0-9_-]{1,80}$")
+
+
+def signing_enabled() -> bool:
+    return bool(config.INVITE_TOKEN_SECRET)
+
+
+def _signature(payload: str) -> str:
+    digest = hmac.new(
+        config.INVITE_TOKEN_SECRET.encode("utf-8"),
+        payload.encode("ascii"),
+        hashlib.sha256,
+    ).digest()[:16]
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+def sign_invite_token(invite_id: int) -> str:
+    payload = f"{int(invite_id)}.{secrets.token_urlsafe(6)}"
+    return f"{payload}.{_signature(payload)}"
+
+
+def is_signed_token(token: str) -> bool:
+    return SIGNED_TOKEN_RE.match(token) is not None
+
+
+def is_legacy_token(token: str) -> bool:
+    return LEGACY_TOKEN_RE.match(token) is not None
+
+
+def verify_invite_token(token: str) -> Optional[int]:
+    """
+    Imzo to'g'ri bo'lsa invite_id qaytaradi, aks holda None.
+    """
+    m = SIGNED_TOKEN_RE.match(token)
+    if not m or not signing_enabled():
+        return None
+
+    invite_id, nonce, sig = m.groups()
+    if not hmac.compare_digest(sig, _signature(f"{invite_id}.{nonce}")):
+        return None
+    return int(invite_id)
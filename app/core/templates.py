@@ -0,0 +1,48 @@
+# app/core/templates.py
+"""
+Barcha routerlar uchun bitta umumiy Jinja2 environment.
+
+- bitta template cache (har router o'zinikini qurmaydi)
+- FileSystemBytecodeCache: kompilyatsiya natijasi diskda, yangi worker parse qilmaydi
+- precompile_templates(): startupda hamma shablonni oldindan kompilyatsiya qiladi,
+  shunda deploy/cold startdan keyingi birinchi so'rov sekin bo'lmaydi
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+from app.core import config
+from app.core.assets import static_url
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"  # app/templates
+
+
+def _bytecode_cache() -> FileSystemBytecodeCache:
+    directory = config.JINJA_BYTECODE_CACHE_DIR
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return FileSystemBytecodeCache(directory)
+
+
+env = Environment(
+    loader=FileSystemLoader(str(TEMPLATES_DIR)),
+    autoescape=True,
+    auto_reload=config.TEMPLATES_AUTO_RELOAD,
+    bytecode_cache=_bytecode_cache(),
+)
+
+env.globals["static_url"] = static_url
+
+templates = Jinja2Templates(env=env)
+
+
+def precompile_templates() -> int:
+    """Hamma shablonni yuklab (parse + compile) cache'ga qo'yadi. Soni qaytadi."""
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    return len(names)
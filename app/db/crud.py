@@ -1,11 +1,17 @@
 from __future__ import annotations
 
-from datetime import datetime
+import hmac
+import json
+from datetime import date, datetime, timedelta
+from typing import Callable
+
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import func, select, update
 
+from app.core import security
 from app.db.models import (
-    Invite, Question, Answer, Payment,
+    Invite, Question, Answer, Payment, FunnelDaily, OutboxEvent,
     InviteStatus, PaymentStatus, PaymentProvider, AnswerChoice
 )
 
@@ -18,20 +24,33 @@ def create_invite(
     boy_zodiac: str,
     token: str,
     message: str | None = None,
+    sign_token: Callable[[int], str] | None = None,
+    telegram_chat_id: int | None = None,
 ) -> Invite:
     """
     User1 (yigit) taklif yaratadi.
     token router/service qatlamida generatsiya qilinadi (uuid/secrets).
+    sign_token berilsa: INSERTdan keyin (id ma'lum bo'lgach) token imzolangan
+    formatga almashtiriladi - hammasi bitta commit ichida.
+    Funnel rollup (created) ham shu commitda oshiriladi.
     """
+    now = datetime.utcnow()
     inv = Invite(
         boy_name=boy_name.strip(),
         boy_age=int(boy_age),
         boy_zodiac=boy_zodiac.strip(),
         token=token,
         message=message.strip() if message else None,
+        telegram_chat_id=telegram_chat_id,
         status=InviteStatus.created,
+        created_at=now,
+        updated_at=now,
     )
     db.add(inv)
+    if sign_token is not None:
+        db.flush()
+        inv.token = sign_token(inv.id)
+    bump_funnel(db, "created", now)
     db.commit()
     db.refresh(inv)
     return inv
@@ -42,22 +61,73 @@ def get_invite(db: Session, invite_id: int) -> Invite | None:
 
 
 def get_invite_by_token(db: Session, token: str) -> Invite | None:
+    """
+    Imzolangan token: imzo xotirada tekshiriladi -> primary key bo'yicha db.get.
+    Eski token: token index orqali qidiriladi.
+    Formatga mos kelmagan / soxta token DBga bormasdan None qaytaradi.
+    """
+    token = token.strip()
+
+    if security.is_signed_token(token) and security.signing_enabled():
+        invite_id = security.verify_invite_token(token)
+        if invite_id is None:
+            return None
+        inv = db.get(Invite, invite_id)
+        if inv is None or not hmac.compare_digest(inv.token, token):
+            return None
+        return inv
+
+    if not security.is_legacy_token(token) and not security.is_signed_token(token):
+        return None
+
     return (
         db.query(Invite)
-        .filter(Invite.token == token.strip())
+        .filter(Invite.token == token)
         .first()
     )
 
 
+def _update_invite_if(db: Session, inv: Invite, values: dict, *criteria) -> bool:
+    """
+    Shartli UPDATE (compare-and-set): UPDATE invites SET ... WHERE id=? AND <criteria> RETURNING id.
+    Qator o'zgarsa - qiymatlar sessiyadagi inv ga ham yoziladi (dirty emas, qayta UPDATE bo'lmaydi).
+    Sessiyadagi inv eskirgan bo'lsa ham shart DB dagi joriy qatorga qo'llanadi.
+    """
+    t = Invite.__table__
+    row = db.execute(
+        update(t).where(t.c.id == inv.id, *criteria).values(**values).returning(t.c.id)
+    ).first()
+    if row is None:
+        return False
+    for key, value in values.items():
+        set_committed_value(inv, key, value)
+    return True
+
+
+def apply_invite_opened(db: Session, inv: Invite, now: datetime | None = None) -> bool:
+    """
+    created/paid -> opened (shartli UPDATE + funnel rollup, commit qilmaydi).
+    O'zgarish bo'lsa True qaytaradi; parallel so'rov allaqachon ochgan/yakunlagan bo'lsa - False.
+    """
+    if inv.status not in (InviteStatus.created, InviteStatus.paid) or inv.opened_at is not None:
+        return False
+    now = now or datetime.utcnow()
+    t = Invite.__table__
+    changed = _update_invite_if(
+        db, inv, {"status": InviteStatus.opened, "opened_at": now, "updated_at": now},
+        t.c.status.in_((InviteStatus.created, InviteStatus.paid)), t.c.opened_at.is_(None),
+    )
+    if changed:
+        bump_funnel(db, "opened", now)
+    return changed
+
+
 def mark_invite_opened(db: Session, invite_id: int) -> Invite:
     inv = db.get(Invite, invite_id)
     if not inv:
         raise ValueError("Invite topilmadi")
 
-    if inv.status in (InviteStatus.created, InviteStatus.paid) and inv.opened_at is None:
-        inv.status = InviteStatus.opened
-        inv.opened_at = datetime.utcnow()
-        inv.updated_at = datetime.utcnow()
+    if apply_invite_opened(db, inv):
         db.commit()
         db.refresh(inv)
 
@@ -78,22 +148,51 @@ def set_girl_data_by_token(
     if not inv:
         raise ValueError("Invite topilmadi")
 
+    now = datetime.utcnow()
     inv.girl_name = girl_name.strip()
     inv.girl_age = int(girl_age)
     inv.girl_zodiac = girl_zodiac.strip()
-    inv.updated_at = datetime.utcnow()
+    inv.updated_at = now
 
-    # agar invite hali created bo'lsa, openedga o'tkazamiz
-    if inv.status in (InviteStatus.created, InviteStatus.paid):
-        inv.status = InviteStatus.opened
-        if inv.opened_at is None:
-            inv.opened_at = datetime.utcnow()
+    # agar invite hali created bo'lsa, openedga o'tkazamiz ("opened" faqat birinchi marta sanaladi)
+    apply_invite_opened(db, inv, now=now)
 
     db.commit()
     db.refresh(inv)
     return inv
 
 
+def apply_invite_finished(
+    db: Session,
+    inv: Invite,
+    result_summary: str | None = None,
+    zodiac_score: int | None = None,
+    now: datetime | None = None,
+    result_data: str | None = None,
+) -> bool:
+    """
+    Invite -> finished: shartli UPDATE (_update_invite_if), commit qilmaydi:
+        UPDATE invites SET status='finished', ... WHERE id=? AND status!='finished' RETURNING id
+    Qator o'zgarsa - funnel rollup va "invite.finished" outbox hodisasi, True.
+    Parallel submit allaqachon yakunlagan bo'lsa (sessiyadagi inv eskirgan bo'lsa ham):
+    0 qator -> False, hech narsa yozilmaydi.
+    """
+    now = now or datetime.utcnow()
+    values = {"status": InviteStatus.finished, "finished_at": now, "updated_at": now}
+    if result_summary is not None:
+        values["result_summary"] = result_summary
+    if zodiac_score is not None:
+        values["zodiac_score"] = int(zodiac_score)
+    if result_data is not None:
+        values["result_data"] = result_data
+
+    if not _update_invite_if(db, inv, values, Invite.__table__.c.status != InviteStatus.finished):
+        return False
+    bump_funnel(db, "finished", now)
+    add_outbox(db, "invite.finished", {"invite_id": inv.id}, now)
+    return True
+
+
 def mark_invite_finished(
     db: Session,
     invite_id: int,
@@ -107,14 +206,7 @@ def mark_invite_finished(
     if not inv:
         raise ValueError("Invite topilmadi")
 
-    inv.status = InviteStatus.finished
-    inv.finished_at = datetime.utcnow()
-    inv.updated_at = datetime.utcnow()
-
-    if result_summary is not None:
-        inv.result_summary = result_summary
-    if zodiac_score is not None:
-        inv.zodiac_score = int(zodiac_score)
+    apply_invite_finished(db, inv, result_summary=result_summary, zodiac_score=zodiac_score)
 
     db.commit()
     db.refresh(inv)
@@ -134,22 +226,68 @@ def get_12_questions(db: Session) -> list[Question]:
 
 
 # -------- Answers --------
-def save_answers(db: Session, invite_id: int, answers_map: dict[int, str]) -> None:
+def _dialect_insert(db: Session):
     """
-    answers_map: {question_id: "A"|"B"}
+    Dialektga mos INSERT (ON CONFLICT qo'llab-quvvatlanadigan: SQLite, PostgreSQL).
+    Boshqa dialekt bo'lsa None -> eski loop yo'li ishlatiladi.
     """
-    inv = db.get(Invite, invite_id)
-    if not inv:
-        raise ValueError("Invite topilmadi")
-
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    return insert
+
+
+def _normalize_answers(answers_map: dict[int, str]) -> dict[int, str]:
+    out: dict[int, str] = {}
     for qid, choice in answers_map.items():
         choice = str(choice).upper().strip()
         if choice not in ("A", "B"):
             continue
+        out[int(qid)] = choice
+    return out
+
+
+def upsert_answers(db: Session, invite_id: int, answers_map: dict[int, str]) -> None:
+    """
+    Barcha javoblarni bitta statement bilan yozadi:
+    INSERT ... ON CONFLICT (invite_id, question_id) DO UPDATE SET choice = excluded.choice
+    (uq_invite_question constraint bo'yicha). Commit qilmaydi.
+    """
+    answers = _normalize_answers(answers_map)
+    if not answers:
+        return
+
+    insert = _dialect_insert(db)
+    if insert is None:
+        _save_answers_loop(db, invite_id, answers)
+        return
+
+    now = datetime.utcnow()
+    stmt = insert(Answer).values([
+        {
+            "invite_id": invite_id,
+            "question_id": qid,
+            "choice": AnswerChoice(choice),
+            "created_at": now,
+        }
+        for qid, choice in answers.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Answer.invite_id, Answer.question_id],
+        set_={"choice": stmt.excluded.choice},
+    )
+    db.execute(stmt)
+
 
+def _save_answers_loop(db: Session, invite_id: int, answers: dict[int, str]) -> None:
+    for qid, choice in answers.items():
         existing = (
             db.query(Answer)
-            .filter(Answer.invite_id == invite_id, Answer.question_id == int(qid))
+            .filter(Answer.invite_id == invite_id, Answer.question_id == qid)
             .first()
         )
 
@@ -158,20 +296,48 @@ def save_answers(db: Session, invite_id: int, answers_map: dict[int, str]) -> No
         else:
             db.add(Answer(
                 invite_id=invite_id,
-                question_id=int(qid),
+                question_id=qid,
                 choice=AnswerChoice(choice),
             ))
 
+
+def save_answers(db: Session, invite_id: int, answers_map: dict[int, str]) -> None:
+    """
+    answers_map: {question_id: "A"|"B"}
+    """
+    inv = db.get(Invite, invite_id)
+    if not inv:
+        raise ValueError("Invite topilmadi")
+
+    upsert_answers(db, invite_id, answers_map)
+
     # statusni opened qilib qo'yamiz (agar hali o‘tmagan bo‘lsa)
     if inv.status in (InviteStatus.created, InviteStatus.paid):
+        now = datetime.utcnow()
         inv.status = InviteStatus.opened
         if inv.opened_at is None:
-            inv.opened_at = datetime.utcnow()
-        inv.updated_at = datetime.utcnow()
+            inv.opened_at = now
+        inv.updated_at = now
+        bump_funnel(db, "opened", now)
 
     db.commit()
 
 
+def get_answer_letters(db: Session, invite_id: int) -> list[str]:
+    """Invite javoblari ['A','B',...] ko'rinishida (bitta SELECT, ORM obyektlarsiz)."""
+    return list(get_answer_choices(db, invite_id).values())
+
+
+def get_answer_choices(db: Session, invite_id: int) -> dict[int, str]:
+    """Invite javoblari {question_id: 'A'|'B'} ko'rinishida (bitta SELECT)."""
+    rows = db.execute(
+        select(Answer.question_id, Answer.choice)
+        .join(Question, Answer.question_id == Question.id)
+        .where(Answer.invite_id == invite_id)
+    )
+    return {qid: choice.value for qid, choice in rows}
+
+
 def get_answers_with_questions(db: Session, invite_id: int) -> list[tuple[Answer, Question]]:
     return (
         db.query(Answer, Question)
@@ -204,21 +370,198 @@ def create_payment(
     return p
 
 
+def get_payment(db: Session, payment_id: int) -> Payment | None:
+    return db.get(Payment, payment_id)
+
+
+def get_payment_by_txn(db: Session, provider: str, provider_txn_id: str) -> Payment | None:
+    return db.scalars(
+        select(Payment).where(
+            Payment.provider == PaymentProvider(provider),
+            Payment.provider_txn_id == provider_txn_id,
+        )
+    ).first()
+
+
+def set_payment_txn(db: Session, payment_id: int, provider_txn_id: str) -> None:
+    db.execute(
+        update(Payment)
+        .where(Payment.id == payment_id)
+        .values(provider_txn_id=provider_txn_id)
+    )
+    db.commit()
+
+
+def apply_payment_txn(db: Session, payment_id: int, provider_txn_id: str) -> bool:
+    """
+    Shartli UPDATE, commit qilmaydi (webhook paid/failed bilan bitta tranzaksiyada):
+        UPDATE payments SET provider_txn_id=? WHERE id=? AND provider_txn_id IS NULL RETURNING id
+    Boshqa txn allaqachon bog'langan bo'lsa - False.
+    """
+    row = db.execute(
+        update(Payment)
+        .where(Payment.id == payment_id, Payment.provider_txn_id.is_(None))
+        .values(provider_txn_id=provider_txn_id)
+        .returning(Payment.id)
+        .execution_options(synchronize_session=False)
+    ).first()
+    return row is not None
+
+
+def mark_payment_failed(db: Session, payment_id: int) -> None:
+    db.execute(
+        update(Payment)
+        .where(Payment.id == payment_id, Payment.status == PaymentStatus.created)
+        .values(status=PaymentStatus.failed)
+    )
+    db.commit()
+
+
+def apply_payment_paid(db: Session, payment_id: int, now: datetime | None = None) -> bool:
+    """
+    Shartli UPDATE (compare-and-set), commit qilmaydi:
+        UPDATE payments SET status='paid' WHERE id=? AND status!='paid' RETURNING invite_id
+    Qator o'zgarsa (birinchi marta) - invite created/expired -> paid va funnel rollup.
+    expired ham: TTL dan oldin boshlangan checkout webhook'i keyin kelsa, to'langan invite
+    (va payment) retention purge'da o'chib ketmasin.
+    Takroriy webhook/so'rov: 0 qator -> False, hech narsa yozilmaydi.
+    """
+    now = now or datetime.utcnow()
+    row = db.execute(
+        update(Payment)
+        .where(Payment.id == payment_id, Payment.status != PaymentStatus.paid)
+        .values(status=PaymentStatus.paid, paid_at=now)
+        .returning(Payment.invite_id, Payment.amount, Payment.provider)
+    ).first()
+    if row is None:
+        return False
+    invite_id, amount, provider = row
+
+    # Invite status ham paid bo'ladi (paywall ishlatilsa)
+    db.execute(
+        update(Invite)
+        .where(Invite.id == invite_id, Invite.status.in_((InviteStatus.created, InviteStatus.expired)))
+        .values(status=InviteStatus.paid, updated_at=now)
+    )
+    bump_funnel(db, "paid", now)
+    add_outbox(db, "payment.paid", {
+        "payment_id": payment_id,
+        "invite_id": invite_id,
+        "amount": amount,
+        "provider": provider.value,
+    }, now)
+    return True
+
+
 def mark_payment_paid(db: Session, payment_id: int) -> Payment:
+    """
+    Payment -> paid, invite created -> paid va funnel rollup - bitta commit.
+    Idempotent: allaqachon paid bo'lsa o'zgarmaydi.
+    """
     p = db.get(Payment, payment_id)
     if not p:
         raise ValueError("Payment topilmadi")
 
-    p.status = PaymentStatus.paid
-    p.paid_at = datetime.utcnow()
+    apply_payment_paid(db, payment_id)
     db.commit()
     db.refresh(p)
+    return p
 
-    # Invite status ham paid bo'ladi (paywall ishlatilsa)
-    inv = db.get(Invite, p.invite_id)
-    if inv and inv.status == InviteStatus.created:
-        inv.status = InviteStatus.paid
-        inv.updated_at = datetime.utcnow()
-        db.commit()
 
-    return p
+# -------- Funnel rollup --------
+FUNNEL_METRICS = ("created", "opened", "paid", "finished")
+
+
+def bump_funnel(db: Session, metric: str, at: datetime | None = None, n: int = 1) -> None:
+    """
+    funnel_daily[(kun, metric)] += n (UTC kun). Commit qilmaydi -
+    status o'zgarishi bilan bitta tranzaksiyada yoziladi.
+    SQLite/PostgreSQL: bitta INSERT ... ON CONFLICT DO UPDATE (atomar).
+    """
+    day = (at or datetime.utcnow()).date()
+    insert = _dialect_insert(db)
+    if insert is None:
+        row = db.get(FunnelDaily, (day, metric))
+        if row is None:
+            db.add(FunnelDaily(day=day, metric=metric, count=n))
+        else:
+            row.count += n
+        return
+
+    stmt = insert(FunnelDaily).values(day=day, metric=metric, count=n)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[FunnelDaily.day, FunnelDaily.metric],
+        set_={"count": FunnelDaily.count + stmt.excluded.count},
+    )
+    db.execute(stmt)
+
+
+def get_funnel_stats(db: Session, days: int = 30, today: date | None = None) -> list[dict]:
+    """
+    Oxirgi `days` kun uchun [{day, created, opened, paid, finished}, ...]
+    (eskisidan yangisiga). Faqat funnel_daily o'qiladi: O(days) qator.
+    """
+    today = today or datetime.utcnow().date()
+    since = today - timedelta(days=days - 1)
+
+    out: dict[date, dict] = {}
+    for i in range(days):
+        d = since + timedelta(days=i)
+        out[d] = {"day": d.isoformat(), **{m: 0 for m in FUNNEL_METRICS}}
+
+    rows = db.execute(
+        select(FunnelDaily.day, FunnelDaily.metric, FunnelDaily.count)
+        .where(FunnelDaily.day >= since, FunnelDaily.day <= today)
+    )
+    for day, metric, count in rows:
+        if metric in FUNNEL_METRICS:
+            out[day][metric] = count
+    return list(out.values())
+
+
+def _as_date(value) -> date:
+    # SQLite func.date() -> 'YYYY-MM-DD' string, PostgreSQL -> date
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def rebuild_funnel(db: Session) -> int:
+    """
+    funnel_daily ni invites/payments jadvallaridan qayta hisoblaydi
+    (rollup'dan oldingi ma'lumotlar uchun, bir martalik). Commit qiladi.
+    Yozilgan qatorlar sonini qaytaradi.
+    """
+    sources = {
+        "created": (Invite.created_at, None),
+        "opened": (Invite.opened_at, None),
+        "finished": (Invite.finished_at, None),
+        "paid": (Payment.paid_at, Payment.status == PaymentStatus.paid),
+    }
+    counts: dict[tuple[date, str], int] = {}
+    for metric, (col, cond) in sources.items():
+        day = func.date(col)
+        stmt = select(day, func.count()).where(col.is_not(None)).group_by(day)
+        if cond is not None:
+            stmt = stmt.where(cond)
+        for d, n in db.execute(stmt):
+            counts[(_as_date(d), metric)] = n
+
+    db.query(FunnelDaily).delete()
+    db.add_all(FunnelDaily(day=d, metric=m, count=n) for (d, m), n in counts.items())
+    db.commit()
+    return len(counts)
+
+
+# -------- Outbox --------
+def add_outbox(db: Session, topic: str, payload: dict, now: datetime | None = None) -> None:
+    """
+    Outbox hodisasi - chaqiruvchining tranzaksiyasida (commit qilmaydi).
+    Commit bo'lsa hodisa ham, status ham yoziladi; rollback - ikkalasi ham yo'q.
+    """
+    now = now or datetime.utcnow()
+    db.add(OutboxEvent(
+        topic=topic,
+        payload=json.dumps(payload, separators=(",", ":")),
+        created_at=now,
+        available_at=now,
+    ))
+    db.info["outbox_dirty"] = True
@@ -0,0 +1,120 @@
+# app/db/crud_async.py
+"""
+crud.py ning async (AsyncSession) versiyasi.
+
+Har bir funksiya sync crud funksiyasini AsyncSession.run_sync orqali chaqiradi:
+kod bitta joyda qoladi, lekin DB I/O async driver (aiosqlite/asyncpg) orqali
+event loop'da bajariladi - threadpool ishlatilmaydi.
+"""
+from __future__ import annotations
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import crud
+from app.db.models import Invite, Question, Answer, Payment
+
+
+# -------- Invites --------
+async def create_invite(
+    db: AsyncSession,
+    boy_name: str,
+    boy_age: int,
+    boy_zodiac: str,
+    token: str,
+    message: str | None = None,
+) -> Invite:
+    return await db.run_sync(
+        crud.create_invite,
+        boy_name=boy_name,
+        boy_age=boy_age,
+        boy_zodiac=boy_zodiac,
+        token=token,
+        message=message,
+    )
+
+
+async def get_invite(db: AsyncSession, invite_id: int) -> Invite | None:
+    return await db.get(Invite, invite_id)
+
+
+async def get_invite_by_token(db: AsyncSession, token: str) -> Invite | None:
+    return await db.run_sync(crud.get_invite_by_token, token)
+
+
+async def mark_invite_opened(db: AsyncSession, invite_id: int) -> Invite:
+    return await db.run_sync(crud.mark_invite_opened, invite_id)
+
+
+async def set_girl_data_by_token(
+    db: AsyncSession,
+    token: str,
+    girl_name: str,
+    girl_age: int,
+    girl_zodiac: str,
+) -> Invite:
+    return await db.run_sync(
+        crud.set_girl_data_by_token,
+        token=token,
+        girl_name=girl_name,
+        girl_age=girl_age,
+        girl_zodiac=girl_zodiac,
+    )
+
+
+async def mark_invite_finished(
+    db: AsyncSession,
+    invite_id: int,
+    result_summary: str | None = None,
+    zodiac_score: int | None = None,
+) -> Invite:
+    return await db.run_sync(
+        crud.mark_invite_finished,
+        invite_id=invite_id,
+        result_summary=result_summary,
+        zodiac_score=zodiac_score,
+    )
+
+
+# -------- Questions --------
+async def get_12_questions(db: AsyncSession) -> list[Question]:
+    return await db.run_sync(crud.get_12_questions)
+
+
+# -------- Answers --------
+async def save_answers(db: AsyncSession, invite_id: int, answers_map: dict[int, str]) -> None:
+    await db.run_sync(crud.save_answers, invite_id, answers_map)
+
+
+async def get_answers_with_questions(db: AsyncSession, invite_id: int) -> list[tuple[Answer, Question]]:
+    return await db.run_sync(crud.get_answers_with_questions, invite_id)
+
+
+# -------- Payments (MVP demo) --------
+async def create_payment(
+    db: AsyncSession,
+    invite_id: int,
+    amount: int = 14999,
+    provider: str = "demo"
+) -> Payment:
+    return await db.run_sync(crud.create_payment, invite_id, amount=amount, provider=provider)
+
+
+async def mark_payment_paid(db: AsyncSession, payment_id: int) -> Payment:
+    return await db.run_sync(crud.mark_payment_paid, payment_id)
+
+
+async def get_payment_by_txn(db: AsyncSession, provider: str, provider_txn_id: str) -> Payment | None:
+    return await db.run_sync(crud.get_payment_by_txn, provider, provider_txn_id)
+
+
+async def set_payment_txn(db: AsyncSession, payment_id: int, provider_txn_id: str) -> None:
+    await db.run_sync(crud.set_payment_txn, payment_id, provider_txn_id)
+
+
+async def mark_payment_failed(db: AsyncSession, payment_id: int) -> None:
+    await db.run_sync(crud.mark_payment_failed, payment_id)
+
+
+# -------- Funnel rollup --------
+async def get_funnel_stats(db: AsyncSession, days: int = 30) -> list[dict]:
+    return await db.run_sync(crud.get_funnel_stats, days)
@@ -1,6 +1,14 @@
+import logging
 import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core import config
+from app.core.metrics import instrument_engine
+from app.db import query_stats, sqlite
+
+log = logging.getLogger(__name__)
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
@@ -8,20 +16,145 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     DATABASE_URL = "sqlite:///./app.db"
 
+
+def to_async_url(url: str) -> str:
+    """
+    Sync URL -> async driver URL.
+    sqlite:///./app.db        -> sqlite+aiosqlite:///./app.db
+    postgres(ql)://...        -> postgresql+asyncpg://...
+    Driver allaqachon ko'rsatilgan bo'lsa (masalan +aiosqlite) - o'zgarmaydi.
+    """
+    scheme, sep, rest = url.partition("://")
+    if not sep or "+" in scheme:
+        return url
+    if scheme == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    if scheme in ("postgres", "postgresql"):
+        return f"postgresql+asyncpg://{rest}"
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+
+# SQLite fayl bazasi: WAL/pragmalar, bitta writer ulanishi + reader pool (app/db/sqlite.py)
+SQLITE_SPLIT = config.SQLITE_PRODUCTION and sqlite.is_file_sqlite(DATABASE_URL)
+
+# har worker'da pool_options bilan yaratiladigan engine'lar: sync + async
+# (SQLite split'da - ikkala reader; writer'lar alohida, har biri 1 ulanish)
+POOLED_ENGINES = 2
+FIXED_CONNECTIONS = 2 if SQLITE_SPLIT else 0
+
+
+def pool_options(url: str) -> dict:
+    """
+    Har pool'li engine uchun pool_size/max_overflow. DB_MAX_CONNECTIONS - host bo'yicha jami:
+    APP_WORKERS ga, keyin worker ichidagi engine'larga bo'linadi. In-memory SQLite'da pool yo'q.
+    """
+    if url.startswith("sqlite") and not sqlite.is_file_sqlite(url):
+        return {}
+    per_engine = (config.DB_MAX_CONNECTIONS // config.APP_WORKERS - FIXED_CONNECTIONS) // POOLED_ENGINES
+    if per_engine < 1:
+        per_engine = 1
+        log.warning(
+            "DB_MAX_CONNECTIONS=%s %s worker uchun yetmaydi: har engine'ga 1 ulanish (jami %s)",
+            config.DB_MAX_CONNECTIONS, config.APP_WORKERS,
+            config.APP_WORKERS * (POOLED_ENGINES + FIXED_CONNECTIONS),
+        )
+    pool_size = config.DB_POOL_SIZE or max(1, per_engine // 3)
+    max_overflow = config.DB_MAX_OVERFLOW if config.DB_MAX_OVERFLOW is not None else per_engine - pool_size
+    return {"pool_size": pool_size, "max_overflow": max_overflow}
+
+
+_pool_opts = pool_options(DATABASE_URL)
+_writer_opts = sqlite.engine_options(writer=True) if SQLITE_SPLIT else _pool_opts
+
+# yozuvchi engine (SQLite'dan boshqa bazalarda - yagona engine)
 engine = create_engine(
     DATABASE_URL,
     pool_pre_ping=True,
+    **_writer_opts,
 )
 
+# Async yo'l: routerlar threadpool'ni band qilmasdan event loop'da ishlaydi
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    **_writer_opts,
+)
+
+if SQLITE_SPLIT:
+    read_engine = create_engine(DATABASE_URL, pool_pre_ping=True, **_pool_opts)
+    async_read_engine = create_async_engine(ASYNC_DATABASE_URL, pool_pre_ping=True, **_pool_opts)
+    for _eng, _writer in (
+        (engine, True),
+        (async_engine.sync_engine, True),
+        (read_engine, False),
+        (async_read_engine.sync_engine, False),
+    ):
+        sqlite.configure(_eng, writer=_writer)
+    _session_opts = {"class_": sqlite.routing_session_class(read_engine, engine)}
+    _async_session_opts = {
+        "sync_session_class": sqlite.routing_session_class(
+            async_read_engine.sync_engine, async_engine.sync_engine
+        ),
+    }
+else:
+    read_engine = engine
+    async_read_engine = async_engine
+    _session_opts = {"bind": engine}
+    _async_session_opts = {"bind": async_engine}
+
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
-    bind=engine,
+    **_session_opts,
 )
 
+AsyncSessionLocal = async_sessionmaker(
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+    **_async_session_opts,
+)
+
+# /metrics: db_pool_checkout_seconds{engine="sync|async"} (+ "_read" - SQLite reader pool)
+# har so'rov: query soni, DB vaqti, sekin query'lar, N+1
+for _name, _eng in (("sync", engine), ("async", async_engine.sync_engine)):
+    instrument_engine(_eng, _name)
+    query_stats.instrument(_eng)
+if SQLITE_SPLIT:
+    for _name, _eng in (("sync_read", read_engine), ("async_read", async_read_engine.sync_engine)):
+        instrument_engine(_eng, _name)
+        query_stats.instrument(_eng)
+
+
+def dispose_after_fork() -> None:
+    """
+    gunicorn post_fork (preload_app): master'da yaratilgan pool'lar bolada yangilanadi.
+    close=False - ota process ulanishlari yopilmaydi (ular otaga tegishli), faqat tashlanadi.
+    Pool hajmi joriy config.APP_WORKERS bo'yicha qayta hisoblanadi (import paytidagi qiymat
+    CLI'dagi -w ni bilmaydi).
+    """
+    opts = pool_options(DATABASE_URL)
+    pooled = {read_engine, async_read_engine.sync_engine}
+    for eng in {engine, read_engine, async_engine.sync_engine, async_read_engine.sync_engine}:
+        if opts and eng in pooled:
+            # dispose() yangi pool'ni eskisining hajmi bilan yaratadi (QueuePool.recreate) -
+            # tashlanadigan eski pool'ga yangi hajm yoziladi
+            eng.pool._pool.maxsize = opts["pool_size"]
+            eng.pool._max_overflow = opts["max_overflow"]
+        eng.dispose(close=False)
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -4,7 +4,9 @@ from __future__ import annotations
 from sqlalchemy.orm import Session
 
 from app.db.database import engine, SessionLocal
-from app.db.models import Base, Question
+from app.db import crud
+from app.db.migrations import migrate
+from app.db.models import Base, Question, Invite, FunnelDaily
 
 
 SEED_QUESTIONS = [
@@ -133,6 +135,16 @@ def seed_questions(db: Session) -> int:
     return len(objects)
 
 
+def backfill_funnel(db: Session) -> int:
+    """
+    funnel_daily bo'sh, lekin invite'lar bor bo'lsa (rollup'dan oldingi DB) -
+    bir marta invites/payments dan qayta hisoblaymiz.
+    """
+    if db.query(FunnelDaily).first() is not None or db.query(Invite.id).first() is None:
+        return 0
+    return crud.rebuild_funnel(db)
+
+
 def init_db(drop_all: bool = False) -> None:
     """
     drop_all=False: normal ishga tushirish.
@@ -141,7 +153,8 @@ def init_db(drop_all: bool = False) -> None:
     if drop_all:
         Base.metadata.drop_all(bind=engine)
 
-    Base.metadata.create_all(bind=engine)
+    for name in migrate(engine):
+        print(f"✅ Migratsiya: {name}")
 
     with SessionLocal() as db:
         added = seed_questions(db)
@@ -149,6 +162,8 @@ def init_db(drop_all: bool = False) -> None:
             print(f"✅ {added} ta savol qo‘shildi (seed).")
         else:
             print("ℹ️ Savollar allaqachon mavjud, seed qilinmadi.")
+        if backfill_funnel(db):
+            print("✅ Funnel rollup qayta hisoblandi.")
 
     print("✅ DB init tugadi.")
 
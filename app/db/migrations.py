@@ -0,0 +1,179 @@
+# app/db/migrations.py
+"""
+Versiyalangan sxema migratsiyalari (deploy paytida ishga tushadi).
+
+    python -m app.db.migrations            # barcha yangi migratsiyalar
+    python -m app.db.migrations --list     # holat
+
+Har bir migratsiya: (version, name, fn(conn)). Qo'llanganlari schema_migrations
+jadvalida saqlanadi, har biri alohida tranzaksiyada bajariladi.
+
+Muhim: 1-migratsiya create_all - yangi bazada jadvallar modeldagi HOZIRGI ko'rinishda
+(ustun/indekslar bilan) yaratiladi. Shuning uchun keyingi migratsiyalar idempotent
+bo'lishi kerak (checkfirst / "agar yo'q bo'lsa").
+"""
+from __future__ import annotations
+
+import argparse
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import Connection, Engine, inspect, select, text
+
+from app.db.models import Base, Invite, OutboxEvent, Payment, Question, SchemaMigration
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+
+
+# ----------------------------
+# Yordamchilar
+# ----------------------------
+def _add_column_if_missing(conn: Connection, table_name: str, column_name: str) -> None:
+    table = Base.metadata.tables[table_name]
+    existing = {c["name"] for c in inspect(conn).get_columns(table_name)}
+    if column_name in existing:
+        return
+    col = table.c[column_name]
+    col_type = col.type.compile(dialect=conn.dialect)
+    conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {col_type}"))
+
+
+def _create_index(conn: Connection, table, name: str) -> None:
+    index = next(i for i in table.indexes if i.name == name)
+    index.create(conn, checkfirst=True)
+
+
+# ----------------------------
+# Migratsiyalar
+# ----------------------------
+def _initial_schema(conn: Connection) -> None:
+    # mavjud (create_all davridagi) bazada hech narsa o'zgarmaydi
+    Base.metadata.create_all(conn)
+
+
+def _invites_result_data(conn: Connection) -> None:
+    # avval init_db.add_missing_columns qilardi
+    _add_column_if_missing(conn, "invites", "result_data")
+
+
+# answers.invite_id alohida indeks talab qilmaydi: uq_invite_question
+# (invite_id, question_id) birinchi ustuni bo'yicha qidiruvni allaqachon qoplaydi.
+HOT_INDEXES = (
+    (Payment.__table__, "ix_payments_invite_id"),
+    (Invite.__table__, "ix_invites_status_created_at"),
+    (Question.__table__, "ix_questions_is_active"),
+)
+
+
+def _hot_path_indexes(conn: Connection) -> None:
+    for table, name in HOT_INDEXES:
+        _create_index(conn, table, name)
+
+
+def _invite_status_expired(conn: Connection) -> None:
+    # PostgreSQL: native ENUM tipiga yangi qiymat; SQLite'da VARCHAR - o'zgarish yo'q
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("ALTER TYPE invite_status ADD VALUE IF NOT EXISTS 'expired'"))
+
+
+def _payments_provider_txn_unique(conn: Connection) -> None:
+    _create_index(conn, Payment.__table__, "uq_payments_provider_txn")
+
+
+def _outbox_events(conn: Connection) -> None:
+    OutboxEvent.__table__.create(conn, checkfirst=True)
+
+
+def _invites_telegram_chat_id(conn: Connection) -> None:
+    _add_column_if_missing(conn, "invites", "telegram_chat_id")
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(1, "initial_schema", _initial_schema),
+    Migration(2, "invites_result_data", _invites_result_data),
+    Migration(3, "hot_path_indexes", _hot_path_indexes),
+    Migration(4, "invite_status_expired", _invite_status_expired),
+    Migration(5, "payments_provider_txn_unique", _payments_provider_txn_unique),
+    Migration(6, "outbox_events", _outbox_events),
+    Migration(7, "invites_telegram_chat_id", _invites_telegram_chat_id),
+]
+
+
+# ----------------------------
+# Runner
+# ----------------------------
+def applied_versions(engine: Engine) -> set[int]:
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(SchemaMigration.__tablename__):
+            return set()
+        return set(conn.scalars(select(SchemaMigration.version)))
+
+
+def migrate(engine: Engine | None = None, target: int | None = None) -> list[str]:
+    """
+    Qo'llanmagan migratsiyalarni tartib bilan bajaradi (target gacha).
+    Bajarilganlar nomlarini qaytaradi.
+    PostgreSQL'da advisory lock: bir vaqtda ikki deploy migratsiya qilmaydi.
+    """
+    if engine is None:
+        from app.db.database import engine
+
+    done: list[str] = []
+    is_pg = engine.dialect.name == "postgresql"
+    # lock ulanishi faqat PostgreSQL'da (SQLite writer pool'ida bitta ulanish bor)
+    with engine.connect() if is_pg else nullcontext() as lock_conn:
+        if is_pg:
+            lock_conn.execute(text("SELECT pg_advisory_lock(hashtext('schema_migrations'))"))
+            lock_conn.commit()
+        try:
+            with engine.begin() as conn:
+                SchemaMigration.__table__.create(conn, checkfirst=True)
+            applied = applied_versions(engine)
+
+            for m in MIGRATIONS:
+                if m.version in applied or (target is not None and m.version > target):
+                    continue
+                with engine.begin() as conn:
+                    m.apply(conn)
+                    conn.execute(SchemaMigration.__table__.insert().values(
+                        version=m.version, name=m.name, applied_at=datetime.utcnow(),
+                    ))
+                done.append(f"{m.version:04d}_{m.name}")
+        finally:
+            if is_pg:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(hashtext('schema_migrations'))"))
+                lock_conn.commit()
+    return done
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sxema migratsiyalari")
+    parser.add_argument("--list", action="store_true", help="holatni ko'rsatish")
+    parser.add_argument("--target", type=int, default=None, help="shu versiyagacha")
+    args = parser.parse_args()
+
+    from app.db.database import engine
+
+    if args.list:
+        applied = applied_versions(engine)
+        for m in MIGRATIONS:
+            mark = "x" if m.version in applied else " "
+            print(f"[{mark}] {m.version:04d}_{m.name}")
+        return
+
+    done = migrate(engine, target=args.target)
+    for name in done:
+        print(f"✅ Migratsiya: {name}")
+    if not done:
+        print("ℹ️ Sxema yangi, migratsiya yo'q.")
+
+
+if __name__ == "__main__":
+    main()
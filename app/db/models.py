@@ -1,12 +1,12 @@
 # app/db/models.py
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional, List
 
 from sqlalchemy import (
-    String, Integer, DateTime, ForeignKey, Text,
-    Enum, Boolean, UniqueConstraint
+    String, Integer, BigInteger, Date, DateTime, ForeignKey, Text,
+    Enum, Boolean, Index, UniqueConstraint
 )
 from sqlalchemy.orm import (
     DeclarativeBase, Mapped, mapped_column, relationship
@@ -29,6 +29,7 @@ class InviteStatus(str, enum.Enum):
     paid = "paid"          # to'lov bo'ldi (agar paywall bo'lsa)
     opened = "opened"      # user2 linkni ochdi
     finished = "finished"  # user2 savollarga javob berdi, xulosa tayyor
+    expired = "expired"    # link TTL ichida ochilmadi (retention_service)
 
 
 class PaymentStatus(str, enum.Enum):
@@ -57,6 +58,10 @@ class Invite(Base):
     user1 -> invite yaratadi -> link/token -> user2 javob beradi -> summary user1 ga.
     """
     __tablename__ = "invites"
+    __table_args__ = (
+        # status bo'yicha filtr + vaqt oralig'i (TTL/purge, admin hisobotlar)
+        Index("ix_invites_status_created_at", "status", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
 
@@ -77,6 +82,9 @@ class Invite(Base):
     # Optional: user1 tomonidan yoziladigan muloyim xabar
     message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
 
+    # Optional: user1 ning Telegram chat id si (bot orqali yaratilganda) - natija xabari uchun
+    telegram_chat_id: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+
     # User2 (qiz) ma'lumotlari (link ochganda yoki testdan oldin to'ldiriladi)
     girl_name: Mapped[Optional[str]] = mapped_column(String(80), nullable=True)
     girl_age: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
@@ -84,6 +92,8 @@ class Invite(Base):
 
     # Results cache (MVPda natijani shu yerga yozib qo'yish mumkin)
     result_summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # To'liq natija (profile + zodiac + 2-blokli profil), compact JSON; finished bo'lganda yoziladi
+    result_data: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     zodiac_score: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
@@ -124,7 +134,7 @@ class Question(Base):
     a_score: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
     b_score: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
 
-    is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False, index=True)
 
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 
@@ -168,10 +178,16 @@ class Payment(Base):
     Endi to'lov invite (taklif) ga ulanadi.
     """
     __tablename__ = "payments"
+    __table_args__ = (
+        # webhook idempotentligi: bitta provider tranzaksiyasi = bitta payment
+        Index("uq_payments_provider_txn", "provider", "provider_txn_id", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
 
-    invite_id: Mapped[int] = mapped_column(ForeignKey("invites.id", ondelete="CASCADE"), nullable=False)
+    invite_id: Mapped[int] = mapped_column(
+        ForeignKey("invites.id", ondelete="CASCADE"), nullable=False, index=True
+    )
 
     provider: Mapped[PaymentProvider] = mapped_column(
         Enum(PaymentProvider, name="payment_provider"),
@@ -195,3 +211,63 @@ class Payment(Base):
 
     # Relationships
     invite: Mapped["Invite"] = relationship(back_populates="payments")
+
+
+class FunnelDaily(Base):
+    """
+    Funnel rollup: kun x metrika bo'yicha hisoblagichlar
+    (created / opened / finished / paid).
+    Status o'zgarishlari bilan bitta tranzaksiyada oshiriladi -> /api/stats
+    invites jadvalini skan qilmasdan O(kunlar) javob beradi.
+    """
+    __tablename__ = "funnel_daily"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    metric: Mapped[str] = mapped_column(String(20), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+class OutboxStatus(str, enum.Enum):
+    pending = "pending"
+    done = "done"
+    dead = "dead"      # OUTBOX_MAX_ATTEMPTS dan keyin ham muvaffaqiyatsiz
+
+
+class OutboxEvent(Base):
+    """
+    Transactional outbox: status o'zgarishi bilan BIR tranzaksiyada yoziladigan hodisa
+    (payment.paid, invite.finished). Yon ta'sirlar (xabarnoma va h.k.) so'rov ichida emas,
+    fon worker'ida (app/services/outbox_service.py) bajariladi.
+    """
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        Index("ix_outbox_status_available_at", "status", "available_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    topic: Mapped[str] = mapped_column(String(60), nullable=False)
+    payload: Mapped[str] = mapped_column(Text, nullable=False)  # compact JSON
+
+    status: Mapped[OutboxStatus] = mapped_column(
+        Enum(OutboxStatus, name="outbox_status"),
+        default=OutboxStatus.pending,
+        nullable=False,
+    )
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # keyingi urinish vaqti (backoff) / worker "ijarasi" tugash vaqti
+    available_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    processed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+
+class SchemaMigration(Base):
+    """
+    Qo'llangan migratsiyalar (app/db/migrations.py). Har bir versiya bir marta.
+    """
+    __tablename__ = "schema_migrations"
+
+    version: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(120), nullable=False)
+    applied_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,161 @@
+# app/db/query_stats.py
+"""
+SQL instrumentatsiya: so'rov (HTTP request) bo'yicha query soni va DB vaqti, sekin query'lar, N+1.
+
+Engine event'lari (before/after_cursor_execute) har bir execute'ni o'lchaydi; natija
+contextvar'dagi joriy request hisobiga qo'shiladi (async engine greenlet'lari va
+threadpool ham contextvar'ni meros oladi). Request bo'lmasa (fon vazifalar) faqat
+sekin query log ishlaydi.
+
+- SLOW_QUERY_MS dan sekin statement -> log.warning + db_slow_queries_total
+- bitta request ichida bir xil statement shakli N_PLUS_ONE_THRESHOLD marta va ko'p
+  -> log.warning("N+1 ...") + db_n_plus_one_total{route}
+- DEBUG=1: javobga X-DB-Queries va Server-Timing (db;dur=...) header'lari
+- /metrics: db_queries_per_request{route}, db_request_seconds{route}
+
+Shakl = parametrsiz SQL matni (bo'sh joylar va IN (...) ro'yxatlari qisqartirilgan).
+"""
+from __future__ import annotations
+
+import functools
+import logging
+import re
+import time
+from collections import Counter as _Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+
+from app.core import config, metrics
+
+log = logging.getLogger(__name__)
+
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+QUERIES_PER_REQUEST = metrics.register(metrics.Histogram(
+    "db_queries_per_request", "Bitta HTTP so'rovdagi SQL query'lar soni", ("route",), QUERY_BUCKETS,
+))
+DB_REQUEST_SECONDS = metrics.register(metrics.Histogram(
+    "db_request_seconds", "Bitta HTTP so'rovda SQL'ga ketgan umumiy vaqt", ("route",), DB_TIME_BUCKETS,
+))
+SLOW_QUERIES = metrics.register(metrics.Counter(
+    "db_slow_queries_total", "SLOW_QUERY_MS dan sekin SQL statement'lar",
+))
+N_PLUS_ONE = metrics.register(metrics.Counter(
+    "db_n_plus_one_total", "Bir xil statement shakli takrorlangan so'rovlar (N+1)", ("route",),
+))
+
+
+@dataclass
+class RequestQueries:
+    count: int = 0
+    seconds: float = 0.0
+    shapes: _Counter = field(default_factory=_Counter)
+
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+_WS = re.compile(r"\s+")
+# IN (?, ?, ?) / IN ($1, $2) / IN (%(p_1)s, ...) -> IN (...)
+_IN_LIST = re.compile(r"\(\s*(?:\?|\$\d+|%\(\w+\)s)(?:\s*,\s*(?:\?|\$\d+|%\(\w+\)s))*\s*\)")
+
+
+# SQLAlchemy compiled cache tufayli statement matnlari takrorlanadi - regex har birida bir marta
+@functools.lru_cache(maxsize=1024)
+def statement_shape(statement: str) -> str:
+    return _IN_LIST.sub("(...)", _WS.sub(" ", statement).strip())
+
+
+# ----------------------------
+# Engine hooks
+# ----------------------------
+def _before(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    if statement.startswith("BEGIN"):
+        # tranzaksiya boshqaruvi (SQLite begin event'i) - COMMIT kabi sanalmaydi
+        return
+    stats = _current.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+        stats.shapes[statement_shape(statement)] += 1
+    if elapsed * 1000 >= config.SLOW_QUERY_MS:
+        SLOW_QUERIES.inc()
+        log.warning("sekin query %.1f ms: %s", elapsed * 1000, statement_shape(statement)[:500])
+
+
+def _on_error(exception_context):
+    started = exception_context.connection and exception_context.connection.info.get("query_started")
+    if started:
+        started.pop()
+
+
+def instrument(engine) -> None:
+    """Sync engine (AsyncEngine uchun engine.sync_engine) ga hook'lar."""
+    event.listen(engine, "before_cursor_execute", _before)
+    event.listen(engine, "after_cursor_execute", _after)
+    event.listen(engine, "handle_error", _on_error)
+
+
+# ----------------------------
+# Request hisobi
+# ----------------------------
+@contextmanager
+def track() -> Iterator[RequestQueries]:
+    """Blok ichidagi query'lar yangi RequestQueries ga yoziladi (middleware va testlar)."""
+    stats = RequestQueries()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def finish(stats: RequestQueries, route: str) -> None:
+    QUERIES_PER_REQUEST.observe(stats.count, route)
+    DB_REQUEST_SECONDS.observe(stats.seconds, route)
+    repeated = [(n, shape) for shape, n in stats.shapes.items() if n >= config.N_PLUS_ONE_THRESHOLD]
+    if repeated:
+        N_PLUS_ONE.inc(route)
+        for n, shape in repeated:
+            log.warning("N+1 %s: %d marta: %s", route, n, shape[:500])
+
+
+class QueryStatsMiddleware:
+    """Har HTTP so'rov uchun alohida hisob; DEBUG=1 bo'lsa javob header'lariga yoziladi."""
+
+    def __init__(self, app, skip_prefixes: tuple[str, ...] = metrics.SKIP_PREFIXES):
+        self.app = app
+        self.skip_prefixes = skip_prefixes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.skip_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        with track() as stats:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-queries", str(stats.count).encode()))
+                    headers.append((b"server-timing", f"db;dur={stats.seconds * 1000:.2f}".encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                # DEBUG o'chiq bo'lsa javob xabarlari o'ralmaydi
+                await self.app(scope, receive, send_wrapper if config.DEBUG else send)
+            finally:
+                route = getattr(scope.get("route"), "path", None) or metrics.UNMATCHED
+                finish(stats, route)
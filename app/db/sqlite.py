@@ -0,0 +1,108 @@
+# app/db/sqlite.py
+"""
+SQLite production rejimi (SQLITE_PRODUCTION=1, fayl bazalar uchun).
+
+Har yangi ulanishga "connect" event'ida pragmalar:
+    journal_mode=WAL        o'quvchilar yozuvchini kutmaydi, commit = WAL'ga append
+    synchronous=NORMAL      WAL'da xavfsiz; fsync faqat checkpoint'da
+    busy_timeout            lock band bo'lsa darhol "database is locked" emas, kutadi
+    mmap_size, cache_size   o'qishlar page cache/mmap'dan
+    temp_store=MEMORY       ORDER BY/GROUP BY vaqtinchalik jadvallari xotirada
+    foreign_keys=ON
+
+Yozish va o'qish ajratilgan:
+- writer engine: bitta ulanish (pool_size=1) - process ichida yozuvlar navbat bilan
+  (kutish db_pool_checkout_seconds da ko'rinadi); tranzaksiya BEGIN IMMEDIATE bilan -
+  yozish lock'i boshida olinadi, boshqa process (gunicorn worker) busy_timeout bilan kutadi.
+  Deferred BEGIN'da o'qib bo'lib yozishga o'tgan tranzaksiya WAL'da SQLITE_BUSY bilan
+  darhol yiqilardi - busy_timeout yordam bermaydi.
+- reader engine: oddiy pool, autocommit - BEGIN yuborilmaydi (so'rovga bitta round-trip
+  kam), har SELECT o'sha paytdagi oxirgi commit'ni ko'radi, yozuvchini kutmaydi; uzoq
+  ochiq o'qish tranzaksiyasi WAL checkpoint'ini ham ushlab turmaydi.
+
+RoutingSession: tranzaksiyadagi birinchi yozuvgacha (flush yoki INSERT/UPDATE/DELETE)
+o'qishlar reader'dan; shundan keyin commit/rollback gacha hammasi writer'da
+(o'z yozganini ko'radi).
+"""
+from __future__ import annotations
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session
+
+from app.core import config
+
+WRITER_KEY = "sqlite_writer"
+
+
+def is_file_sqlite(url: str) -> bool:
+    u = make_url(url)
+    return u.get_backend_name() == "sqlite" and u.database not in (None, "", ":memory:")
+
+
+def pragmas() -> dict[str, object]:
+    return {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": config.SQLITE_BUSY_TIMEOUT_MS,
+        "mmap_size": config.SQLITE_MMAP_SIZE,
+        "cache_size": config.SQLITE_CACHE_SIZE,
+        "temp_store": "MEMORY",
+        "foreign_keys": "ON",
+    }
+
+
+def configure(engine: Engine, writer: bool) -> None:
+    """Sync engine (AsyncEngine uchun engine.sync_engine) ga connect/begin hook'lari."""
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        # driver o'zi BEGIN yubormasin - tranzaksiyani "begin" event'i boshqaradi
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas().items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    if not writer:
+        return
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def engine_options(writer: bool) -> dict:
+    """create_engine / create_async_engine uchun pool sozlamalari."""
+    if writer:
+        return {"pool_size": 1, "max_overflow": 0, "pool_timeout": config.SQLITE_WRITER_TIMEOUT}
+    return {}
+
+
+class RoutingSession(Session):
+    """reader/writer - sync Engine'lar (async uchun .sync_engine); sessionmaker'da subklass qilinadi."""
+
+    reader: Engine
+    writer: Engine
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            self.info.get(WRITER_KEY)
+            or self._flushing
+            or (clause is not None and getattr(clause, "is_dml", False))
+        ):
+            self.info[WRITER_KEY] = True
+            return self.writer
+        return self.reader
+
+
+def routing_session_class(reader: Engine, writer: Engine) -> type[RoutingSession]:
+    return type("SQLiteRoutingSession", (RoutingSession,), {"reader": reader, "writer": writer})
+
+
+@event.listens_for(RoutingSession, "after_commit")
+@event.listens_for(RoutingSession, "after_rollback")
+def _release_writer(session: Session) -> None:
+    session.info.pop(WRITER_KEY, None)
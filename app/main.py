@@ -1,17 +1,77 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse
 from pathlib import Path
-from fastapi.staticfiles import StaticFiles
 
+from app.core import config
+from app.core.assets import AssetStaticFiles, build_assets
+from app.core.metrics import MetricsMiddleware, metrics_endpoint
+from app.core.templates import precompile_templates
+from app.db.query_stats import QueryStatsMiddleware
 from app.routers.pages import router as pages_router
 from app.routers.payments import router as payments_router
 from app.routers.quiz import router as quiz_router
 from app.routers import api
-app = FastAPI(title="Sevgi Testi")
+from app.services.invite_service import InviteExpired, InviteNotFound
+from app.services import notification_service, payment_service
+from app.services import outbox_service
+from app.services.retention_service import retention_loop
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # static: hashed nomlar + .gz/.br (shablonlardagi static_url shunga tayanadi)
+    build_assets()
+    # shablonlar birinchi so'rovdan oldin kompilyatsiya qilinadi (bytecode cache bilan)
+    precompile_templates()
+    # Telegram dispatcher (TELEGRAM_BOT_TOKEN bo'lsa) - outbox "invite.finished" handleri
+    await notification_service.start_notifications()
+    tasks = []
+    outbox_task = None
+    # TTL/expired/arxiv fon vazifasi (RETENTION_INTERVAL=0 - o'chiq, cron ishlatiladi)
+    if config.RETENTION_INTERVAL > 0:
+        tasks.append(asyncio.create_task(retention_loop(config.RETENTION_INTERVAL)))
+    # outbox: to'lov/finished yon ta'sirlari so'rovdan tashqarida
+    if config.OUTBOX_POLL_INTERVAL > 0:
+        outbox_task = asyncio.create_task(outbox_service.outbox_worker(config.OUTBOX_POLL_INTERVAL))
+        tasks.append(outbox_task)
+    yield
+    if outbox_task is not None:
+        # joriy batch tugasin (claim qilingan hodisalar lease'da qolib ketmasin)
+        outbox_service.request_stop()
+        await asyncio.wait({outbox_task}, timeout=5)
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await notification_service.stop_notifications()
+    await payment_service.close_http()
+
+
+app = FastAPI(title="Sevgi Testi", lifespan=lifespan)
+
+# so'rov bo'yicha SQL soni/vaqti, N+1 (DEBUG=1: X-DB-Queries header)
+app.add_middleware(QueryStatsMiddleware)
+# route shabloni bo'yicha latency/status/in-flight -> GET /metrics (Prometheus)
+app.add_middleware(MetricsMiddleware)
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
 
 BASE_DIR = Path(__file__).resolve().parent  # app/
-app.mount("/static", StaticFiles(directory=str(BASE_DIR / "static")), name="static")
+app.mount("/static", AssetStaticFiles(directory=str(BASE_DIR / "static")), name="static")
 
 app.include_router(pages_router)
 app.include_router(payments_router)
 app.include_router(quiz_router)
-app.include_router(api.router)
\ No newline at end of file
+app.include_router(api.router)
+
+
+@app.exception_handler(InviteNotFound)
+async def invite_not_found(request: Request, exc: InviteNotFound):
+    return HTMLResponse(f"<h3>{exc}</h3>", status_code=404)
+
+
+@app.exception_handler(InviteExpired)
+async def invite_expired(request: Request, exc: InviteExpired):
+    return HTMLResponse(f"<h3>{exc}</h3>", status_code=410)
@@ -3,6 +3,8 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Dict, List, Tuple, Optional
 
+from app.services.zodiac_service import Zodiac, parse_zodiac
+
 
 # =========================
 # 1) Natija strukturalari
@@ -132,27 +134,36 @@ def normalize_key(value: str) -> str:
     return value.strip()
 
 
-def get_profile(boy_zodiac: str, girl_zodiac: str) -> ResultProfile:
+def _build_profile_table() -> Tuple[Tuple[ResultProfile, ...], ...]:
     """
-    Asosiy funksiya:
-    - (boy, girl) juftlik bo‘yicha profil qidiradi
-    - topilmasa fallback qaytaradi
+    PROFILES (har qanday yozilishdagi kalitlar) -> 12x12 jadval [boy][girl].
+    Juftlik topilmasa teskari juftlik, u ham bo'lmasa DEFAULT_PROFILE.
     """
-    k1 = normalize_key(boy_zodiac)
-    k2 = normalize_key(girl_zodiac)
+    table = [[DEFAULT_PROFILE] * len(Zodiac) for _ in Zodiac]
+    # avval teskari juftliklar, keyin aniq juftliklar (aniq juftlik ustun)
+    for reverse in (True, False):
+        for (k1, k2), profile in PROFILES.items():
+            b, g = parse_zodiac(k1), parse_zodiac(k2)
+            if b is None or g is None:
+                continue
+            if reverse:
+                b, g = g, b
+            table[b][g] = profile
+    return tuple(tuple(row) for row in table)
 
-    # 1) aniq juftlik
-    profile = PROFILES.get((k1, k2))
-    if profile:
-        return profile
 
-    # 2) teskari juftlik (ba’zan ikkala yo‘nalishda ham ishlatib yuborish mumkin)
-    profile = PROFILES.get((k2, k1))
-    if profile:
-        return profile
-
-    # 3) default
-    return DEFAULT_PROFILE
+def get_profile(boy_zodiac: str, girl_zodiac: str) -> ResultProfile:
+    """
+    Asosiy funksiya:
+    - burjlarni kanonik Zodiac ga o'giradi (o'zbek/ingliz/rus yozilishlari)
+    - PROFILE_TABLE[boy][girl] (aniq juftlik, bo'lmasa teskari juftlik)
+    - noma'lum burj bo'lsa fallback qaytaradi
+    """
+    b = parse_zodiac(boy_zodiac)
+    g = parse_zodiac(girl_zodiac)
+    if b is None or g is None:
+        return DEFAULT_PROFILE
+    return PROFILE_TABLE[b][g]
 
 
 def get_profile_dict(boy_zodiac: str, girl_zodiac: str) -> dict:
@@ -165,3 +176,7 @@ def get_profile_dict(boy_zodiac: str, girl_zodiac: str) -> dict:
         "block1": {"title": p.block1.title, "text": p.block1.text, "bullets": p.block1.bullets},
         "block2": {"title": p.block2.title, "text": p.block2.text, "bullets": p.block2.bullets},
     }
+
+
+# PROFILES to'liq to'ldirilgandan keyin (modul oxirida) quriladi
+PROFILE_TABLE = _build_profile_table()
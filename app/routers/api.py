@@ -1,13 +1,18 @@
 # app/routers/api.py
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
+import hmac
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.database import get_db
+from app.core import config, http_cache
+from app.db import crud_async
+from app.db.database import get_async_db
 from app.services.invite_service import CreateInviteDTO
-from app.services import invite_service, quiz_service
+from app.services import invite_service_async as invite_service
+from app.services import quiz_service_async as quiz_service
 
 router = APIRouter(prefix="/api", tags=["api"])
 
@@ -18,6 +23,8 @@ class InviteCreateIn(BaseModel):
     boy_age: int = Field(..., ge=14, le=99)
     boy_zodiac: str = Field(..., min_length=2, max_length=30)
     message: str | None = Field(default=None, max_length=500)
+    # bot orqali yaratilsa: natija tayyor bo'lganda shu chatga xabar yuboriladi
+    telegram_chat_id: int | None = None
 
 
 class InviteOut(BaseModel):
@@ -33,14 +40,15 @@ class InviteOut(BaseModel):
 
 # -------- Endpoints --------
 @router.post("/invites", response_model=InviteOut)
-def api_create_invite(payload: InviteCreateIn, db: Session = Depends(get_db)):
-    inv = invite_service.create_invite(
+async def api_create_invite(payload: InviteCreateIn, db: AsyncSession = Depends(get_async_db)):
+    inv = await invite_service.create_invite(
         db,
         CreateInviteDTO(
             boy_name=payload.boy_name,
             boy_age=payload.boy_age,
             boy_zodiac=payload.boy_zodiac,
             message=payload.message,
+            telegram_chat_id=payload.telegram_chat_id,
         ),
     )
     return InviteOut(
@@ -56,12 +64,22 @@ def api_create_invite(payload: InviteCreateIn, db: Session = Depends(get_db)):
 
 
 @router.get("/invites/{token}", response_model=InviteOut)
-def api_get_invite(token: str, db: Session = Depends(get_db)):
+async def api_get_invite(
+    token: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+):
     try:
-        inv = invite_service.get_invite_by_token_or_404(db, token)
+        inv = await invite_service.get_invite_by_token_or_404(db, token)
     except Exception:
         raise HTTPException(status_code=404, detail="Invite topilmadi")
 
+    cache_headers = http_cache.invite_cache_headers(inv, "api-invite")
+    if http_cache.is_not_modified(request, cache_headers):
+        return http_cache.not_modified_response(cache_headers)
+    response.headers.update(cache_headers)
+
     return InviteOut(
         token=inv.token,
         status=inv.status.value,
@@ -75,21 +93,54 @@ def api_get_invite(token: str, db: Session = Depends(get_db)):
 
 
 @router.get("/result/{token}")
-def api_get_result(token: str, db: Session = Depends(get_db)):
+async def api_get_result(
+    token: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+):
     """
     JSON natija (bot/frontend uchun qulay).
-    profile = scoring_service.build_profile(...) dan keladi.
+    profile = scoring_service.build_profile(...) dan keladi,
+    finished bo'lgach Invite.result_data dan o'qiladi.
     """
     try:
-        inv = invite_service.get_invite_by_token_or_404(db, token)
+        inv = await invite_service.get_invite_by_token_or_404(db, token)
     except Exception:
         raise HTTPException(status_code=404, detail="Invite topilmadi")
 
-    profile = quiz_service.get_profile_for_invite(db, token)
+    cache_headers = http_cache.invite_cache_headers(inv, "api-result")
+    if http_cache.is_not_modified(request, cache_headers):
+        return http_cache.not_modified_response(cache_headers)
+    response.headers.update(cache_headers)
+
+    # finished invite: natija invite qatorida saqlangan (qo'shimcha so'rov yo'q)
+    result = await quiz_service.get_result_for_invite(db, inv)
     return {
         "token": inv.token,
         "status": inv.status.value,
         "boy": {"name": inv.boy_name, "age": inv.boy_age, "zodiac": inv.boy_zodiac},
         "girl": {"name": inv.girl_name, "age": inv.girl_age, "zodiac": inv.girl_zodiac},
-        "profile": profile,  # summary + bullets + tip
+        "profile": result["profile"],  # summary + bullets + tip
+        "dimensions": result.get("dimensions"),  # care/trust/romance/space/communication/attention
+        "zodiac": result["zodiac"],
+        "blocks": result["blocks"],
     }
+
+
+@router.get("/stats")
+async def api_stats(
+    days: int = Query(default=30, ge=1, le=366),
+    key: str = "",
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Funnel statistikasi (faqat o'qish): kunlik created/opened/paid/finished.
+    funnel_daily rollup'dan olinadi - invites jadvali skan qilinmaydi.
+    """
+    if config.STATS_TOKEN and not hmac.compare_digest(key, config.STATS_TOKEN):
+        raise HTTPException(status_code=403, detail="Ruxsat yo'q")
+
+    rows = await crud_async.get_funnel_stats(db, days)
+    totals = {m: sum(r[m] for r in rows) for m in ("created", "opened", "paid", "finished")}
+    return {"days": rows, "totals": totals}
@@ -3,46 +3,47 @@ from __future__ import annotations
 
 from fastapi import APIRouter, Request, Form, Depends
 from fastapi.responses import RedirectResponse, HTMLResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.database import get_db
+from app.core import http_cache
+from app.core.templates import templates
+from app.db.database import get_async_db
 from app.services.invite_service import CreateInviteDTO
-from app.services import invite_service
+from app.services import invite_service_async as invite_service
 from app.services.zodiac_service import zodiac_compatibility
+from app.services.quiz_service import load_result
 
 # ✅ Yangi: 2-blokli profil generator
 from app.profiles import get_profile  # yoki get_profile_dict
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 # ✅ PROD domen (hozir Render)
 BASE_URL = "https://sevgi-testi-7jd2.onrender.com"
 
 
 @router.get("/", response_class=HTMLResponse)
-def index(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+async def index(request: Request):
+    return templates.TemplateResponse(request, "index.html")
 
 
 # ---------- BOY (User1) ----------
 @router.get("/start", response_class=HTMLResponse)
-def boy_form(request: Request):
-    return templates.TemplateResponse("boy_form.html", {"request": request})
+async def boy_form(request: Request):
+    return templates.TemplateResponse(request, "boy_form.html")
 
 
 @router.post("/start")
-def boy_submit(
+async def boy_submit(
     request: Request,
     boy_name: str = Form(...),
     boy_age: int = Form(...),
     boy_zodiac: str = Form(...),
     message: str | None = Form(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     # Invite yaratamiz (token avtomatik)
-    inv = invite_service.create_invite(
+    inv = await invite_service.create_invite(
         db,
         CreateInviteDTO(
             boy_name=boy_name,
@@ -58,42 +59,49 @@ def boy_submit(
 
 # ---------- SHARE (User1 linkni ko'chirib yuboradi) ----------
 @router.get("/share/{token}", response_class=HTMLResponse)
-def share_page(request: Request, token: str, db: Session = Depends(get_db)):
-    inv = invite_service.get_invite_by_token_or_404(db, token)
+async def share_page(request: Request, token: str, db: AsyncSession = Depends(get_async_db)):
+    inv = await invite_service.get_invite_by_token_or_404(db, token)
+
+    cache_headers = http_cache.invite_cache_headers(inv, "share")
+    if http_cache.is_not_modified(request, cache_headers):
+        return http_cache.not_modified_response(cache_headers)
 
     # ✅ Qizga yuboriladigan to‘liq link (absolute)
     girl_link = f"{BASE_URL}/girl/{token}"
 
     return templates.TemplateResponse(
+        request,
         "share.html",
         {
-            "request": request,
             "invite": inv,
             "girl_link": girl_link,
         },
+        headers=cache_headers,
     )
 
 
 # ---------- GIRL (User2) ----------
 @router.get("/girl/{token}", response_class=HTMLResponse)
-def girl_form(request: Request, token: str, db: Session = Depends(get_db)):
-    inv = invite_service.get_invite_by_token_or_404(db, token)
+async def girl_form(request: Request, token: str, db: AsyncSession = Depends(get_async_db)):
+    # muddati o'tgan taklif - POST /girl va /i/{token} kabi 410 sahifasi
+    inv = await invite_service.get_active_invite_by_token_or_404(db, token)
     return templates.TemplateResponse(
+        request,
         "girl_form.html",
-        {"request": request, "invite": inv},
+        {"invite": inv},
     )
 
 
 @router.post("/girl/{token}")
-def girl_submit(
+async def girl_submit(
     request: Request,
     token: str,
     girl_name: str = Form(...),
     girl_age: int = Form(...),
     girl_zodiac: str = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    invite_service.set_girl_profile(
+    await invite_service.set_girl_profile(
         db,
         token=token,
         girl_name=girl_name,
@@ -107,21 +115,33 @@ def girl_submit(
 
 # ---------- RESULT (User1 ko'radi) ----------
 @router.get("/result/{token}", response_class=HTMLResponse)
-def result(request: Request, token: str, db: Session = Depends(get_db)):
-    inv = invite_service.get_invite_by_token_or_404(db, token)
-
-    # ✅ Yangi: 2 ta blokli natija (romantika + ishonch/amal)
-    profile = get_profile(inv.boy_zodiac, inv.girl_zodiac or "")
-
-    # Burj mosligi (boy_zodiac + girl_zodiac)
-    z = zodiac_compatibility(inv.boy_zodiac, inv.girl_zodiac or "")
+async def result(request: Request, token: str, db: AsyncSession = Depends(get_async_db)):
+    inv = await invite_service.get_invite_by_token_or_404(db, token)
+
+    # Telegram preview va qayta yuklashlar: o'zgarmagan bo'lsa render qilmaymiz
+    cache_headers = http_cache.invite_cache_headers(inv, "result")
+    if http_cache.is_not_modified(request, cache_headers):
+        return http_cache.not_modified_response(cache_headers)
+
+    saved = load_result(inv)
+    if saved is not None:
+        # finished: natija invite bilan birga saqlangan
+        profile = saved["blocks"]
+        z = saved["zodiac"]
+    else:
+        # ✅ Yangi: 2 ta blokli natija (romantika + ishonch/amal)
+        profile = get_profile(inv.boy_zodiac, inv.girl_zodiac or "")
+
+        # Burj mosligi (boy_zodiac + girl_zodiac)
+        z = zodiac_compatibility(inv.boy_zodiac, inv.girl_zodiac or "")
 
     return templates.TemplateResponse(
+        request,
         "result.html",
         {
-            "request": request,
             "invite": inv,  # oldingi "session" o'rniga "invite"
             "profile": profile,
             "zodiac": z,
         },
+        headers=cache_headers,
     )
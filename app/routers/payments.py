@@ -1,26 +1,77 @@
-from fastapi import APIRouter, Request, Depends
+# app/routers/payments.py
+from fastapi import APIRouter, Request, Depends, Form, HTTPException
 from fastapi.responses import RedirectResponse, HTMLResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.database import get_db
-from app.db import crud
+from app.core import config
+from app.core.templates import templates
+from app.db.database import get_async_db
+from app.services import invite_service_async as invite_service
+from app.services import payment_service
+from app.services.payment_service import (
+    PaymentError, PaymentNotConfigured, WebhookRejected, WebhookSignatureError,
+)
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 
-@router.get("/pay/{session_id}", response_class=HTMLResponse)
-def pay_page(request: Request, session_id: int, db: Session = Depends(get_db)):
-    s = crud.get_session(db, session_id)
-    if not s:
-        return templates.TemplateResponse("success.html", {"request": request, "message": "Session topilmadi"})
+@router.get("/pay/{token}", response_class=HTMLResponse)
+async def pay_page(request: Request, token: str, db: AsyncSession = Depends(get_async_db)):
+    inv = await invite_service.get_invite_by_token_or_404(db, token)
+    return templates.TemplateResponse(
+        request,
+        "pay.html",
+        {
+            "invite": inv,
+            "amount": config.PAYMENT_AMOUNT,
+            "providers": payment_service.enabled_providers(),
+        },
+    )
 
-    return templates.TemplateResponse("pay.html", {"request": request, "session": s, "amount": 14999})
 
+@router.post("/pay/{token}")
+async def pay_submit(
+    request: Request,
+    token: str,
+    provider: str = Form("demo"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    inv = await invite_service.get_invite_by_token_or_404(db, token)
+    try:
+        checkout = await payment_service.start_checkout(
+            db, inv, provider, return_url=f"{request.base_url}share/{token}"
+        )
+    except PaymentError as e:
+        await db.rollback()
+        return templates.TemplateResponse(
+            request,
+            "success.html",
+            {"message": f"To'lovni boshlab bo'lmadi: {e}"},
+            status_code=502,
+        )
 
-@router.post("/pay/{session_id}")
-def pay_submit(request: Request, session_id: int, db: Session = Depends(get_db)):
-    p = crud.create_payment(db, session_id=session_id, amount=14999, provider="demo")
-    crud.mark_payment_paid(db, p.id)
-    return RedirectResponse(url=f"/girl/{session_id}", status_code=303)
+    if checkout.paid:
+        return RedirectResponse(url=f"/share/{token}", status_code=303)
+    # payme/click checkout sahifasi; paid bo'lishi webhook orqali keladi
+    return RedirectResponse(url=checkout.redirect_url, status_code=303)
+
+
+@router.post("/payments/webhook/{provider}")
+async def payment_webhook(request: Request, provider: str, db: AsyncSession = Depends(get_async_db)):
+    """
+    Provider -> bizga: to'lov holati. provider_txn_id bo'yicha idempotent
+    (takroriy yuborilsa {"result": "duplicate"}).
+    """
+    body = await request.body()
+    try:
+        result = await payment_service.handle_webhook(
+            db, provider, body, request.headers.get("X-Signature", "")
+        )
+    except PaymentNotConfigured as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except WebhookSignatureError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except WebhookRejected as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"ok": True, "result": result}
@@ -2,12 +2,14 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta
 import secrets
 from typing import Optional
 
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from app.core import config, security
 from app.db import crud
 from app.db.models import Invite, InviteStatus
 
@@ -31,6 +33,10 @@ class InviteInvalidStatus(InviteError):
     pass
 
 
+class InviteExpired(InviteError):
+    pass
+
+
 # ----------------------------
 # DTO (ixtiyoriy, lekin qulay)
 # ----------------------------
@@ -40,22 +46,22 @@ class CreateInviteDTO:
     boy_age: int
     boy_zodiac: str
     message: Optional[str] = None
+    telegram_chat_id: Optional[int] = None
 
 
 # ----------------------------
 # Token generator
 # ----------------------------
-def generate_unique_token(db: Session, length_hint: int = 22, max_tries: int = 8) -> str:
+TOKEN_MAX_TRIES = 8
+
+
+def generate_token(length_hint: int = 22) -> str:
     """
-    Token: link uchun unikal string.
+    Token: link uchun tasodifiy string.
     secrets.token_urlsafe(n) -> URL-safe token qaytaradi.
+    Unikalligini DB (invites.token unique) kafolatlaydi - oldindan SELECT qilinmaydi.
     """
-    for _ in range(max_tries):
-        token = secrets.token_urlsafe(length_hint)[:80]  # DB column String(80)
-        exists = crud.get_invite_by_token(db, token)
-        if not exists:
-            return token
-    raise InviteError("Token yaratib bo'lmadi (unique). Qayta urinib ko'ring.")
+    return secrets.token_urlsafe(length_hint)[:80]  # DB column String(80)
 
 
 # ----------------------------
@@ -66,6 +72,24 @@ def _ensure_not_finished(inv: Invite) -> None:
         raise InviteAlreadyFinished("Invite allaqachon yakunlangan.")
 
 
+def is_expired(inv: Invite, now: Optional[datetime] = None) -> bool:
+    """
+    expired status yoki TTL o'tgan, hali ochilmagan (created) invite.
+    Fon vazifasi statusni keyinroq yozadi - bu yerda darhol hisoblanadi.
+    """
+    if inv.status == InviteStatus.expired:
+        return True
+    if inv.status != InviteStatus.created or config.INVITE_TTL_DAYS <= 0:
+        return False
+    now = now or datetime.utcnow()
+    return inv.created_at < now - timedelta(days=config.INVITE_TTL_DAYS)
+
+
+def _ensure_not_expired(inv: Invite) -> None:
+    if is_expired(inv):
+        raise InviteExpired("Taklif muddati tugagan.")
+
+
 def _touch(inv: Invite) -> None:
     inv.updated_at = datetime.utcnow()
 
@@ -76,17 +100,26 @@ def _touch(inv: Invite) -> None:
 def create_invite(db: Session, data: CreateInviteDTO) -> Invite:
     """
     User1: taklif yaratadi -> token + InviteStatus.created
+    INVITE_TOKEN_SECRET bo'lsa token imzolangan formatda bo'ladi (id + HMAC).
+
+    Optimistik: to'g'ridan-to'g'ri INSERT qilinadi, token to'qnashsa
+    (IntegrityError) yangi token bilan qayta urinamiz. Oddiy holatda - bitta INSERT.
     """
-    token = generate_unique_token(db)
-    inv = crud.create_invite(
-        db=db,
-        boy_name=data.boy_name,
-        boy_age=data.boy_age,
-        boy_zodiac=data.boy_zodiac,
-        token=token,
-        message=data.message,
-    )
-    return inv
+    for _ in range(TOKEN_MAX_TRIES):
+        try:
+            return crud.create_invite(
+                db=db,
+                boy_name=data.boy_name,
+                boy_age=data.boy_age,
+                boy_zodiac=data.boy_zodiac,
+                token=generate_token(),
+                message=data.message,
+                sign_token=security.sign_invite_token if security.signing_enabled() else None,
+                telegram_chat_id=data.telegram_chat_id,
+            )
+        except IntegrityError:
+            db.rollback()
+    raise InviteError("Token yaratib bo'lmadi (unique). Qayta urinib ko'ring.")
 
 
 def get_invite_by_token_or_404(db: Session, token: str) -> Invite:
@@ -96,18 +129,27 @@ def get_invite_by_token_or_404(db: Session, token: str) -> Invite:
     return inv
 
 
+def get_active_invite_by_token_or_404(db: Session, token: str) -> Invite:
+    """
+    User2 sahifalari uchun: topilmasa InviteNotFound, muddati o'tgan bo'lsa InviteExpired (410).
+    """
+    inv = get_invite_by_token_or_404(db, token)
+    _ensure_not_expired(inv)
+    return inv
+
+
 def open_invite(db: Session, token: str) -> Invite:
     """
     User2 linkni ochdi: status created/paid bo'lsa -> opened
     """
     inv = get_invite_by_token_or_404(db, token)
     _ensure_not_finished(inv)
+    _ensure_not_expired(inv)
 
     # Status flow: created/paid -> opened
     if inv.status in (InviteStatus.created, InviteStatus.paid):
         inv = crud.mark_invite_opened(db, inv.id)
     # opened bo'lsa - o'zgarmaydi
-    # boshqa holat bo'lsa ham hozircha jim (masalan: future: expired)
     return inv
 
 
@@ -117,6 +159,7 @@ def set_girl_profile(db: Session, token: str, girl_name: str, girl_age: int, gir
     """
     inv = get_invite_by_token_or_404(db, token)
     _ensure_not_finished(inv)
+    _ensure_not_expired(inv)
 
     inv = crud.set_girl_data_by_token(
         db=db,
@@ -0,0 +1,56 @@
+# app/services/invite_service_async.py
+"""
+invite_service ning async versiyasi (AsyncSession bilan).
+Biznes-logika invite_service.py da qoladi, bu yerda faqat run_sync orqali chaqiriladi.
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Invite
+from app.services import invite_service
+from app.services.invite_service import CreateInviteDTO
+
+
+async def create_invite(db: AsyncSession, data: CreateInviteDTO) -> Invite:
+    return await db.run_sync(invite_service.create_invite, data)
+
+
+async def get_invite_by_token_or_404(db: AsyncSession, token: str) -> Invite:
+    return await db.run_sync(invite_service.get_invite_by_token_or_404, token)
+
+
+async def get_active_invite_by_token_or_404(db: AsyncSession, token: str) -> Invite:
+    return await db.run_sync(invite_service.get_active_invite_by_token_or_404, token)
+
+
+async def open_invite(db: AsyncSession, token: str) -> Invite:
+    return await db.run_sync(invite_service.open_invite, token)
+
+
+async def set_girl_profile(
+    db: AsyncSession, token: str, girl_name: str, girl_age: int, girl_zodiac: str
+) -> Invite:
+    return await db.run_sync(
+        invite_service.set_girl_profile,
+        token=token,
+        girl_name=girl_name,
+        girl_age=girl_age,
+        girl_zodiac=girl_zodiac,
+    )
+
+
+async def finish_invite(
+    db: AsyncSession,
+    invite_id: int,
+    result_summary: Optional[str] = None,
+    zodiac_score: Optional[int] = None,
+) -> Invite:
+    return await db.run_sync(
+        invite_service.finish_invite,
+        invite_id=invite_id,
+        result_summary=result_summary,
+        zodiac_score=zodiac_score,
+    )
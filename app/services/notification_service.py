@@ -0,0 +1,225 @@
+# app/services/notification_service.py
+"""
+Telegram xabarnomalari: invite finished bo'lganda user1 ga natija linki.
+
+So'rov yo'lida hech narsa yuborilmaydi:
+    submit_quiz_by_token -> outbox "invite.finished" -> on_invite_finished (outbox worker)
+    -> TelegramDispatcher navbati (chegaralangan asyncio.Queue) -> Bot API sendMessage
+
+Dispatcher:
+- bitta aiohttp.ClientSession (pool, keep-alive) butun process uchun;
+- navbatdan batch (TELEGRAM_BATCH_SIZE gacha) olib, bir vaqtda yuboradi
+  (Bot API'da batch endpoint yo'q - batch = bitta session ustida parallel so'rovlar);
+- token bucket (TELEGRAM_RATE xabar/soniya) - Bot API limitidan oshmaslik uchun;
+- 429 bo'lsa retry_after kutiladi, 5xx/tarmoq xatosida qisqa backoff bilan qayta urinadi
+  (proxy'ning HTML 502 sahifasi kabi JSON bo'lmagan javob ham 5xx sifatida);
+- bitta xabardagi kutilmagan xato faqat o'sha xabarni failed qiladi - _run to'xtamaydi.
+Navbat to'la bo'lsa on_invite_finished xato beradi -> outbox hodisani keyinroq qayta beradi.
+"""
+from __future__ import annotations
+
+import asyncio
+import html
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import aiohttp
+
+from app.core import config
+from app.db.models import Invite
+
+log = logging.getLogger(__name__)
+
+SEND_MAX_TRIES = 4
+
+
+@dataclass(frozen=True)
+class Notification:
+    chat_id: int
+    text: str
+
+
+class TokenBucket:
+    """`rate` token/soniya, eng ko'pi `capacity` token to'planadi."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class TelegramDispatcher:
+    def __init__(
+        self,
+        bot_token: str,
+        api_url: str = "https://api.telegram.org",
+        queue_size: int = 1000,
+        batch_size: int = 20,
+        rate: float = 25.0,
+    ):
+        self.url = f"{api_url.rstrip('/')}/bot{bot_token}/sendMessage"
+        self.queue: asyncio.Queue[Notification] = asyncio.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.bucket = TokenBucket(rate)
+        self.sent = 0
+        self.failed = 0
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ---- lifecycle ----
+    async def start(self) -> None:
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.batch_size, keepalive_timeout=30),
+            timeout=aiohttp.ClientTimeout(total=10, connect=3),
+        )
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, drain_timeout: float = 5.0) -> None:
+        """Navbatdagilarni drain_timeout gacha yuborib, session'ni yopadi."""
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout=drain_timeout)
+            except asyncio.TimeoutError:
+                log.warning("telegram: %s ta xabar yuborilmay qoldi", self.queue.qsize())
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    # ---- navbat ----
+    def submit(self, n: Notification) -> bool:
+        """Bloklamaydi: navbat to'la bo'lsa False."""
+        try:
+            self.queue.put_nowait(n)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                results = await asyncio.gather(*(self._send(n) for n in batch), return_exceptions=True)
+                for n, result in zip(batch, results):
+                    if isinstance(result, Exception):
+                        self.failed += 1
+                        log.error("telegram: chat %s ga yuborishda xato", n.chat_id, exc_info=result)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _send(self, n: Notification) -> None:
+        payload = {"chat_id": n.chat_id, "text": n.text, "parse_mode": "HTML",
+                   "disable_web_page_preview": True}
+        for attempt in range(1, SEND_MAX_TRIES + 1):
+            await self.bucket.acquire()
+            try:
+                async with self._session.post(self.url, json=payload) as resp:
+                    if resp.status == 200:
+                        self.sent += 1
+                        return
+                    data = await _json_or_empty(resp)
+                    if resp.status == 429:
+                        retry_after = (data.get("parameters") or {}).get("retry_after", 1)
+                        await asyncio.sleep(float(retry_after))
+                        continue
+                    if resp.status < 500:
+                        # 400/403 (chat topilmadi, bot bloklangan) - qayta urinish foydasiz
+                        log.warning("telegram %s: %s", resp.status, data.get("description"))
+                        break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                log.warning("telegram tarmoq xatosi: %r", e)
+            await asyncio.sleep(0.5 * 2 ** (attempt - 1))
+        self.failed += 1
+
+
+async def _json_or_empty(resp: aiohttp.ClientResponse) -> dict:
+    """Xato javob tanasi: JSON bo'lmasa (proxy/CDN HTML sahifasi) - {}."""
+    try:
+        data = await resp.json(content_type=None)
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+# ----------------------------
+# Outbox handler
+# ----------------------------
+dispatcher: Optional[TelegramDispatcher] = None
+
+
+def finished_message(inv: Invite) -> str:
+    girl = html.escape(inv.girl_name or "U")
+    link = f"{config.PUBLIC_BASE_URL}/result/{inv.token}"
+    lines = [f"💌 <b>{girl}</b> savollarga javob berdi!"]
+    if inv.result_summary:
+        lines.append(html.escape(inv.result_summary))
+    lines.append(f'<a href="{link}">Natijani ko‘rish</a>')
+    return "\n\n".join(lines)
+
+
+async def on_invite_finished(payload: dict) -> None:
+    if dispatcher is None:
+        return
+    from app.db.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        inv = await db.get(Invite, payload["invite_id"])
+    if inv is None or inv.telegram_chat_id is None:
+        return
+    if not dispatcher.submit(Notification(inv.telegram_chat_id, finished_message(inv))):
+        # outbox backoff bilan qayta beradi
+        raise RuntimeError("telegram navbati to'la")
+
+
+async def start_notifications() -> Optional[TelegramDispatcher]:
+    """Lifespan: token bo'lsa dispatcher + outbox handler."""
+    global dispatcher
+    if not config.TELEGRAM_BOT_TOKEN:
+        return None
+    from app.services import outbox_service
+
+    dispatcher = TelegramDispatcher(
+        config.TELEGRAM_BOT_TOKEN,
+        api_url=config.TELEGRAM_API_URL,
+        queue_size=config.TELEGRAM_QUEUE_SIZE,
+        batch_size=config.TELEGRAM_BATCH_SIZE,
+        # umumiy Bot API limiti barcha worker'larga bo'linadi
+        rate=config.TELEGRAM_RATE / config.APP_WORKERS,
+    )
+    await dispatcher.start()
+    outbox_service.register("invite.finished")(on_invite_finished)
+    return dispatcher
+
+
+async def stop_notifications() -> None:
+    global dispatcher
+    if dispatcher is None:
+        return
+    from app.services import outbox_service
+
+    outbox_service.unregister("invite.finished", on_invite_finished)
+    await dispatcher.stop()
+    dispatcher = None
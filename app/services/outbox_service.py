@@ -0,0 +1,218 @@
+# app/services/outbox_service.py
+"""
+Outbox worker: outbox_events jadvalidagi hodisalarni fonda bajaradi.
+
+Hodisa crud.add_outbox orqali status o'zgarishi bilan bitta tranzaksiyada yoziladi
+(crud.apply_payment_paid -> "payment.paid", crud.apply_invite_finished -> "invite.finished").
+So'rov faqat bitta INSERT qo'shadi - yon ta'sirlar qancha ko'paysa ham latency o'zgarmaydi.
+
+Handler qo'shish:
+
+    @outbox_service.register("invite.finished")
+    async def notify(payload: dict) -> None: ...
+
+Worker (lifespan'dagi asyncio task) batch'larda ishlaydi:
+- claim: pending + vaqti kelgan hodisalar shartli UPDATE bilan "ijaraga" olinadi
+  (available_at = now + lease, attempts += 1) - bir nechta process bo'lsa ham bitta hodisa
+  bir vaqtda bitta worker'da;
+- handler xato bersa: eksponensial backoff + jitter, OUTBOX_MAX_ATTEMPTS dan keyin dead;
+- commit'da yangi hodisa bo'lsa worker darhol uyg'otiladi (poll kutilmaydi).
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import random
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from app.core import config
+from app.db.models import OutboxEvent, OutboxStatus
+
+log = logging.getLogger(__name__)
+
+Handler = Callable[[dict], Awaitable[None]]
+
+_handlers: dict[str, list[Handler]] = defaultdict(list)
+
+
+def register(topic: str) -> Callable[[Handler], Handler]:
+    def deco(fn: Handler) -> Handler:
+        _handlers[topic].append(fn)
+        return fn
+    return deco
+
+
+def unregister(topic: str, fn: Handler) -> None:
+    if fn in _handlers.get(topic, ()):
+        _handlers[topic].remove(fn)
+
+
+# ----------------------------
+# DB qismi (sync, run_sync orqali)
+# ----------------------------
+@dataclass(frozen=True)
+class ClaimedEvent:
+    id: int
+    topic: str
+    payload: dict
+    attempts: int
+
+
+def backoff_seconds(attempts: int) -> float:
+    """1 -> ~2s, 2 -> ~4s, ... (1 soat bilan cheklangan), +-20% jitter."""
+    return min(2.0 ** attempts, 3600.0) * random.uniform(0.8, 1.2)
+
+
+def claim_batch(db: Session, now: datetime, limit: int, lease_seconds: int) -> list[ClaimedEvent]:
+    ids = list(db.scalars(
+        select(OutboxEvent.id)
+        .where(OutboxEvent.status == OutboxStatus.pending, OutboxEvent.available_at <= now)
+        .order_by(OutboxEvent.id)
+        .limit(limit)
+    ))
+    if not ids:
+        return []
+
+    # boshqa worker ulgurib olgan qatorlar shart bo'yicha tushib qoladi
+    rows = db.execute(
+        update(OutboxEvent)
+        .where(
+            OutboxEvent.id.in_(ids),
+            OutboxEvent.status == OutboxStatus.pending,
+            OutboxEvent.available_at <= now,
+        )
+        .values(
+            available_at=now + timedelta(seconds=lease_seconds),
+            attempts=OutboxEvent.attempts + 1,
+        )
+        .returning(OutboxEvent.id, OutboxEvent.topic, OutboxEvent.payload, OutboxEvent.attempts)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return [ClaimedEvent(i, topic, json.loads(payload), attempts) for i, topic, payload, attempts in rows]
+
+
+def finish_batch(
+    db: Session,
+    results: list[tuple[ClaimedEvent, Optional[str]]],
+    now: datetime,
+    max_attempts: int,
+) -> None:
+    done = [ev.id for ev, err in results if err is None]
+    if done:
+        db.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_(done))
+            .values(status=OutboxStatus.done, processed_at=now, last_error=None)
+            .execution_options(synchronize_session=False)
+        )
+    for ev, err in results:
+        if err is None:
+            continue
+        values = {"last_error": err[:500]}
+        if ev.attempts >= max_attempts:
+            values.update(status=OutboxStatus.dead, processed_at=now)
+        else:
+            values["available_at"] = now + timedelta(seconds=backoff_seconds(ev.attempts))
+        db.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id == ev.id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+
+
+# ----------------------------
+# Worker
+# ----------------------------
+async def _run_handlers(ev: ClaimedEvent) -> Optional[str]:
+    try:
+        for handler in list(_handlers.get(ev.topic, ())):
+            await handler(ev.payload)
+    except Exception as e:
+        log.warning("outbox #%s (%s) xato: %r", ev.id, ev.topic, e)
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+async def drain_once(session_factory=None, now: Optional[datetime] = None) -> int:
+    """Bitta batch: claim -> handlerlar (parallel) -> natijalarni yozish. Olingan hodisalar soni."""
+    if session_factory is None:
+        from app.db.database import AsyncSessionLocal as session_factory
+
+    async with session_factory() as db:
+        events = await db.run_sync(
+            claim_batch,
+            now or datetime.utcnow(),
+            config.OUTBOX_BATCH_SIZE,
+            config.OUTBOX_LEASE_SECONDS,
+        )
+        if not events:
+            return 0
+        errors = await asyncio.gather(*(_run_handlers(ev) for ev in events))
+        await db.run_sync(
+            finish_batch,
+            list(zip(events, errors)),
+            datetime.utcnow(),
+            config.OUTBOX_MAX_ATTEMPTS,
+        )
+    return len(events)
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_wake: Optional[asyncio.Event] = None
+_stopping = False
+
+
+def wake() -> None:
+    """Worker'ni uyg'otish (istalgan thread'dan chaqirish mumkin)."""
+    if _loop is not None and _wake is not None and not _loop.is_closed():
+        _loop.call_soon_threadsafe(_wake.set)
+
+
+def request_stop() -> None:
+    """Worker joriy batch'ni tugatib chiqadi (DB so'rovi o'rtasida cancel qilinmaydi)."""
+    global _stopping
+    _stopping = True
+    wake()
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_on_outbox_commit(session: Session) -> None:
+    if session.info.pop("outbox_dirty", False):
+        wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _clear_outbox_flag(session: Session) -> None:
+    session.info.pop("outbox_dirty", None)
+
+
+async def outbox_worker(poll_interval: float) -> None:
+    """Lifespan fon vazifasi: navbat bo'sh bo'lsa poll_interval yoki wake() gacha kutadi."""
+    global _loop, _wake, _stopping
+    _loop = asyncio.get_running_loop()
+    _wake = asyncio.Event()
+    _stopping = False
+    try:
+        while not _stopping:
+            _wake.clear()
+            try:
+                if await drain_once():
+                    continue
+            except Exception:
+                log.exception("outbox worker xatosi")
+            try:
+                await asyncio.wait_for(_wake.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        _loop = _wake = None
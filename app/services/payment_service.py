@@ -0,0 +1,251 @@
+# app/services/payment_service.py
+"""
+To'lovlar: demo / payme / click (demo faqat PAYMENT_DEMO_ENABLED=1 bo'lsa).
+
+- Provider API'ga so'rovlar bitta umumiy aiohttp.ClientSession orqali (ulanishlar pool'i,
+  keep-alive, connect/total timeout). Session lifespan yopilganda yopiladi.
+- Chiquvchi so'rov va kiruvchi webhook tanasi HMAC-SHA256 (provider secret) bilan imzolanadi:
+  X-Signature: hex(hmac(secret, body)).
+- Webhook maydonlari (order_id, amount) butun son sifatida tekshiriladi - noto'g'ri qiymat
+  WebhookRejected (400), 500 emas. Rad etilgan webhook bazaga hech narsa yozmaydi: txn faqat
+  barcha tekshiruvlardan keyin, paid/failed bilan bitta tranzaksiyada bog'lanadi.
+- Webhook provider_txn_id bo'yicha idempotent: payment/invite paid bo'lishi
+  crud.apply_payment_paid dagi shartli UPDATE orqali - takroriy webhook hech narsa yozmaydi.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import json
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import aiohttp
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core import config
+from app.db import crud, crud_async
+from app.db.models import Invite, PaymentProvider, PaymentStatus
+
+
+# ----------------------------
+# Errors
+# ----------------------------
+class PaymentError(Exception):
+    pass
+
+
+class PaymentNotConfigured(PaymentError):
+    pass
+
+
+class WebhookSignatureError(PaymentError):
+    pass
+
+
+class WebhookRejected(PaymentError):
+    pass
+
+
+# ----------------------------
+# Provider sozlamalari
+# ----------------------------
+@dataclass(frozen=True)
+class ProviderSettings:
+    name: str
+    api_url: str
+    merchant_id: str
+    secret_key: str
+
+
+def provider_settings(provider: str) -> Optional[ProviderSettings]:
+    """payme/click sozlamalari (API_URL bo'sh bo'lsa - provider o'chiq)."""
+    if provider == PaymentProvider.payme.value:
+        s = ProviderSettings(provider, config.PAYME_API_URL, config.PAYME_MERCHANT_ID, config.PAYME_SECRET_KEY)
+    elif provider == PaymentProvider.click.value:
+        s = ProviderSettings(provider, config.CLICK_API_URL, config.CLICK_MERCHANT_ID, config.CLICK_SECRET_KEY)
+    else:
+        return None
+    return s if s.api_url else None
+
+
+def enabled_providers() -> list[str]:
+    demo = [PaymentProvider.demo.value] if config.PAYMENT_DEMO_ENABLED else []
+    return demo + [
+        p.value for p in (PaymentProvider.payme, PaymentProvider.click) if provider_settings(p.value)
+    ]
+
+
+def sign(secret: str, body: bytes) -> str:
+    return hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret: str, body: bytes, signature: str) -> bool:
+    return bool(secret) and hmac.compare_digest(sign(secret, body), signature or "")
+
+
+# ----------------------------
+# HTTP client (process bo'yicha bitta)
+# ----------------------------
+_http: Optional[aiohttp.ClientSession] = None
+
+
+def get_http() -> aiohttp.ClientSession:
+    """Umumiy ClientSession (birinchi chaqiruvda, ishlayotgan event loop ichida yaratiladi)."""
+    global _http
+    if _http is None or _http.closed:
+        connector = aiohttp.TCPConnector(
+            limit=config.PAYMENT_POOL_SIZE,
+            ttl_dns_cache=300,
+            keepalive_timeout=30,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=config.PAYMENT_TIMEOUT,
+            connect=config.PAYMENT_CONNECT_TIMEOUT,
+        )
+        _http = aiohttp.ClientSession(connector=connector, timeout=timeout)
+    return _http
+
+
+async def close_http() -> None:
+    global _http
+    if _http is not None and not _http.closed:
+        await _http.close()
+    _http = None
+
+
+async def _post(settings: ProviderSettings, path: str, payload: dict) -> dict:
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    headers = {
+        "Content-Type": "application/json",
+        "X-Signature": sign(settings.secret_key, body),
+    }
+    try:
+        async with get_http().post(f"{settings.api_url.rstrip('/')}{path}", data=body, headers=headers) as resp:
+            if resp.status != 200:
+                raise PaymentError(f"{settings.name}: HTTP {resp.status}")
+            return await resp.json(content_type=None)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        raise PaymentError(f"{settings.name}: provider javob bermadi ({type(e).__name__})") from e
+
+
+# ----------------------------
+# Checkout
+# ----------------------------
+@dataclass
+class Checkout:
+    payment_id: int
+    paid: bool
+    redirect_url: Optional[str] = None
+
+
+async def start_checkout(db: AsyncSession, inv: Invite, provider: str, return_url: str) -> Checkout:
+    """
+    demo: payment darhol paid.
+    payme/click: payment (created) -> provider /checkout -> provider_txn_id saqlanadi,
+    foydalanuvchi checkout_url ga yuboriladi; paid bo'lishi webhook orqali.
+    """
+    amount = config.PAYMENT_AMOUNT
+    if provider == PaymentProvider.demo.value:
+        if not config.PAYMENT_DEMO_ENABLED:
+            raise PaymentNotConfigured("demo to'lov o'chiq.")
+        p = await crud_async.create_payment(db, inv.id, amount=amount, provider=provider)
+        await crud_async.mark_payment_paid(db, p.id)
+        return Checkout(payment_id=p.id, paid=True)
+
+    settings = provider_settings(provider)
+    if settings is None:
+        raise PaymentNotConfigured(f"{provider} ulanmagan.")
+
+    p = await crud_async.create_payment(db, inv.id, amount=amount, provider=provider)
+    try:
+        data = await _post(settings, "/checkout", {
+            "merchant_id": settings.merchant_id,
+            "order_id": p.id,
+            "amount": amount,
+            "return_url": return_url,
+        })
+        txn_id, checkout_url = str(data["txn_id"]), str(data["checkout_url"])
+    except (PaymentError, KeyError, TypeError) as e:
+        await crud_async.mark_payment_failed(db, p.id)
+        if isinstance(e, PaymentError):
+            raise
+        raise PaymentError(f"{provider}: noto'g'ri javob") from e
+
+    await crud_async.set_payment_txn(db, p.id, txn_id)
+    return Checkout(payment_id=p.id, paid=False, redirect_url=checkout_url)
+
+
+# ----------------------------
+# Webhook
+# ----------------------------
+# payments.id / amount ustunlari BIGINT dan oshmasin (aks holda DB bind'da OverflowError)
+_MAX_INT = 2 ** 63 - 1
+
+
+def _int_field(payload: dict[str, Any], key: str) -> int:
+    value = payload.get(key)
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise WebhookRejected(f"{key} butun son emas")
+    try:
+        n = int(value)
+    except (TypeError, ValueError, OverflowError) as e:
+        raise WebhookRejected(f"{key} butun son emas") from e
+    if not 0 <= n <= _MAX_INT:
+        raise WebhookRejected(f"{key} chegaradan tashqari")
+    return n
+
+
+def apply_webhook(db: Session, provider: str, payload: dict[str, Any]) -> str:
+    """
+    {"txn_id", "order_id", "amount", "status": "paid"|"failed"} ->
+    "paid" | "duplicate" | "failed".
+    """
+    txn_id = str(payload.get("txn_id") or "")
+    if not txn_id:
+        raise WebhookRejected("txn_id yo'q")
+    status = payload.get("status")
+    if status not in (PaymentStatus.paid.value, PaymentStatus.failed.value):
+        raise WebhookRejected(f"noma'lum status: {status!r}")
+    amount = _int_field(payload, "amount")
+
+    p = crud.get_payment_by_txn(db, provider, txn_id)
+    bind = p is None
+    if bind:
+        # webhook set_payment_txn dan oldin kelgan bo'lishi mumkin: order_id bo'yicha
+        order_id = payload.get("order_id")
+        p = crud.get_payment(db, _int_field(payload, "order_id")) if order_id is not None else None
+        if p is None or p.provider.value != provider or p.provider_txn_id not in (None, txn_id):
+            raise WebhookRejected("payment topilmadi")
+
+    if amount != p.amount:
+        raise WebhookRejected("summa mos emas")
+
+    # hamma tekshiruvdan keyin: txn bog'lash paid/failed bilan bitta tranzaksiyada -
+    # rad etilgan webhook payment'ga hech narsa yozmaydi
+    if bind and p.provider_txn_id is None and not crud.apply_payment_txn(db, p.id, txn_id):
+        raise WebhookRejected("payment topilmadi")
+
+    if status == PaymentStatus.paid.value:
+        changed = crud.apply_payment_paid(db, p.id)
+        db.commit()
+        return "paid" if changed else "duplicate"
+    crud.mark_payment_failed(db, p.id)
+    return "failed"
+
+
+async def handle_webhook(db: AsyncSession, provider: str, body: bytes, signature: str) -> str:
+    settings = provider_settings(provider)
+    if settings is None:
+        raise PaymentNotConfigured(f"{provider} ulanmagan.")
+    if not verify_signature(settings.secret_key, body, signature):
+        raise WebhookSignatureError("imzo noto'g'ri")
+    try:
+        payload = json.loads(body)
+    except ValueError as e:
+        raise WebhookRejected("JSON emas") from e
+    if not isinstance(payload, dict):
+        raise WebhookRejected("JSON obyekt kutilgan")
+    return await db.run_sync(apply_webhook, provider, payload)
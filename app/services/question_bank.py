@@ -0,0 +1,138 @@
+# app/services/question_bank.py
+"""
+Savollar banki uchun process-level cache.
+
+Har GET /i/{token} da `ORDER BY random()` qilish o'rniga aktiv savollar bir marta
+o'qiladi, immutable tuple ko'rinishida saqlanadi va 12 tasi random.sample bilan
+Pythonda tanlanadi.
+
+Invalidatsiya versiya orqali:
+- Question qo'shilsa/o'zgarsa/o'chirilsa (ORM flush) -> invalidate() -> versiya +1
+- boshqa worker/process o'zgartirgan bo'lsa -> QUESTION_CACHE_TTL soniyadan keyin qayta o'qiladi
+
+DB o'qish hech qanday qulf ostida emas: get_bank async routerlardan run_sync orqali
+chaqiriladi va query paytida event loop boshqa coroutine'ga o'tadi - threading.Lock
+ushlangan bo'lsa keyingi coroutine yagona loop thread'ini bloklab qo'yardi.
+Snapshot qulfsiz quriladi va bitta havola almashtirish bilan e'lon qilinadi
+(bir vaqtda ikki marta yuklash zararsiz).
+"""
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from itertools import chain
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.db.models import Question
+from app.services.scoring_service import TagWeights, compile_tag_weights
+
+
+QUESTION_CACHE_TTL = float(os.getenv("QUESTION_CACHE_TTL", "300"))
+QUIZ_SIZE = 12
+
+
+@dataclass(frozen=True, slots=True)
+class QuestionItem:
+    """Question qatorining yengil, o'zgarmas nusxasi (template q.id/q.text/... ishlatadi)."""
+    id: int
+    text: str
+    option_a: str
+    option_b: str
+    tag: str
+    a_score: int
+    b_score: int
+
+
+@dataclass(frozen=True)
+class QuestionBank:
+    version: int
+    loaded_at: float
+    items: tuple[QuestionItem, ...]
+    by_id: Mapping[int, QuestionItem]
+
+
+_version_lock = threading.Lock()  # faqat hisoblagich uchun, I/O ostida ushlanmaydi
+_version = 0
+_bank: Optional[QuestionBank] = None
+_weights: Optional[tuple[QuestionBank, TagWeights]] = None
+
+
+def invalidate() -> None:
+    """Savollar o'zgardi: keyingi so'rovda bank qayta o'qiladi."""
+    global _version
+    with _version_lock:
+        _version += 1
+
+
+def _is_fresh(bank: Optional[QuestionBank]) -> bool:
+    return (
+        bank is not None
+        and bank.version == _version
+        and time.monotonic() - bank.loaded_at < QUESTION_CACHE_TTL
+    )
+
+
+def _load(db: Session, version: int) -> QuestionBank:
+    rows = db.execute(
+        select(
+            Question.id, Question.text, Question.option_a, Question.option_b,
+            Question.tag, Question.a_score, Question.b_score,
+        )
+        .where(Question.is_active == True)  # noqa: E712
+        .order_by(Question.id)
+    ).all()
+    items = tuple(QuestionItem(*row) for row in rows)
+    return QuestionBank(
+        version=version,
+        loaded_at=time.monotonic(),
+        items=items,
+        by_id=MappingProxyType({q.id: q for q in items}),
+    )
+
+
+def get_bank(db: Session) -> QuestionBank:
+    """Aktiv savollar banki (kerak bo'lsa DBdan qayta o'qiladi)."""
+    global _bank
+    bank = _bank
+    if _is_fresh(bank):
+        return bank
+
+    # yuklash davomida invalidate() bo'lsa - bank eski versiya bilan qoladi va
+    # keyingi chaqiruvda qayta o'qiladi
+    bank = _load(db, _version)
+    _bank = bank
+    return bank
+
+
+def get_tag_weights(db: Session) -> TagWeights:
+    """Bankdan kompilyatsiya qilingan tag og'irliklari (bank versiyasi o'zgarsa qayta quriladi)."""
+    global _weights
+    bank = get_bank(db)
+    cached = _weights
+    if cached is not None and cached[0] is bank:
+        return cached[1]
+
+    weights = compile_tag_weights(bank.items, version=bank.version)
+    _weights = (bank, weights)
+    return weights
+
+
+def sample_questions(db: Session, k: int = QUIZ_SIZE) -> list[QuestionItem]:
+    """Bankdan k ta random savol (DB so'rovisiz, cache issiq bo'lsa)."""
+    items = get_bank(db).items
+    return random.sample(items, min(k, len(items)))
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_on_question_change(session: Session, flush_context) -> None:
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Question):
+            invalidate()
+            return
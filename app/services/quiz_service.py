@@ -1,14 +1,19 @@
 # app/services/quiz_service.py
 from __future__ import annotations
 
-from typing import Dict, List, Tuple, Any
+import json
+from datetime import datetime
+from typing import Dict, List, Any, Optional
 
 from sqlalchemy.orm import Session
 
 from app.db import crud
 from app.db.models import Invite, InviteStatus
-from app.services.invite_service import get_invite_by_token_or_404, open_invite, finish_invite
-from app.services.scoring_service import build_profile
+from app.services.invite_service import get_invite_by_token_or_404, is_expired
+from app.services.scoring_service import build_profile, score_dimensions
+from app.services.zodiac_service import zodiac_compatibility
+from app.profiles import get_profile_dict
+from app.services import question_bank
 
 
 class QuizError(Exception):
@@ -17,9 +22,9 @@ class QuizError(Exception):
 
 def get_quiz_questions(db: Session) -> list:
     """
-    MVP: bazadan random 12 ta savol.
+    Random 12 ta savol - process cache'dan (question_bank), ORDER BY random() siz.
     """
-    return crud.get_12_questions(db)
+    return question_bank.sample_questions(db)
 
 
 def parse_answers_map(form: Any) -> Dict[int, str]:
@@ -52,59 +57,118 @@ def _get_invite_answers_letters(db: Session, invite_id: int) -> List[str]:
     DBdan shu invite uchun javoblarni chiqarib,
     ['A','B',...] ko'rinishga keltiramiz.
     """
-    pairs: List[Tuple[Any, Any]] = crud.get_answers_with_questions(db, invite_id)
-    # pairs: [(Answer, Question), ...]
-    letters: List[str] = []
-    for ans, _q in pairs:
-        letters.append(str(ans.choice))
-    return letters
+    return crud.get_answer_letters(db, invite_id)
+
+
+def _get_invite_answers(db: Session, invite_id: int) -> Dict[int, str]:
+    """{question_id: 'A'|'B'} - tag scoring savol id sini ham talab qiladi."""
+    return crud.get_answer_choices(db, invite_id)
 
 
 def submit_quiz_by_token(db: Session, token: str, form: Any) -> Invite:
     """
-    User2 token link orqali kirib javob beradi:
+    User2 token link orqali kirib javob beradi (bitta tranzaksiya, bitta commit):
+    - invite bir marta o'qiladi
     - invite opened bo'ladi (agar oldin bo'lmasa)
-    - answers saqlanadi
+    - answers saqlanadi (bulk upsert)
     - scoring qilinadi (build_profile)
-    - invite finished (result_summary cache ixtiyoriy)
+    - invite finished (result_summary cache)
+    Xato bo'lsa hech narsa yozilmaydi (rollback).
     """
-    # 1) invite mavjudligini tekshiramiz + opened statusga o'tkazamiz
+    # 1) invite mavjudligini tekshiramiz
     inv = get_invite_by_token_or_404(db, token)
     if inv.status == InviteStatus.finished:
         # qayta submit bo'lishini hozircha bloklaymiz
         raise QuizError("Bu suhbat allaqachon yakunlangan.")
+    if is_expired(inv):
+        raise QuizError("Taklif muddati tugagan.")
 
-    open_invite(db, token)
-
-    # 2) answers_map yig'amiz va DBga yozamiz
     answers_map = parse_answers_map(form)
     if not answers_map:
         raise QuizError("Javoblar topilmadi. Iltimos, savollarga javob bering.")
 
-    crud.save_answers(db, invite_id=inv.id, answers_map=answers_map)
+    try:
+        # 2) opened + answers (commitsiz)
+        now = datetime.utcnow()
+        crud.apply_invite_opened(db, inv, now=now)
+        crud.upsert_answers(db, invite_id=inv.id, answers_map=answers_map)
+
+        # 3) scoring (A/B) -> profile
+        answers = _get_invite_answers(db, inv.id)
+        result = build_result(db, inv, answers)
+        profile = result["profile"]  # {'key','summary','bullets','tip'}
+
+        # 4) invite finished + to'liq natija cache (keyin o'qish - bitta qator);
+        #    shartli UPDATE - parallel submit yutgan bo'lsa, bu tranzaksiya bekor qilinadi
+        finished = crud.apply_invite_finished(
+            db,
+            inv,
+            result_summary=profile.get("summary"),
+            zodiac_score=result["zodiac"]["score"],
+            now=now,
+            result_data=dump_result(result),
+        )
+        if not finished:
+            raise QuizError("Bu suhbat allaqachon yakunlangan.")
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
 
-    # 3) scoring (A/B) -> profile
-    letters = _get_invite_answers_letters(db, inv.id)
-    profile = build_profile(letters)  # {'key','summary','bullets','tip'} :contentReference[oaicite:2]{index=2}
-
-    # 4) invite finished + summary cache (MVP uchun qulay)
-    # result_summary ni hozircha faqat summary matn sifatida saqlaymiz
-    inv = finish_invite(
-        db,
-        invite_id=inv.id,
-        result_summary=profile.get("summary"),
-        zodiac_score=inv.zodiac_score,  # agar boshqa joyda hisoblanayotgan bo'lsa
-    )
     return inv
 
 
+# ----------------------------
+# Natija (finished bo'lganda bir marta hisoblanadi va saqlanadi)
+# ----------------------------
+def build_result(db: Session, inv: Invite, answers: Dict[int, str]) -> dict:
+    """
+    To'liq natija:
+    - profile:    build_profile (key, summary, bullets, tip)
+    - dimensions: tag bo'yicha ballar (care/trust/romance/space/communication/attention)
+    - zodiac:     zodiac_compatibility (score, text)
+    - blocks:     app/profiles.py dagi 2-blokli profil
+    answers: {question_id: 'A'|'B'}
+    """
+    profile = build_profile(list(answers.values())) if answers else {}
+    dimensions = score_dimensions(question_bank.get_tag_weights(db), answers)
+    return assemble_result(profile, dimensions, inv.boy_zodiac, inv.girl_zodiac or "")
+
+
+def assemble_result(profile: dict, dimensions: dict, boy_zodiac: str, girl_zodiac: str) -> dict:
+    return {
+        "profile": profile,
+        "dimensions": dimensions,
+        "zodiac": zodiac_compatibility(boy_zodiac, girl_zodiac),
+        "blocks": get_profile_dict(boy_zodiac, girl_zodiac),
+    }
+
+
+def dump_result(result: dict) -> str:
+    return json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+
+
+def load_result(inv: Invite) -> Optional[dict]:
+    """Saqlangan natija (finished invite) yoki None."""
+    if not inv.result_data:
+        return None
+    return json.loads(inv.result_data)
+
+
+def get_result_for_invite(db: Session, inv: Invite) -> dict:
+    """
+    Saqlangan natija bo'lsa - qo'shimcha so'rovsiz qaytaradi.
+    Eski (result_data yo'q) invite'lar uchun - javoblardan qayta hisoblaydi.
+    """
+    result = load_result(inv)
+    if result is not None:
+        return result
+    return build_result(db, inv, _get_invite_answers(db, inv.id))
+
+
 def get_profile_for_invite(db: Session, token: str) -> dict:
     """
-    Result sahifasi uchun: invite token -> answers -> build_profile
+    Result sahifasi uchun: invite token -> saqlangan natija (yoki answers -> build_profile)
     """
     inv = get_invite_by_token_or_404(db, token)
-    letters = _get_invite_answers_letters(db, inv.id)
-    if not letters:
-        return {}
-
-    return build_profile(letters)
+    return get_result_for_invite(db, inv)["profile"]
@@ -0,0 +1,28 @@
+# app/services/quiz_service_async.py
+"""
+quiz_service ning async versiyasi (AsyncSession bilan).
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Invite
+from app.services import quiz_service
+
+
+async def get_quiz_questions(db: AsyncSession) -> list:
+    return await db.run_sync(quiz_service.get_quiz_questions)
+
+
+async def submit_quiz_by_token(db: AsyncSession, token: str, form: Any) -> Invite:
+    return await db.run_sync(quiz_service.submit_quiz_by_token, token, form)
+
+
+async def get_profile_for_invite(db: AsyncSession, token: str) -> dict:
+    return await db.run_sync(quiz_service.get_profile_for_invite, token)
+
+
+async def get_result_for_invite(db: AsyncSession, inv: Invite) -> dict:
+    return await db.run_sync(quiz_service.get_result_for_invite, inv)
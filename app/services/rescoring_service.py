@@ -0,0 +1,233 @@
+# app/services/rescoring_service.py
+"""
+Batch re-scoring: scoring qoidalari o'zgarganda eski (finished) invite'larni qayta hisoblash.
+
+Har batch uchun:
+- bitta so'rov: invites LEFT JOIN answers JOIN questions (keyset: id > oxirgi id)
+- NumPy choice matrix [invites x questions] (0 = javob yo'q, 1 = A, 2 = B)
+- score_choice_matrix: A/B soni va profil kaliti - bitta vektorlashgan o'tishda
+- score_dimensions_matrix: tag bo'yicha ballar (bank og'irliklari bilan matritsa ko'paytmasi)
+- natija (result_summary, result_data, zodiac_score) bitta bulk UPDATE bilan yoziladi
+
+CLI:
+    python -m app.services.rescoring_service --batch-size 5000
+    python -m app.services.rescoring_service --dry-run
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import case, select, update
+from sqlalchemy.orm import Session
+
+from app.db.models import Answer, AnswerChoice, Invite, InviteStatus, Question
+from app.services.quiz_service import assemble_result, dump_result
+from app.services import question_bank
+from app.services.scoring_service import (
+    PROFILE_KEYS, dimensions_json_rows, profile_for_key, score_choice_matrix, score_dimensions_matrix,
+)
+
+
+NO_ANSWER, CHOICE_A, CHOICE_B = 0, 1, 2
+
+
+@dataclass
+class RescoreStats:
+    invites: int = 0
+    answers: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def invites_per_sec(self) -> float:
+        return self.invites / self.seconds if self.seconds else 0.0
+
+
+@lru_cache(maxsize=None)
+def _profile_part(key_code: int) -> tuple[str | None, str]:
+    """key -> (summary, profile JSON)"""
+    profile = profile_for_key(PROFILE_KEYS[key_code]) if key_code >= 0 else {}
+    return profile.get("summary"), dump_result(profile)
+
+
+@lru_cache(maxsize=4096)
+def _pair_part(boy_zodiac: str, girl_zodiac: str) -> tuple[str, str, int | None]:
+    """burj juftligi -> (zodiac JSON, blocks JSON, zodiac_score)"""
+    part = assemble_result({}, {}, boy_zodiac, girl_zodiac)
+    return dump_result(part["zodiac"]), dump_result(part["blocks"]), part["zodiac"]["score"]
+
+
+def result_columns(key_code: int, dimensions_json: str, boy_zodiac: str, girl_zodiac: str) -> tuple[str | None, str, int | None]:
+    """
+    -> (result_summary, result_data JSON, zodiac_score)
+    JSON oldindan serializatsiya qilingan bo'laklardan yig'iladi (assemble_result bilan bir xil tuzilma).
+    """
+    summary, profile_json = _profile_part(key_code)
+    zodiac_json, blocks_json, zodiac_score = _pair_part(boy_zodiac, girl_zodiac)
+    data = (
+        f'{{"profile":{profile_json},"dimensions":{dimensions_json},'
+        f'"zodiac":{zodiac_json},"blocks":{blocks_json}}}'
+    )
+    return summary, data, zodiac_score
+
+
+def _batch_stmt(after_id: int, batch_size: int):
+    choice_code = case(
+        (Question.id.is_(None), NO_ANSWER),
+        (Answer.choice == AnswerChoice.A, CHOICE_A),
+        else_=CHOICE_B,
+    )
+    batch_ids = (
+        select(Invite.id)
+        .where(Invite.status == InviteStatus.finished, Invite.id > after_id)
+        .order_by(Invite.id)
+        .limit(batch_size)
+        .scalar_subquery()
+    )
+    return (
+        select(Invite.id, Question.id, choice_code, Invite.boy_zodiac, Invite.girl_zodiac)
+        .select_from(Invite)
+        .outerjoin(Answer, Answer.invite_id == Invite.id)
+        .outerjoin(Question, Answer.question_id == Question.id)
+        .where(Invite.id.in_(batch_ids))
+        .order_by(Invite.id)
+    )
+
+
+def build_choice_matrix(invite_ids: np.ndarray, question_ids: np.ndarray, choices: np.ndarray):
+    """
+    Uzun (invite_id, question_id, choice) ustunlari -> [invites x questions] int8 matritsa.
+    invite_ids o'sish tartibida bo'lishi kerak (so'rov ORDER BY invite_id) - shunda
+    saralashsiz, O(n) da guruhlanadi.
+    Qaytaradi: (unique invite ids, har invite'ning birinchi qatori indeksi, matrix,
+                matrix ustunlariga mos question_id lar)
+    """
+    if invite_ids.size == 0:
+        return invite_ids, invite_ids, np.zeros((0, 1), dtype=np.int8), invite_ids
+
+    boundary = np.empty(invite_ids.size, dtype=bool)
+    boundary[0] = True
+    np.not_equal(invite_ids[1:], invite_ids[:-1], out=boundary[1:])
+    first_idx = np.flatnonzero(boundary)
+    rows = np.cumsum(boundary) - 1
+
+    answered = choices != NO_ANSWER
+    qids = question_ids[answered]
+    # question_id -> ustun indeksi (bank kichik: bincount/cumsum bilan, saralashsiz)
+    present = np.zeros(int(qids.max(initial=0)) + 1, dtype=bool)
+    present[qids] = True
+    col_of = np.cumsum(present) - 1
+
+    col_qids = np.flatnonzero(present)
+    matrix = np.zeros((first_idx.size, max(col_qids.size, 1)), dtype=np.int8)
+    matrix[rows[answered], col_of[qids]] = choices[answered]
+    return invite_ids[first_idx], first_idx, matrix, col_qids
+
+
+def result_rows(
+    key_codes: np.ndarray,
+    dim_scores: tuple[np.ndarray, np.ndarray, np.ndarray],
+    zodiac_pairs: list[tuple[str, str]],
+) -> list[tuple[str | None, str, int | None]]:
+    """
+    Har invite uchun (result_summary, result_data, zodiac_score).
+    Tag ballari JSON'i shablon bilan formatlanadi, qolgan bo'laklar cache'dan olinadi.
+    """
+    dims_json = dimensions_json_rows(*dim_scores)
+    return [
+        result_columns(key_code, dims, boy_zodiac, girl_zodiac)
+        for key_code, dims, (boy_zodiac, girl_zodiac) in zip(key_codes.tolist(), dims_json, zodiac_pairs)
+    ]
+
+
+def rescore_batch(db: Session, rows: list, now: datetime, dry_run: bool = False) -> tuple[int, int]:
+    invite_ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    question_ids = np.fromiter((r[1] or 0 for r in rows), dtype=np.int64, count=len(rows))
+    choices = np.fromiter((r[2] for r in rows), dtype=np.int8, count=len(rows))
+
+    inv_unique, first_idx, matrix, col_qids = build_choice_matrix(invite_ids, question_ids, choices)
+    a, b, key_codes = score_choice_matrix(matrix)
+    # javobsiz invite -> bo'sh profil (build_result bilan bir xil)
+    key_codes = np.where(a + b == 0, -1, key_codes)
+
+    # tag bo'yicha ballar: bank og'irliklari bilan bitta matritsa ko'paytmasi
+    weights = question_bank.get_tag_weights(db)
+    dim_scores = score_dimensions_matrix(weights, col_qids, matrix[:, :col_qids.size])
+
+    zodiac_pairs = [(rows[i][3], rows[i][4] or "") for i in first_idx.tolist()]
+    params = [
+        {
+            "id": invite_id,
+            "result_summary": summary,
+            "result_data": data,
+            "zodiac_score": zodiac_score,
+            "updated_at": now,  # ETag/Last-Modified yangilansin
+        }
+        for invite_id, (summary, data, zodiac_score)
+        in zip(inv_unique.tolist(), result_rows(key_codes, dim_scores, zodiac_pairs))
+    ]
+
+    if params and not dry_run:
+        db.execute(update(Invite), params)
+        db.commit()
+
+    return len(params), int((choices != NO_ANSWER).sum())
+
+
+def rescore_finished_invites(
+    db: Session,
+    batch_size: int = 5000,
+    dry_run: bool = False,
+    limit: Optional[int] = None,
+) -> RescoreStats:
+    stats = RescoreStats()
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    after_id = 0
+
+    while True:
+        if limit is not None:
+            batch_size = min(batch_size, limit - stats.invites)
+            if batch_size <= 0:
+                break
+
+        rows = db.execute(_batch_stmt(after_id, batch_size)).all()
+        if not rows:
+            break
+
+        invites, answers = rescore_batch(db, rows, now, dry_run=dry_run)
+        stats.invites += invites
+        stats.answers += answers
+        stats.batches += 1
+        after_id = rows[-1][0]
+
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def main() -> None:
+    from app.db.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Finished invite'larni qayta scoring qilish (batch, NumPy).")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--dry-run", action="store_true", help="hisoblaydi, lekin DBga yozmaydi")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        stats = rescore_finished_invites(db, batch_size=args.batch_size, dry_run=args.dry_run, limit=args.limit)
+
+    print(
+        f"✅ {stats.invites} ta invite ({stats.answers} javob, {stats.batches} batch) "
+        f"{stats.seconds:.2f}s da qayta hisoblandi — {stats.invites_per_sec:,.0f} invite/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
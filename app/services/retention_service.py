@@ -0,0 +1,254 @@
+# app/services/retention_service.py
+"""
+Invite retention: TTL -> expired, expired -> o'chirish, eski finished -> arxiv + o'chirish.
+
+    python -m app.services.retention_service     # bir marta (cron uchun)
+
+Ko'p worker'da (gunicorn) fon vazifasi faqat bitta worker'da ishlaydi:
+ARCHIVE_DIR/.retention.lock fayl lock'ini olgan worker (u o'lsa lock bo'shaydi,
+keyingi aylanishda boshqasi oladi).
+
+Hammasi kichik, id bo'yicha batch'larda: har batch alohida qisqa tranzaksiya
+(SQLite yozish lock'i uzoq ushlanmaydi). Nomzodlar ix_invites_status_created_at
+indeksidan olinadi. funnel_daily rollup'ga tegilmaydi - statistika saqlanib qoladi.
+
+Arxiv: ARCHIVE_DIR/invites-<vaqt>-<birinchi_id>-<oxirgi_id>.ndjson.gz,
+har qator = invite ustunlari + answers + payments. Fayl diskka yozilib bo'lgach
+(fsync + rename) qatorlar o'chiriladi.
+"""
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from enum import Enum
+from pathlib import Path
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from app.core import config
+from app.db.models import Answer, Invite, InviteStatus, OutboxEvent, OutboxStatus, Payment
+
+log = logging.getLogger(__name__)
+
+# batch'lar orasida boshqa yozuvchilarga (so'rovlarga) navbat beramiz
+BATCH_PAUSE = 0.05
+
+
+@dataclass
+class RetentionStats:
+    expired: int = 0
+    purged: int = 0
+    archived: int = 0
+    files: int = 0
+    outbox: int = 0
+    seconds: float = 0.0
+
+
+def _candidate_ids(db: Session, status: InviteStatus, cutoff: datetime, limit: int) -> list[int]:
+    return list(db.scalars(
+        select(Invite.id)
+        .where(Invite.status == status, Invite.created_at < cutoff)
+        .order_by(Invite.created_at)
+        .limit(limit)
+    ))
+
+
+def _delete_invites(db: Session, ids: list[int]) -> int:
+    # SQLite'da FK cascade o'chiq bo'lishi mumkin - bolalarni o'zimiz o'chiramiz
+    db.execute(delete(Answer).where(Answer.invite_id.in_(ids)))
+    db.execute(delete(Payment).where(Payment.invite_id.in_(ids)))
+    return db.execute(delete(Invite).where(Invite.id.in_(ids))).rowcount
+
+
+def expire_stale_invites(db: Session, now: datetime, ttl_days: int, batch_size: int) -> int:
+    """TTL ichida ochilmagan created invite'lar -> expired."""
+    cutoff = now - timedelta(days=ttl_days)
+    total = 0
+    while ids := _candidate_ids(db, InviteStatus.created, cutoff, batch_size):
+        total += db.execute(
+            update(Invite)
+            .where(Invite.id.in_(ids), Invite.status == InviteStatus.created)
+            .values(status=InviteStatus.expired, updated_at=now)
+        ).rowcount
+        db.commit()
+        time.sleep(BATCH_PAUSE)
+    return total
+
+
+def purge_expired(db: Session, now: datetime, older_than_days: int, batch_size: int) -> int:
+    """Expired invite'lar (javob/to'lovlari bilan) o'chiriladi."""
+    cutoff = now - timedelta(days=older_than_days)
+    total = 0
+    while ids := _candidate_ids(db, InviteStatus.expired, cutoff, batch_size):
+        total += _delete_invites(db, ids)
+        db.commit()
+        time.sleep(BATCH_PAUSE)
+    return total
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"JSON'ga o'girib bo'lmaydi: {type(value)!r}")
+
+
+def _rows(db: Session, table, where) -> list[dict]:
+    return [dict(r) for r in db.execute(select(table).where(where)).mappings()]
+
+
+def _write_archive(archive_dir: Path, now: datetime, records: list[dict]) -> Path:
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    name = f"invites-{now:%Y%m%d-%H%M%S}-{records[0]['id']}-{records[-1]['id']}.ndjson.gz"
+    path = archive_dir / name
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+            for rec in records:
+                line = json.dumps(rec, ensure_ascii=False, separators=(",", ":"), default=_json_default)
+                gz.write(line.encode("utf-8") + b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def archive_finished(
+    db: Session,
+    now: datetime,
+    older_than_days: int,
+    archive_dir: Path,
+    batch_size: int,
+) -> tuple[int, int]:
+    """
+    Eski finished invite'lar: gzip NDJSON (invite + answers + payments) -> o'chirish.
+    (arxivlangan invite soni, fayllar soni) qaytaradi.
+    """
+    cutoff = now - timedelta(days=older_than_days)
+    total = files = 0
+    while ids := _candidate_ids(db, InviteStatus.finished, cutoff, batch_size):
+        invites = _rows(db, Invite.__table__, Invite.id.in_(ids))
+        answers = _rows(db, Answer.__table__, Answer.invite_id.in_(ids))
+        payments = _rows(db, Payment.__table__, Payment.invite_id.in_(ids))
+
+        by_invite: dict[int, dict] = {}
+        for inv in sorted(invites, key=lambda r: r["id"]):
+            by_invite[inv["id"]] = {**inv, "answers": [], "payments": []}
+        for a in answers:
+            by_invite[a["invite_id"]]["answers"].append(a)
+        for p in payments:
+            by_invite[p["invite_id"]]["payments"].append(p)
+
+        _write_archive(archive_dir, now, list(by_invite.values()))
+        files += 1
+        total += _delete_invites(db, ids)
+        db.commit()
+        time.sleep(BATCH_PAUSE)
+    return total, files
+
+
+def purge_outbox(db: Session, now: datetime, older_than_days: int, batch_size: int) -> int:
+    """
+    Bajarilgan (done) outbox hodisalari o'chiriladi; dead'lar tekshirish uchun qoladi.
+    Yosh processed_at (bajarilgan vaqt) bo'yicha - available_at claim'dagi lease muddati.
+    """
+    cutoff = now - timedelta(days=older_than_days)
+    total = 0
+    while ids := list(db.scalars(
+        select(OutboxEvent.id)
+        .where(OutboxEvent.status == OutboxStatus.done, OutboxEvent.processed_at < cutoff)
+        .limit(batch_size)
+    )):
+        total += db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(ids))).rowcount
+        db.commit()
+        time.sleep(BATCH_PAUSE)
+    return total
+
+
+def run_retention(db: Session, now: datetime | None = None) -> RetentionStats:
+    """Barcha bosqichlar config bo'yicha (0 kun - bosqich o'chiq)."""
+    now = now or datetime.utcnow()
+    batch = config.RETENTION_BATCH_SIZE
+    stats = RetentionStats()
+    t0 = time.perf_counter()
+
+    if config.INVITE_TTL_DAYS > 0:
+        stats.expired = expire_stale_invites(db, now, config.INVITE_TTL_DAYS, batch)
+        stats.purged = purge_expired(
+            db, now, config.INVITE_TTL_DAYS + config.EXPIRED_RETENTION_DAYS, batch
+        )
+    if config.ARCHIVE_AFTER_DAYS > 0:
+        stats.archived, stats.files = archive_finished(
+            db, now, config.ARCHIVE_AFTER_DAYS, Path(config.ARCHIVE_DIR), batch
+        )
+    if config.OUTBOX_RETENTION_DAYS > 0:
+        stats.outbox = purge_outbox(db, now, config.OUTBOX_RETENTION_DAYS, batch)
+
+    stats.seconds = time.perf_counter() - t0
+    return stats
+
+
+def _acquire_runner_lock():
+    """Bloklamaydigan flock; olinmasa None. fcntl yo'q platformada - har doim ishlaydi."""
+    try:
+        import fcntl
+    except ImportError:
+        return True
+    path = Path(config.ARCHIVE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    f = open(path / ".retention.lock", "a")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def _run_once() -> RetentionStats:
+    from app.db.database import SessionLocal
+
+    with SessionLocal() as db:
+        return run_retention(db)
+
+
+async def retention_loop(interval: float) -> None:
+    """Lifespan fon vazifasi: har `interval` soniyada (thread'da, event loop bloklanmaydi)."""
+    lock = None
+    try:
+        while True:
+            # lock xatosi (ARCHIVE_DIR yozib bo'lmaydi va h.k.) ham vazifani o'ldirmaydi -
+            # log qilinadi, keyingi intervalda qayta urinadi
+            try:
+                if lock is None:
+                    lock = _acquire_runner_lock()
+                if lock is not None:
+                    stats = await asyncio.to_thread(_run_once)
+                    if stats.expired or stats.purged or stats.archived or stats.outbox:
+                        log.info("retention: %s", stats)
+            except Exception:
+                log.exception("retention xatosi")
+            await asyncio.sleep(interval)
+    finally:
+        if lock not in (None, True):
+            lock.close()
+
+
+def main() -> None:
+    stats = _run_once()
+    print(
+        f"✅ expired: {stats.expired}, o'chirildi: {stats.purged}, "
+        f"arxivlandi: {stats.archived} ({stats.files} fayl), {stats.seconds:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,64 @@
 from collections import Counter
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Iterable, Mapping
+
+import numpy as np
+
+# Profil kalitlari tartibi (batch scoring'da int kod sifatida ishlatiladi)
+PROFILE_KEYS = ("emotion", "attention")
+
+PROFILES = {
+    "emotion": {
+        "summary": (
+            "Ko‘rinishidan, u munosabatda "
+            "iliq so‘zlar, samimiy e’tibor va hissiy yaqinlikni "
+            "ko‘proq his qilishni xohlayotgandek."
+        ),
+        "bullets": [
+            "💬 Ba’zan oddiy, lekin samimiy gaplar unga katta ta’sir qiladi",
+            "❤️ E’tibor — sovg‘adan ko‘ra muhimroq bo‘lishi mumkin",
+            "🤍 U tinglanayotganini his qilsa, yanada ochiladi"
+        ],
+        "tip": (
+            "Kichik maslahat: unga vaqti-vaqti bilan "
+            "hislaringizni ochiq aytib ko‘ring."
+        )
+    },
+    "attention": {
+        "summary": (
+            "Ko‘rinishidan, u munosabatda "
+            "barqarorlik, amaliy g‘amxo‘rlik va "
+            "kundalik mayda e’tiborlarni ko‘proq qadrlayotgandek."
+        ),
+        "bullets": [
+            "🌱 U uchun doimiylik va ishonch muhim",
+            "🕰 Birga o‘tkazilgan vaqt — asosiy signal",
+            "🤝 Amalda ko‘rsatilgan g‘amxo‘rlik unga yaqin"
+        ],
+        "tip": (
+            "Kichik maslahat: va’dadan ko‘ra, "
+            "amaldagi mayda ishlar kuchliroq bo‘lishi mumkin."
+        )
+    }
+}
+
+
+def profile_key(a: int, b: int) -> str:
+    """Dominant ehtiyoj: A ko'p (yoki teng) -> emotion, aks holda attention."""
+    return "emotion" if a >= b else "attention"
+
+
+def profile_for_key(key: str) -> dict:
+    profile = PROFILES[key]
+
+    return {
+        "key": key,
+        "summary": profile["summary"],
+        "bullets": list(profile["bullets"]),
+        "tip": profile["tip"]
+    }
+
 
 def build_profile(answers: list[str]) -> dict:
     """
@@ -10,51 +70,131 @@ def build_profile(answers: list[str]) -> dict:
     b = count.get("B", 0)
 
     # Dominant ehtiyojni aniqlaymiz
-    if a >= b:
-        key = "emotion"
-    else:
-        key = "attention"
-
-    profiles = {
-        "emotion": {
-            "summary": (
-                "Ko‘rinishidan, u munosabatda "
-                "iliq so‘zlar, samimiy e’tibor va hissiy yaqinlikni "
-                "ko‘proq his qilishni xohlayotgandek."
-            ),
-            "bullets": [
-                "💬 Ba’zan oddiy, lekin samimiy gaplar unga katta ta’sir qiladi",
-                "❤️ E’tibor — sovg‘adan ko‘ra muhimroq bo‘lishi mumkin",
-                "🤍 U tinglanayotganini his qilsa, yanada ochiladi"
-            ],
-            "tip": (
-                "Kichik maslahat: unga vaqti-vaqti bilan "
-                "hislaringizni ochiq aytib ko‘ring."
-            )
-        },
-        "attention": {
-            "summary": (
-                "Ko‘rinishidan, u munosabatda "
-                "barqarorlik, amaliy g‘amxo‘rlik va "
-                "kundalik mayda e’tiborlarni ko‘proq qadrlayotgandek."
-            ),
-            "bullets": [
-                "🌱 U uchun doimiylik va ishonch muhim",
-                "🕰 Birga o‘tkazilgan vaqt — asosiy signal",
-                "🤝 Amalda ko‘rsatilgan g‘amxo‘rlik unga yaqin"
-            ],
-            "tip": (
-                "Kichik maslahat: va’dadan ko‘ra, "
-                "amaldagi mayda ishlar kuchliroq bo‘lishi mumkin."
-            )
-        }
-    }
+    return profile_for_key(profile_key(a, b))
+
+
+def score_choice_matrix(matrix):
+    """
+    Vektorlashgan scoring (batch uchun).
+    matrix: numpy int8 [invites x questions], 0 = javob yo'q, 1 = A, 2 = B.
+    Qaytaradi: (a_counts, b_counts, key_codes) - key_codes PROFILE_KEYS indeksi.
+    build_profile bilan bir xil qoida: a >= b -> emotion (0), aks holda attention (1).
+    """
+    a = (matrix == 1).sum(axis=1)
+    b = (matrix == 2).sum(axis=1)
+    key_codes = (a < b).astype("int8")
+    return a, b, key_codes
+
+
+# ----------------------------
+# Tag bo'yicha (ko'p o'lchamli) scoring
+# ----------------------------
+DIMENSIONS = ("care", "trust", "romance", "space", "communication", "attention")
+
+
+@dataclass(frozen=True)
+class TagWeights:
+    """
+    Savollar bankidan kompilyatsiya qilingan og'irliklar (bank versiyasi bilan).
+    w_a/w_b/w_max: [DIMENSIONS x questions] - savol o'z tagi qatorida a_score/b_score,
+    boshqa qatorlarda 0. Submission = har tag uchun bitta dot product.
+    """
+    version: int
+    question_index: Mapping[int, int]  # question_id -> ustun
+    w_a: np.ndarray
+    w_b: np.ndarray
+    w_max: np.ndarray
+
+
+def compile_tag_weights(questions: Iterable, version: int = 0) -> TagWeights:
+    """questions: .id/.tag/.a_score/.b_score bo'lgan obyektlar (QuestionItem yoki Question)."""
+    questions = list(questions)
+    w_a = np.zeros((len(DIMENSIONS), len(questions)), dtype=np.int32)
+    w_b = np.zeros_like(w_a)
+    dim_of = {tag: i for i, tag in enumerate(DIMENSIONS)}
+
+    for col, q in enumerate(questions):
+        row = dim_of.get(q.tag)
+        if row is None:  # DIMENSIONS da yo'q tag - profilga ta'sir qilmaydi
+            continue
+        w_a[row, col] = q.a_score
+        w_b[row, col] = q.b_score
 
-    profile = profiles[key]
+    for w in (w_a, w_b):
+        w.setflags(write=False)
+    w_max = np.maximum(w_a, w_b)
+    w_max.setflags(write=False)
 
+    return TagWeights(
+        version=version,
+        question_index=MappingProxyType({q.id: col for col, q in enumerate(questions)}),
+        w_a=w_a,
+        w_b=w_b,
+        w_max=w_max,
+    )
+
+
+def _dimensions_dict(a, b, mx) -> dict:
     return {
-        "key": key,
-        "summary": profile["summary"],
-        "bullets": profile["bullets"],
-        "tip": profile["tip"]
+        tag: {"score": int(a[i] + b[i]), "a": int(a[i]), "b": int(b[i]), "max": int(mx[i])}
+        for i, tag in enumerate(DIMENSIONS)
     }
+
+
+def score_dimensions(weights: TagWeights, answers_map: Mapping[int, str]) -> dict:
+    """
+    answers_map: {question_id: "A"|"B"} -> {tag: {score, a, b, max}}
+    Bankda yo'q (o'chirilgan) savollar hisobga olinmaydi.
+    """
+    n = len(weights.question_index)
+    x_a = np.zeros(n, dtype=np.int32)
+    x_b = np.zeros(n, dtype=np.int32)
+    for qid, choice in answers_map.items():
+        col = weights.question_index.get(qid)
+        if col is None:
+            continue
+        if choice == "A":
+            x_a[col] = 1
+        elif choice == "B":
+            x_b[col] = 1
+
+    a = weights.w_a @ x_a
+    b = weights.w_b @ x_b
+    mx = weights.w_max @ (x_a + x_b)
+    return _dimensions_dict(a, b, mx)
+
+
+def score_dimensions_matrix(weights: TagWeights, question_ids: np.ndarray, matrix: np.ndarray):
+    """
+    Batch: matrix [invites x len(question_ids)] (0/1/2) -> (a, b, max) har biri [invites x DIMENSIONS].
+    """
+    cols = np.array([weights.question_index.get(int(q), -1) for q in question_ids], dtype=np.int64)
+    known = cols >= 0
+    w_a = np.zeros((len(DIMENSIONS), len(question_ids)), dtype=np.int32)
+    w_b = np.zeros_like(w_a)
+    w_a[:, known] = weights.w_a[:, cols[known]]
+    w_b[:, known] = weights.w_b[:, cols[known]]
+
+    x_a = (matrix == 1).astype(np.int32)
+    x_b = (matrix == 2).astype(np.int32)
+    a = x_a @ w_a.T
+    b = x_b @ w_b.T
+    mx = (x_a + x_b) @ np.maximum(w_a, w_b).T
+    return a, b, mx
+
+
+def dimensions_rows(a: np.ndarray, b: np.ndarray, mx: np.ndarray) -> list[dict]:
+    return [_dimensions_dict(ra, rb, rm) for ra, rb, rm in zip(a.tolist(), b.tolist(), mx.tolist())]
+
+
+# _dimensions_dict ning compact JSON ko'rinishi (batch uchun: dict qurmasdan formatlash)
+_DIMENSIONS_JSON = "{" + ",".join(
+    '"%s":{"score":%%d,"a":%%d,"b":%%d,"max":%%d}' % tag for tag in DIMENSIONS
+) + "}"
+
+
+def dimensions_json_rows(a: np.ndarray, b: np.ndarray, mx: np.ndarray) -> list[str]:
+    """dimensions_rows bilan bir xil ma'lumot, lekin tayyor JSON satrlar sifatida."""
+    # [invites x (score, a, b, max) * DIMENSIONS]
+    packed = np.stack([a + b, a, b, mx], axis=2).reshape(a.shape[0], -1)
+    return [_DIMENSIONS_JSON % tuple(row) for row in packed.tolist()]
@@ -1,17 +1,107 @@
+# app/services/zodiac_service.py
+"""
+Burjlar: kanonik enum (0..11), o'zbek/ingliz/rus yozilishlarini parse qilish
+va oldindan hisoblangan 12x12 moslik jadvali.
+"""
+from __future__ import annotations
+
+import enum
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+
+class Zodiac(enum.IntEnum):
+    aries = 0
+    taurus = 1
+    gemini = 2
+    cancer = 3
+    leo = 4
+    virgo = 5
+    libra = 6
+    scorpio = 7
+    sagittarius = 8
+    capricorn = 9
+    aquarius = 10
+    pisces = 11
+
+
+# Formadagi (o'zbekcha) nom, keyin muqobil yozilishlar
+ZODIAC_ALIASES: Dict[Zodiac, Tuple[str, ...]] = {
+    Zodiac.aries: ("Qo‘y", "Hamal", "Aries", "Овен"),
+    Zodiac.taurus: ("Buzoq", "Savr", "Taurus", "Телец"),
+    Zodiac.gemini: ("Egizaklar", "Egizak", "Javzo", "Gemini", "Близнецы"),
+    Zodiac.cancer: ("Qisqichbaqa", "Saraton", "Cancer", "Рак"),
+    Zodiac.leo: ("Arslon", "Asad", "Sher", "Leo", "Лев"),
+    Zodiac.virgo: ("Parizod", "Sunbula", "Virgo", "Дева"),
+    Zodiac.libra: ("Tarozi", "Mezon", "Libra", "Весы"),
+    Zodiac.scorpio: ("Chayon", "Aqrab", "Scorpio", "Скорпион"),
+    Zodiac.sagittarius: ("O‘qotar", "Qavs", "Sagittarius", "Стрелец"),
+    Zodiac.capricorn: ("Echki", "Jaddiy", "Capricorn", "Козерог"),
+    Zodiac.aquarius: ("Qovg‘a", "Dalv", "Aquarius", "Водолей"),
+    Zodiac.pisces: ("Baliq", "Hut", "Pisces", "Рыбы"),
+}
+
+# o‘ / o' / oʻ / o` -> bitta shakl
+_APOSTROPHES = str.maketrans({c: "'" for c in "‘’ʻʼ`´"})
+
+
+def _normalize(value: str) -> str:
+    return "".join(value.translate(_APOSTROPHES).casefold().split())
+
+
+_LOOKUP: Dict[str, Zodiac] = {
+    _normalize(alias): z
+    for z, aliases in ZODIAC_ALIASES.items()
+    for alias in (*aliases, z.name)
+}
+
+
+@lru_cache(maxsize=512)
+def parse_zodiac(value: Optional[str]) -> Optional[Zodiac]:
+    """'Arslon' / 'leo' / 'Лев' -> Zodiac.leo; noma'lum bo'lsa None."""
+    if not value:
+        return None
+    return _LOOKUP.get(_normalize(value))
+
+
+def zodiac_label(z: Zodiac) -> str:
+    """Saytda ko'rsatiladigan (o'zbekcha) nom."""
+    return ZODIAC_ALIASES[z][0]
+
+
+# ----------------------------
+# 12x12 moslik jadvali (oldindan hisoblangan)
+# ----------------------------
+SAME_SIGN = {"score": 90, "text": "Burj bir xil — bir-biringizni tez tushunishingiz mumkin. Ammo xarakter ham muhim."}
+DEFAULT_PAIR = {"score": 70, "text": "Moslik o‘rtacha-yaxshi. Eng muhimi — muloqot va hurmat."}
+MISSING = {"score": None, "text": "Burjlar kiritilmagan."}
+
+
+def _build_compat_table() -> Tuple[Tuple[dict, ...], ...]:
+    # MVP: soddalashtirilgan moslik. Real jadval shu yerda to'ldiriladi.
+    return tuple(
+        tuple(SAME_SIGN if b == g else DEFAULT_PAIR for g in Zodiac)
+        for b in Zodiac
+    )
+
+
+COMPAT_TABLE = _build_compat_table()
+
+
 def zodiac_compatibility(boy_zodiac: str, girl_zodiac: str) -> dict:
     """
-    MVP: soddalashtirilgan moslik.
-    Keyin real jadval qo‘shamiz.
+    Burj mosligi: parse -> COMPAT_TABLE[boy][girl].
+    Noma'lum yozilishlar uchun eski (satr solishtirish) yo'l.
     """
-    b = (boy_zodiac or "").strip().lower()
-    g = (girl_zodiac or "").strip().lower()
+    b = parse_zodiac(boy_zodiac)
+    g = parse_zodiac(girl_zodiac)
+    if b is not None and g is not None:
+        return dict(COMPAT_TABLE[b][g])
 
-    if not b or not g:
-        return {"score": None, "text": "Burjlar kiritilmagan."}
+    b_raw = (boy_zodiac or "").strip().lower()
+    g_raw = (girl_zodiac or "").strip().lower()
 
-    # juda soddalashtirilgan mapping (MVP)
-    if b == g:
-        return {"score": 90, "text": "Burj bir xil — bir-biringizni tez tushunishingiz mumkin. Ammo xarakter ham muhim."}
+    if not b_raw or not g_raw:
+        return dict(MISSING)
 
-    # umumiy “o‘rtacha”
-    return {"score": 70, "text": "Moslik o‘rtacha-yaxshi. Eng muhimi — muloqot va hurmat."}
+    return dict(SAME_SIGN if b_raw == g_raw else DEFAULT_PAIR)
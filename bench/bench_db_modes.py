@@ -0,0 +1,108 @@
+# bench/bench_db_modes.py
+"""
+Sync (threadpool) va async (AsyncSession) DB rejimlarini solishtirish: requests/sec.
+
+Ishga tushirish:
+    pip install httpx
+    python -m bench.bench_db_modes --requests 2000 --concurrency 64
+
+Ikkala rejim bir xil vaqtinchalik SQLite bazaga, bir xil endpointlarga urinadi:
+- sync:  `def` endpoint + get_db + invite_service (har so'rov threadpool slotini egallaydi)
+- async: haqiqiy app (app.main) - `async def` endpoint + get_async_db
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+_TMP_DIR = tempfile.mkdtemp(prefix="sevgi_bench_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_TMP_DIR}/bench.db")
+
+import httpx  # noqa: E402
+from fastapi import APIRouter, Depends, FastAPI, HTTPException  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.db.database import get_db  # noqa: E402
+from app.db.init_db import init_db  # noqa: E402
+from app.services import invite_service  # noqa: E402
+from app.services.invite_service import CreateInviteDTO  # noqa: E402
+
+
+def build_sync_app() -> FastAPI:
+    """Eski (sync) rejimdagi hot endpointlar nusxasi."""
+    router = APIRouter(prefix="/api")
+
+    @router.get("/invites/{token}")
+    def api_get_invite(token: str, db: Session = Depends(get_db)):
+        try:
+            inv = invite_service.get_invite_by_token_or_404(db, token)
+        except Exception:
+            raise HTTPException(status_code=404, detail="Invite topilmadi")
+        return {"token": inv.token, "status": inv.status.value, "boy_name": inv.boy_name}
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+
+def build_async_app() -> FastAPI:
+    from app.main import app
+    return app
+
+
+def seed_invites(n: int) -> list[str]:
+    from app.db.database import SessionLocal
+
+    tokens = []
+    with SessionLocal() as db:
+        for i in range(n):
+            inv = invite_service.create_invite(
+                db, CreateInviteDTO(boy_name=f"Bench{i}", boy_age=25, boy_zodiac="Arslon")
+            )
+            tokens.append(inv.token)
+    return tokens
+
+
+async def run_mode(app: FastAPI, tokens: list[str], total: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    sem = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i: int) -> None:
+            async with sem:
+                r = await client.get(f"/api/invites/{tokens[i % len(tokens)]}")
+                r.raise_for_status()
+
+        # isitish
+        await asyncio.gather(*(one(i) for i in range(min(50, total))))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    return total / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--invites", type=int, default=200)
+    args = parser.parse_args()
+
+    init_db(drop_all=True)
+    tokens = seed_invites(args.invites)
+
+    sync_rps = asyncio.run(run_mode(build_sync_app(), tokens, args.requests, args.concurrency))
+    async_rps = asyncio.run(run_mode(build_async_app(), tokens, args.requests, args.concurrency))
+
+    print(f"sync  (threadpool):   {sync_rps:8.1f} req/s")
+    print(f"async (AsyncSession): {async_rps:8.1f} req/s")
+    print(f"nisbat async/sync:    {async_rps / sync_rps:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
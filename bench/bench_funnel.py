@@ -0,0 +1,304 @@
+# bench/bench_funnel.py
+"""
+End-to-end funnel yuklama testi: to'liq foydalanuvchi oqimi ASGI ilovaga qarshi.
+
+    python -m bench.bench_funnel --flows 500 --concurrency 32
+    python -m bench.bench_funnel --db postgres                      # vaqtinchalik klaster (initdb)
+    python -m bench.bench_funnel --db postgres --database-url postgresql://user@host/db
+    python -m bench.bench_funnel --json out.json --compare baseline.json --threshold 0.2
+
+Bitta oqim (flow):
+    POST /start -> GET /share/{token} -> POST /girl/{token}
+    -> GET /i/{token} -> POST /i/{token} -> GET /result/{token}
+
+Ilova jarayon ichida (httpx.ASGITransport, lifespan bilan) ishlaydi - tarmoq shovqinisiz
+faqat app + DB narxi o'lchanadi. --url berilsa tashqi serverga (masalan gunicorn) qarshi.
+
+Natija: har bir qadam uchun p50/p95/p99/mean/max (ms), xatolar; umumiy flow/s, req/s,
+xato ulushi. --json: mashina o'qiydigan natija (commit, sozlamalar bilan) -
+--compare bilan oldingi natijaga nisbatan p95 regressiyasi tekshiriladi (exit code 1).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+STEPS = ("start", "share", "girl", "quiz_get", "quiz_post", "result")
+QUESTION_RE = re.compile(r'name="q_(\d+)"')
+ZODIACS = ["Qo‘y", "Buzoq", "Egizaklar", "Qisqichbaqa", "Arslon", "Parizod",
+           "Tarozi", "Chayon", "O‘qotar", "Echki", "Qovg‘a", "Baliq"]
+
+
+# ----------------------------
+# DB sozlash
+# ----------------------------
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def temp_postgres():
+    """Vaqtinchalik papkada (file-backed) PostgreSQL klaster: initdb + pg_ctl."""
+    initdb, pg_ctl = shutil.which("initdb"), shutil.which("pg_ctl")
+    if not initdb or not pg_ctl:
+        raise SystemExit("initdb/pg_ctl topilmadi: --database-url bilan mavjud PostgreSQL bering")
+
+    tmp = Path(tempfile.mkdtemp(prefix="sevgi_pg_"))
+    data, port = tmp / "data", _free_port()
+    subprocess.run([initdb, "-D", str(data), "-U", "bench", "--auth=trust", "-E", "UTF8"],
+                   check=True, capture_output=True)
+    subprocess.run([pg_ctl, "-D", str(data), "-l", str(tmp / "pg.log"), "-w", "start",
+                    "-o", f"-p {port} -k {tmp} -c listen_addresses=127.0.0.1"],
+                   check=True, capture_output=True)
+    try:
+        yield f"postgresql://bench@127.0.0.1:{port}/postgres"
+    finally:
+        subprocess.run([pg_ctl, "-D", str(data), "-m", "fast", "stop"], capture_output=True)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+@contextmanager
+def database(kind: str, url: str | None):
+    if url:
+        yield url
+    elif kind == "sqlite":
+        tmp = tempfile.mkdtemp(prefix="sevgi_bench_")
+        yield f"sqlite:///{tmp}/bench.db"
+        shutil.rmtree(tmp, ignore_errors=True)
+    else:
+        with temp_postgres() as pg_url:
+            yield pg_url
+
+
+# ----------------------------
+# Oqim
+# ----------------------------
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = {s: [] for s in STEPS}
+        self.errors: dict[str, int] = {s: 0 for s in STEPS}
+        self.requests: dict[str, int] = {s: 0 for s in STEPS}
+        self.flows_ok = 0
+
+    async def step(self, name: str, coro, expect: tuple[int, ...]):
+        self.requests[name] += 1
+        t0 = time.perf_counter()
+        try:
+            r = await coro
+        except Exception:
+            self.errors[name] += 1
+            return None
+        self.latencies[name].append(time.perf_counter() - t0)
+        if r.status_code not in expect:
+            self.errors[name] += 1
+            return None
+        return r
+
+
+async def one_flow(client, rec: Recorder, rnd: random.Random) -> None:
+    r = await rec.step("start", client.post("/start", data={
+        "boy_name": "Bench", "boy_age": rnd.randint(18, 40), "boy_zodiac": rnd.choice(ZODIACS),
+    }), (303,))
+    if r is None:
+        return
+    token = r.headers["location"].rsplit("/", 1)[-1]
+
+    if await rec.step("share", client.get(f"/share/{token}"), (200,)) is None:
+        return
+    if await rec.step("girl", client.post(f"/girl/{token}", data={
+        "girl_name": "Laylo", "girl_age": rnd.randint(18, 40), "girl_zodiac": rnd.choice(ZODIACS),
+    }), (303,)) is None:
+        return
+
+    r = await rec.step("quiz_get", client.get(f"/i/{token}"), (200,))
+    if r is None:
+        return
+    answers = {f"q_{qid}": rnd.choice("AB") for qid in QUESTION_RE.findall(r.text)}
+
+    if await rec.step("quiz_post", client.post(f"/i/{token}", data=answers), (303,)) is None:
+        return
+    if await rec.step("result", client.get(f"/result/{token}"), (200,)) is None:
+        return
+    rec.flows_ok += 1
+
+
+async def run_load(client, flows: int, concurrency: int, seed: int) -> tuple[Recorder, float]:
+    rec = Recorder()
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for i in range(flows):
+        queue.put_nowait(i)
+
+    async def user(uid: int) -> None:
+        rnd = random.Random(seed * 1000 + uid)
+        while True:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await one_flow(client, rec, rnd)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(u) for u in range(concurrency)))
+    return rec, time.perf_counter() - started
+
+
+# ----------------------------
+# Hisobot
+# ----------------------------
+def percentile(sorted_vals: list[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    idx = min(len(sorted_vals) - 1, max(0, round(q * (len(sorted_vals) - 1))))
+    return sorted_vals[idx]
+
+
+def summarize(rec: Recorder, seconds: float, flows: int) -> dict:
+    steps = {}
+    total_requests = total_errors = 0
+    for name in STEPS:
+        vals = sorted(rec.latencies[name])
+        errors = rec.errors[name]
+        total_requests += rec.requests[name]
+        total_errors += errors
+        steps[name] = {
+            "count": len(vals),
+            "errors": errors,
+            "p50_ms": round(percentile(vals, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(vals, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(vals, 0.99) * 1000, 3),
+            "mean_ms": round(sum(vals) / len(vals) * 1000, 3) if vals else 0.0,
+            "max_ms": round(vals[-1] * 1000, 3) if vals else 0.0,
+        }
+    return {
+        "summary": {
+            "flows": flows,
+            "flows_ok": rec.flows_ok,
+            "seconds": round(seconds, 3),
+            "flows_per_sec": round(rec.flows_ok / seconds, 2) if seconds else 0.0,
+            "requests_per_sec": round(total_requests / seconds, 2) if seconds else 0.0,
+            "error_rate": round(total_errors / total_requests, 5) if total_requests else 0.0,
+        },
+        "steps": steps,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(result: dict) -> None:
+    meta, s = result["meta"], result["summary"]
+    print(f"funnel [{meta['db']}] commit={meta['commit']} flows={s['flows']} "
+          f"concurrency={meta['concurrency']}")
+    print(f"{'qadam':<10} {'n':>6} {'err':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  (ms)")
+    for name, st in result["steps"].items():
+        print(f"{name:<10} {st['count']:>6} {st['errors']:>5} {st['p50_ms']:>9.2f} "
+              f"{st['p95_ms']:>9.2f} {st['p99_ms']:>9.2f} {st['max_ms']:>9.2f}")
+    print(f"jami: {s['seconds']:.2f}s, {s['flows_per_sec']:.1f} flow/s, "
+          f"{s['requests_per_sec']:.1f} req/s, xato {s['error_rate']:.2%}")
+
+
+def compare(result: dict, baseline: dict, threshold: float) -> bool:
+    """p95 bo'yicha regressiya (threshold ulushdan ko'p sekinlashish) bo'lsa False."""
+    ok = True
+    print(f"\nbaseline commit={baseline['meta'].get('commit')} bilan solishtirish (p95):")
+    for name, st in result["steps"].items():
+        base = baseline["steps"].get(name)
+        if not base or not base["p95_ms"]:
+            continue
+        delta = st["p95_ms"] / base["p95_ms"] - 1
+        flag = "REGRESSIYA" if delta > threshold else ""
+        ok &= delta <= threshold
+        print(f"  {name:<10} {base['p95_ms']:>9.2f} -> {st['p95_ms']:>9.2f}  {delta:+.1%} {flag}")
+    if result["summary"]["error_rate"] > baseline["summary"]["error_rate"]:
+        print("  xato ulushi oshdi")
+        ok = False
+    return ok
+
+
+# ----------------------------
+# main
+# ----------------------------
+async def _run(args) -> tuple[Recorder, float]:
+    import httpx
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=30) as client:
+            await run_load(client, min(args.warmup, args.flows), args.concurrency, seed=0)
+            return await run_load(client, args.flows, args.concurrency, seed=1)
+
+    from app.db.init_db import init_db
+    from app.main import app
+
+    init_db(drop_all=True)
+    # ilova xatosi (500) istisno emas, javob sifatida yozilsin
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=30) as client:
+            await run_load(client, min(args.warmup, args.flows), args.concurrency, seed=0)
+            return await run_load(client, args.flows, args.concurrency, seed=1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flows", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--db", choices=("sqlite", "postgres"), default="sqlite")
+    parser.add_argument("--database-url", default=None, help="sync URL (async URL avtomatik)")
+    parser.add_argument("--url", default=None, help="tashqi server (masalan http://127.0.0.1:8000)")
+    parser.add_argument("--json", default=None, help="natijani JSON faylga yozish")
+    parser.add_argument("--compare", default=None, help="oldingi --json natija bilan solishtirish")
+    parser.add_argument("--threshold", type=float, default=0.2, help="ruxsat etilgan p95 o'sishi (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    with database(args.db, args.database_url) as url:
+        # app.db.database import paytida o'qiydi - app importidan oldin
+        os.environ["DATABASE_URL"] = url
+        os.environ.pop("ASYNC_DATABASE_URL", None)
+        os.environ.setdefault("RETENTION_INTERVAL", "0")
+        rec, seconds = asyncio.run(_run(args))
+
+    result = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "db": "external" if args.url else args.db,
+            "flows": args.flows,
+            "concurrency": args.concurrency,
+            "python": platform.python_version(),
+        },
+        **summarize(rec, seconds, args.flows),
+    }
+    print_report(result)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if not compare(result, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# bench/bench_indexes.py
+"""
+0003_hot_path_indexes migratsiyasi: indekslardan oldin / keyin so'rov vaqtlari.
+
+    python -m bench.bench_indexes --invites 100000
+
+Vaqtinchalik SQLite baza 0002 gacha migratsiya qilinadi (hot indekslar olib tashlanadi),
+ma'lumot yoziladi, crud'dagi so'rovlar o'lchanadi, keyin 0003 qo'llanib qayta o'lchanadi.
+Har bir so'rov uchun: o'rtacha vaqt (mikrosekund) + EXPLAIN QUERY PLAN.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_TMP_DIR = tempfile.mkdtemp(prefix="sevgi_bench_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_TMP_DIR}/bench.db")
+
+from sqlalchemy import func, insert, select, text  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.db import crud  # noqa: E402
+from app.db.database import SessionLocal, engine  # noqa: E402
+from app.db.migrations import HOT_INDEXES, migrate  # noqa: E402
+from app.db.models import (  # noqa: E402
+    Answer, AnswerChoice, Base, Invite, InviteStatus, Payment, PaymentProvider,
+    PaymentStatus, Question,
+)
+
+STATUSES = list(InviteStatus)
+
+
+def seed(n_invites: int, n_questions: int, paid_ratio: float) -> None:
+    Base.metadata.drop_all(bind=engine)
+    migrate(engine, target=2)
+    with engine.begin() as conn:
+        for _table, name in HOT_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+    rnd = random.Random(7)
+    start = datetime.utcnow() - timedelta(days=180)
+    with SessionLocal() as db:
+        db.execute(insert(Question), [
+            {"text": f"Q{i}", "option_a": "A", "option_b": "B", "tag": "care",
+             "a_score": 2, "b_score": 1, "is_active": i % 10 == 0, "created_at": start}
+            for i in range(n_questions)
+        ])
+        db.execute(insert(Invite), [
+            {"token": f"bench-{i}", "status": rnd.choice(STATUSES),
+             "boy_name": "B", "boy_age": 25, "boy_zodiac": "Arslon",
+             "created_at": start + timedelta(seconds=i * 150), "updated_at": start}
+            for i in range(n_invites)
+        ])
+        qids = [q for (q,) in db.execute(select(Question.id).where(Question.is_active == True))]  # noqa: E712
+        db.execute(insert(Answer), [
+            {"invite_id": inv_id, "question_id": qid, "choice": AnswerChoice.A, "created_at": start}
+            for inv_id in range(1, n_invites + 1)
+            for qid in qids[:12]
+        ])
+        db.execute(insert(Payment), [
+            {"invite_id": inv_id, "amount": 14999, "provider": PaymentProvider.demo,
+             "status": PaymentStatus.paid, "created_at": start}
+            for inv_id in range(1, n_invites + 1) if rnd.random() < paid_ratio
+        ])
+        db.commit()
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def queries(n_invites: int):
+    """(nom, so'rov, parametrlar generatori) - crud/servislardagi hot so'rovlar shakli."""
+    cutoff = datetime.utcnow() - timedelta(days=90)
+    return [
+        (
+            "answers by invite (crud.get_answer_choices)",
+            lambda db, i: crud.get_answer_choices(db, i),
+            select(Answer.question_id, Answer.choice).where(Answer.invite_id == 1),
+        ),
+        (
+            "payments by invite (Invite.payments)",
+            lambda db, i: db.execute(select(Payment).where(Payment.invite_id == i)).all(),
+            select(Payment).where(Payment.invite_id == 1),
+        ),
+        (
+            "invites by status + created_at (TTL/purge oynasi)",
+            lambda db, i: db.execute(
+                select(Invite.id)
+                .where(Invite.status == InviteStatus.created, Invite.created_at < cutoff)
+                .order_by(Invite.created_at).limit(500)
+            ).all(),
+            select(Invite.id).where(Invite.status == InviteStatus.created, Invite.created_at < cutoff)
+            .order_by(Invite.created_at).limit(500),
+        ),
+        (
+            "count by status since (hisobot)",
+            lambda db, i: db.execute(
+                select(func.count()).select_from(Invite)
+                .where(Invite.status == InviteStatus.finished, Invite.created_at >= cutoff)
+            ).scalar(),
+            select(func.count()).select_from(Invite)
+            .where(Invite.status == InviteStatus.finished, Invite.created_at >= cutoff),
+        ),
+        (
+            "active questions (crud.get_12_questions)",
+            lambda db, i: crud.get_12_questions(db),
+            select(Question.id).where(Question.is_active == True),  # noqa: E712
+        ),
+    ]
+
+
+def plan(db: Session, stmt) -> str:
+    sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+    rows = db.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    return "; ".join(r[-1] for r in rows)
+
+
+def measure(n_invites: int, repeat: int) -> dict[str, tuple[float, str]]:
+    rnd = random.Random(11)
+    out = {}
+    with SessionLocal() as db:
+        for name, fn, stmt in queries(n_invites):
+            ids = [rnd.randint(1, n_invites) for _ in range(repeat)]
+            fn(db, ids[0])  # isitish
+            t0 = time.perf_counter()
+            for i in ids:
+                fn(db, i)
+            us = (time.perf_counter() - t0) / repeat * 1e6
+            out[name] = (us, plan(db, stmt))
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invites", type=int, default=100_000)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--paid-ratio", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    seed(args.invites, args.questions, args.paid_ratio)
+    before = measure(args.invites, args.repeat)
+
+    t0 = time.perf_counter()
+    migrate(engine)
+    print(f"0003_hot_path_indexes: {time.perf_counter() - t0:.2f}s ({args.invites:,} invite)\n")
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    after = measure(args.invites, args.repeat)
+
+    for name, (us_before, plan_before) in before.items():
+        us_after, plan_after = after[name]
+        print(f"{name}")
+        print(f"  oldin : {us_before:10.1f} us  | {plan_before}")
+        print(f"  keyin : {us_after:10.1f} us  | {plan_after}")
+        print(f"  x{us_before / us_after:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+# bench/bench_micro.py
+"""
+Mikrobenchmarklar: crud.py funksiyalari, scoring/profiles/zodiac, shablonlar, GET /i/{token}.
+
+    python -m bench.bench_micro                 # o'lchash + baseline bilan solishtirish
+    python -m bench.bench_micro --save          # baseline'ni yangilash (bench/baselines/micro.json)
+    python -m bench.bench_micro --check         # hot funksiya regressiyasida exit code 1
+
+Ma'lumotlar: vaqtinchalik SQLite, qat'iy seed (random.Random(SEED)) - har safar bir xil.
+Har case uchun:
+- us: bitta chaqiruv vaqti (mikrosekund): sof funksiyalarda REPEATS batch'ning eng tezi,
+  DB/route case'larda barcha chaqiruvlar mediani;
+- peak_kb: WARMUP ta isitishdan keyingi bitta chaqiruv davomida tracemalloc peak (--scale ga bog'liq emas);
+- blocks: chaqiruvdan keyin tirik qolgan yangi bloklar soni (tracemalloc snapshot farqi).
+Baseline mashinaga bog'liq - CI'da o'sha mashinada --save qilinadi.
+Regressiya: us baseline'dan --threshold, peak_kb --mem-threshold ulushga (va minimal absolyut
+farqdan) ko'p. Xotira deterministik - vaqtdan ko'ra ishonchliroq signal.
+Faqat hot=True case'lar --check'ni yiqitadi, qolganlari ogohlantirish.
+crud.py dagi har bir public funksiyaning case'i bo'lishi shart (yo'q bo'lsa --check yiqiladi).
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import inspect
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import ExitStack
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+_TMP_DIR = tempfile.mkdtemp(prefix="sevgi_micro_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP_DIR}/micro.db"
+os.environ.setdefault("RETENTION_INTERVAL", "0")
+os.environ.setdefault("OUTBOX_POLL_INTERVAL", "0")
+
+SEED = 1234
+REPEATS = 5
+# xotira o'lchovidan oldingi isitish chaqiruvlari (--scale dan qat'i nazar)
+WARMUP = 20
+BASELINE = Path(__file__).resolve().parent / "baselines" / "micro.json"
+ZODIACS = ["Qo‘y", "Buzoq", "Egizaklar", "Qisqichbaqa", "Arslon", "Parizod",
+           "Tarozi", "Chayon", "O‘qotar", "Echki", "Qovg‘a", "Baliq"]
+
+
+@dataclass
+class Case:
+    name: str
+    run: Callable[[Any], Any]
+    # setup(i) -> run argumenti (o'lchanmaydi). None bo'lsa run(None) batch'da o'lchanadi.
+    setup: Optional[Callable[[int], Any]] = None
+    hot: bool = False
+    iterations: int = 60
+    covers: tuple[str, ...] = ()
+
+
+# ----------------------------
+# Dataset
+# ----------------------------
+class Dataset:
+    def __init__(self, invites: int = 300) -> None:
+        from app.db import crud
+        from app.db.database import SessionLocal
+        from app.db.init_db import init_db
+        from app.db.models import Question
+        from app.services.quiz_service import submit_quiz_by_token
+
+        init_db(drop_all=True)
+        self.rnd = random.Random(SEED)
+        self.db = SessionLocal()
+        self._seq = 0
+        self.qids = [q.id for q in self.db.query(Question).order_by(Question.id)]
+
+        self.created: list[int] = []
+        self.finished: list[int] = []
+        self.created_tokens: list[str] = []
+        self.finished_tokens: list[str] = []
+        self.payments: list[int] = []
+        for i in range(invites):
+            inv = self.new_invite()
+            if i % 2:
+                self.created.append(inv.id)
+                self.created_tokens.append(inv.token)
+                continue
+            crud.set_girl_data_by_token(self.db, inv.token, "Laylo", 22, self.rnd.choice(ZODIACS))
+            submit_quiz_by_token(self.db, inv.token, self.answers_form())
+            self.finished.append(inv.id)
+            self.finished_tokens.append(inv.token)
+            if i % 4 == 0:
+                p = crud.create_payment(self.db, inv.id, provider="payme")
+                crud.set_payment_txn(self.db, p.id, f"seed-txn-{p.id}")
+                self.payments.append(p.id)
+
+    def uniq(self, prefix: str) -> str:
+        self._seq += 1
+        return f"{prefix}-{self._seq}"
+
+    def new_invite(self):
+        from app.db import crud
+
+        return crud.create_invite(
+            self.db, "Bench", self.rnd.randint(18, 40), self.rnd.choice(ZODIACS), token=self.uniq("mb")
+        )
+
+    def new_payment(self) -> int:
+        from app.db import crud
+
+        return crud.create_payment(self.db, self.created[self.rnd.randrange(len(self.created))]).id
+
+    def answers_map(self) -> dict[int, str]:
+        return {qid: self.rnd.choice("AB") for qid in self.qids}
+
+    def answers_form(self) -> dict[str, str]:
+        return {f"q_{qid}": c for qid, c in self.answers_map().items()}
+
+    def fresh(self) -> None:
+        """O'lchovdan oldin: ochiq tranzaksiya va identity map tozalanadi."""
+        self.db.rollback()
+        self.db.expunge_all()
+
+
+# ----------------------------
+# Case'lar
+# ----------------------------
+def build_cases(ds: Dataset, stack: ExitStack) -> list[Case]:
+    from app.db import crud
+    from app.profiles import get_profile
+    from app.services import question_bank
+    from app.services.scoring_service import build_profile
+    from app.services.zodiac_service import zodiac_compatibility
+
+    db, rnd = ds.db, ds.rnd
+
+    def pick(seq):
+        return seq[rnd.randrange(len(seq))]
+
+    def read(ids):
+        def setup(i):
+            ds.fresh()
+            return pick(ids)
+        return setup
+
+    def fresh_invite(i):
+        ds.fresh()
+        return ds.new_invite()
+
+    def fresh_payment(i):
+        ds.fresh()
+        return ds.new_payment()
+
+    cases = [
+        # ---- crud: invites ----
+        Case("crud.create_invite",
+             lambda tok: crud.create_invite(db, "Ali", 24, "Arslon", token=tok),
+             setup=lambda i: (ds.fresh(), ds.uniq("ci"))[1]),
+        Case("crud.get_invite", lambda i: crud.get_invite(db, i), setup=read(ds.finished)),
+        Case("crud.get_invite_by_token", lambda t: crud.get_invite_by_token(db, t),
+             setup=read(ds.created_tokens + ds.finished_tokens), hot=True),
+        Case("crud.apply_invite_opened", lambda inv: crud.apply_invite_opened(db, inv),
+             setup=fresh_invite),
+        Case("crud.mark_invite_opened", lambda inv_id: crud.mark_invite_opened(db, inv_id),
+             setup=lambda i: fresh_invite(i).id),
+        Case("crud.set_girl_data_by_token",
+             lambda tok: crud.set_girl_data_by_token(db, tok, "Laylo", 22, "Baliq"),
+             setup=lambda i: fresh_invite(i).token),
+        Case("crud.apply_invite_finished",
+             lambda inv: crud.apply_invite_finished(db, inv, result_summary="x", zodiac_score=70),
+             setup=fresh_invite),
+        Case("crud.mark_invite_finished",
+             lambda inv_id: crud.mark_invite_finished(db, inv_id, result_summary="x", zodiac_score=70),
+             setup=lambda i: fresh_invite(i).id),
+        # ---- crud: questions / answers ----
+        Case("crud.get_12_questions", lambda _: crud.get_12_questions(db), setup=read([None])),
+        Case("crud.upsert_answers", lambda inv_id: crud.upsert_answers(db, inv_id, ds.answers_map()),
+             setup=read(ds.finished), hot=True),
+        Case("crud.save_answers", lambda inv_id: crud.save_answers(db, inv_id, ds.answers_map()),
+             setup=lambda i: fresh_invite(i).id),
+        Case("crud.get_answer_letters", lambda i: crud.get_answer_letters(db, i), setup=read(ds.finished)),
+        Case("crud.get_answer_choices", lambda i: crud.get_answer_choices(db, i),
+             setup=read(ds.finished), hot=True),
+        Case("crud.get_answers_with_questions", lambda i: crud.get_answers_with_questions(db, i),
+             setup=read(ds.finished)),
+        # ---- crud: payments ----
+        Case("crud.create_payment", lambda inv_id: crud.create_payment(db, inv_id),
+             setup=read(ds.created)),
+        Case("crud.get_payment", lambda p: crud.get_payment(db, p), setup=read(ds.payments)),
+        Case("crud.get_payment_by_txn", lambda p: crud.get_payment_by_txn(db, "payme", f"seed-txn-{p}"),
+             setup=read(ds.payments)),
+        Case("crud.set_payment_txn", lambda p: crud.set_payment_txn(db, p, ds.uniq("txn")),
+             setup=fresh_payment),
+        Case("crud.apply_payment_txn", lambda p: crud.apply_payment_txn(db, p, ds.uniq("txn")),
+             setup=fresh_payment),
+        Case("crud.mark_payment_failed", lambda p: crud.mark_payment_failed(db, p), setup=fresh_payment),
+        Case("crud.apply_payment_paid", lambda p: crud.apply_payment_paid(db, p), setup=fresh_payment),
+        Case("crud.mark_payment_paid", lambda p: crud.mark_payment_paid(db, p), setup=fresh_payment),
+        # ---- crud: funnel / outbox ----
+        Case("crud.bump_funnel", lambda _: crud.bump_funnel(db, "opened"), setup=read([None])),
+        Case("crud.get_funnel_stats", lambda _: crud.get_funnel_stats(db, days=30), setup=read([None])),
+        Case("crud.rebuild_funnel", lambda _: crud.rebuild_funnel(db), setup=read([None]), iterations=20),
+        Case("crud.add_outbox", lambda _: crud.add_outbox(db, "bench", {"x": 1}), setup=read([None])),
+    ]
+
+    # ---- sof funksiyalar (batch) ----
+    letters = [rnd.choice("AB") for _ in range(12)]
+    pairs = [(pick(ZODIACS), pick(ZODIACS)) for _ in range(64)]
+    cases += [
+        Case("scoring.build_profile", lambda _: build_profile(letters), hot=True, iterations=20000),
+        Case("profiles.get_profile", lambda _: [get_profile(b, g) for b, g in pairs],
+             hot=True, iterations=2000),
+        Case("zodiac.zodiac_compatibility", lambda _: [zodiac_compatibility(b, g) for b, g in pairs],
+             hot=True, iterations=2000),
+        Case("question_bank.sample_questions", lambda _: question_bank.sample_questions(db),
+             hot=True, iterations=5000),
+    ]
+
+    # ---- shablonlar ----
+    cases += template_cases(ds)
+
+    # ---- GET /i/{token} (to'liq yo'l: router + servis + DB + shablon) ----
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    # lifespan (assets, shablonlar) o'lchov davomida ochiq; main() dagi stack yopadi
+    client = stack.enter_context(TestClient(app))
+
+    def get(path):
+        r = client.get(path)
+        assert r.status_code == 200, (path, r.status_code)
+
+    # birinchi tashrif (opened yozuvi) crud.*_invite_opened case'larida o'lchanadi; bu yerda
+    # hammasi oldindan ochiladi - aks holda median --scale ga qarab yozuv/o'qish aralashmasiga siljiydi
+    for tok in ds.created_tokens:
+        get(f"/i/{tok}")
+
+    cases += [
+        Case("route.GET /i/{token}", lambda t: get(f"/i/{t}"), setup=read(ds.created_tokens), hot=True),
+        Case("route.GET /result/{token}", lambda t: get(f"/result/{t}"),
+             setup=read(ds.finished_tokens), hot=True),
+    ]
+    return cases
+
+
+def template_cases(ds: Dataset) -> list[Case]:
+    from app.core.templates import env
+    from app.db.database import SessionLocal
+    from app.db.models import Invite
+    from app.services import question_bank
+    from app.services.quiz_service import load_result
+
+    templates_dir = Path(env.loader.searchpath[0])
+    # boshqa case'larning expunge/rollback'i shablon obyektiga ta'sir qilmasin
+    with SessionLocal(expire_on_commit=False) as db:
+        inv = db.get(Invite, ds.finished[0])
+        db.expunge(inv)
+    saved = load_result(inv)
+    contexts: dict[str, dict] = {
+        "index.html": {},
+        "boy_form.html": {},
+        "girl_form.html": {"invite": inv},
+        "share.html": {"invite": inv, "girl_link": f"https://example.com/girl/{inv.token}"},
+        "quiz.html": {"invite": inv, "questions": question_bank.sample_questions(ds.db)},
+        "result.html": {"invite": inv, "profile": saved["blocks"], "zodiac": saved["zodiac"]},
+        "pay.html": {"invite": inv, "amount": 14999, "providers": ["demo", "payme"]},
+        "success.html": {"message": "Tayyor."},
+    }
+    cases = []
+    for path in sorted(templates_dir.glob("*.html")):
+        if path.name not in contexts:
+            raise SystemExit(f"{path.name} uchun kontekst yo'q - bench_micro.template_cases ga qo'shing")
+        tpl, ctx = env.get_template(path.name), contexts[path.name]
+        cases.append(Case(f"template.{path.name}", lambda _, tpl=tpl, ctx=ctx: tpl.render(ctx),
+                          hot=path.name in ("quiz.html", "result.html"), iterations=2000))
+    return cases
+
+
+def uncovered_crud(cases: list[Case]) -> list[str]:
+    from app.db import crud
+
+    public = {
+        name for name, fn in inspect.getmembers(crud, inspect.isfunction)
+        if fn.__module__ == crud.__name__ and not name.startswith("_")
+    }
+    covered = {c.name.split(".", 1)[1] for c in cases if c.name.startswith("crud.")}
+    return sorted(public - covered)
+
+
+# ----------------------------
+# O'lchash
+# ----------------------------
+def measure(case: Case, scale: float) -> dict:
+    n = max(3, int(case.iterations * scale))
+    gc.collect()
+
+    def once_timed(i: int) -> float:
+        arg = case.setup(i) if case.setup else None
+        t0 = time.perf_counter()
+        case.run(arg)
+        return time.perf_counter() - t0
+
+    # isitish: --scale ga bog'liq emas - xotira o'lchovi har doim bir xil holatdan
+    for i in range(WARMUP):
+        once_timed(i)
+
+    # allokatsiya: bitta chaqiruv
+    arg = case.setup(0) if case.setup else None
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    case.run(arg)
+    _current, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(max(0, s.count_diff) for s in after.compare_to(before, "filename"))
+
+    if case.setup is None:
+        # sof funksiyalar: REPEATS ta batch, eng tezining o'rtachasi
+        best = float("inf")
+        for _ in range(REPEATS):
+            t0 = time.perf_counter()
+            for _ in range(n):
+                case.run(None)
+            best = min(best, (time.perf_counter() - t0) / n)
+    else:
+        # DB/route: har chaqiruv alohida, median (commit/fsync cho'qqilari siljitmaydi)
+        best = statistics.median(once_timed(i) for i in range(n * REPEATS))
+
+    return {"us": round(best * 1e6, 2), "peak_kb": round(peak / 1024, 1), "blocks": blocks, "hot": case.hot}
+
+
+def regressions(results: dict, baseline: dict, threshold: float, mem_threshold: float,
+                min_us: float, min_kb: float) -> list[tuple[str, str, bool]]:
+    out = []
+    for name, r in results.items():
+        base = baseline.get("cases", {}).get(name)
+        if not base:
+            continue
+        if r["us"] > base["us"] * (1 + threshold) and r["us"] - base["us"] > min_us:
+            out.append((name, f"vaqt {base['us']:.1f} -> {r['us']:.1f} us", r["hot"]))
+        if r["peak_kb"] > base["peak_kb"] * (1 + mem_threshold) and r["peak_kb"] - base["peak_kb"] > min_kb:
+            out.append((name, f"xotira {base['peak_kb']:.1f} -> {r['peak_kb']:.1f} KB", r["hot"]))
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save", action="store_true", help="natijani baseline sifatida yozish")
+    parser.add_argument("--check", action="store_true", help="hot regressiyada exit 1")
+    parser.add_argument("--baseline", default=str(BASELINE))
+    parser.add_argument("--threshold", type=float, default=0.35, help="vaqt: ruxsat etilgan o'sish (0.35 = 35%%)")
+    parser.add_argument("--mem-threshold", type=float, default=0.15, help="xotira: ruxsat etilgan o'sish")
+    parser.add_argument("--min-us", type=float, default=5.0, help="e'tiborga olinmaydigan absolyut farq (us)")
+    parser.add_argument("--min-kb", type=float, default=4.0, help="e'tiborga olinmaydigan absolyut farq (KB)")
+    parser.add_argument("--scale", type=float, default=1.0, help="iteratsiyalar koeffitsienti")
+    parser.add_argument("-k", default="", help="faqat nomida shu bor case'lar")
+    args = parser.parse_args()
+
+    ds = Dataset()
+    results = {}
+    with ExitStack() as stack:
+        cases = build_cases(ds, stack)
+        missing = uncovered_crud(cases)
+        selected = [c for c in cases if args.k in c.name]
+
+        for case in selected:
+            results[case.name] = measure(case, args.scale)
+            r = results[case.name]
+            mark = "*" if case.hot else " "
+            print(f"{mark} {case.name:<36} {r['us']:>10.1f} us  {r['peak_kb']:>8.1f} KB  {r['blocks']:>6} blk")
+
+    baseline_path = Path(args.baseline)
+    failed = False
+    if missing:
+        print(f"\n❌ crud.py da case'siz funksiyalar: {', '.join(missing)}")
+        failed = True
+    if baseline_path.exists() and not args.save:
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+        found = regressions(results, baseline, args.threshold, args.mem_threshold, args.min_us, args.min_kb)
+        for name, what, hot in found:
+            print(f"{'❌' if hot else '⚠️'} {name}: {what}")
+        failed |= any(hot for _, _, hot in found)
+        if not found:
+            print(f"\n✅ baseline ({baseline.get('meta', {}).get('created')}) bilan regressiya yo'q")
+
+    if args.save:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps({
+            "meta": {"created": datetime.utcnow().isoformat(timespec="seconds"),
+                     "python": sys.version.split()[0], "seed": SEED},
+            "cases": results,
+        }, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"\n💾 baseline yozildi: {baseline_path}")
+
+    if args.check and failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# bench/bench_rescoring.py
+"""
+Batch re-scoring throughput.
+
+    python -m bench.bench_rescoring --invites 1000000 --db-invites 50000
+
+1) in-memory: `invites` ta invite x 12 javob -> choice matrix + vektorlashgan scoring
+   + natija ustunlarini yig'ish (DBsiz, sof hisoblash narxi)
+2) end-to-end: vaqtinchalik SQLite bazada `db-invites` ta finished invite
+   -> rescore_finished_invites (o'qish + hisoblash + bulk UPDATE)
+"""
+from __future__ import annotations
+
+import argparse
+import os
+from datetime import datetime
+from types import SimpleNamespace
+import tempfile
+import time
+
+_TMP_DIR = tempfile.mkdtemp(prefix="sevgi_bench_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_TMP_DIR}/bench.db")
+
+import numpy as np  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app.db.database import SessionLocal  # noqa: E402
+from app.db.init_db import init_db  # noqa: E402
+from app.db.models import Answer, AnswerChoice, Invite, InviteStatus, Question  # noqa: E402
+from app.services.rescoring_service import (  # noqa: E402
+    build_choice_matrix, rescore_finished_invites, result_rows,
+)
+from app.services.scoring_service import (  # noqa: E402
+    DIMENSIONS, compile_tag_weights, score_choice_matrix, score_dimensions_matrix,
+)
+
+ZODIACS = ["Qo‘y", "Buzoq", "Egizaklar", "Qisqichbaqa", "Arslon", "Parizod",
+           "Tarozi", "Chayon", "O‘qotar", "Echki", "Qovg‘a", "Baliq"]
+
+
+def bench_in_memory(n_invites: int, batch_size: int, n_questions: int = 12, bank: int = 40) -> None:
+    rng = np.random.default_rng(42)
+    invite_ids = np.repeat(np.arange(1, n_invites + 1, dtype=np.int64), n_questions)
+    question_ids = rng.integers(1, bank + 1, size=invite_ids.size, dtype=np.int64)
+    choices = rng.integers(1, 3, size=invite_ids.size, dtype=np.int8)
+    boys = rng.integers(0, 12, size=n_invites)
+    girls = rng.integers(0, 12, size=n_invites)
+    pairs = [(ZODIACS[bz], ZODIACS[gz]) for bz, gz in zip(boys.tolist(), girls.tolist())]
+
+    weights = compile_tag_weights(
+        SimpleNamespace(id=q, tag=DIMENSIONS[q % len(DIMENSIONS)], a_score=2, b_score=1)
+        for q in range(1, bank + 1)
+    )
+
+    # prod'dagi kabi batch'larda (natija satrlari xotirada to'planib qolmasin)
+    t_matrix = t_score = t_rows = 0.0
+    for start in range(0, n_invites, batch_size):
+        lo, hi = start * n_questions, min(start + batch_size, n_invites) * n_questions
+
+        t0 = time.perf_counter()
+        _inv, _first, matrix, col_qids = build_choice_matrix(invite_ids[lo:hi], question_ids[lo:hi], choices[lo:hi])
+        t1 = time.perf_counter()
+        a, b, key_codes = score_choice_matrix(matrix)
+        dim_scores = score_dimensions_matrix(weights, col_qids, matrix)
+        t2 = time.perf_counter()
+        result_rows(key_codes, dim_scores, pairs[start:start + batch_size])
+        t3 = time.perf_counter()
+
+        t_matrix += t1 - t0
+        t_score += t2 - t1
+        t_rows += t3 - t2
+
+    total = t_matrix + t_score + t_rows
+    print(f"in-memory: {n_invites:,} invite x {n_questions} javob (batch {batch_size})")
+    print(f"  choice matrix   : {t_matrix:7.3f}s")
+    print(f"  scoring         : {t_score:7.3f}s")
+    print(f"  natija qatorlari: {t_rows:7.3f}s")
+    print(f"  jami            : {total:7.3f}s  ({n_invites / total:,.0f} invite/s)")
+
+
+def seed_db(n_invites: int, n_questions: int = 12) -> None:
+    init_db(drop_all=True)
+    rng = np.random.default_rng(7)
+    now = datetime.utcnow()
+
+    with SessionLocal() as db:
+        qids = [q.id for q in db.query(Question).all()][:n_questions]
+        db.execute(insert(Invite), [
+            {
+                "token": f"bench-{i}", "status": InviteStatus.finished,
+                "boy_name": "B", "boy_age": 25, "boy_zodiac": ZODIACS[i % 12],
+                "girl_name": "G", "girl_age": 23, "girl_zodiac": ZODIACS[(i * 7) % 12],
+                "created_at": now, "updated_at": now, "finished_at": now,
+            }
+            for i in range(n_invites)
+        ])
+        ids = [i for (i,) in db.query(Invite.id).order_by(Invite.id)]
+        choices = rng.integers(0, 2, size=(len(ids), len(qids)))
+        db.execute(insert(Answer), [
+            {"invite_id": inv_id, "question_id": qid,
+             "choice": AnswerChoice.A if c == 0 else AnswerChoice.B, "created_at": now}
+            for inv_id, row in zip(ids, choices.tolist())
+            for qid, c in zip(qids, row)
+        ])
+        db.commit()
+
+
+def bench_db(n_invites: int, batch_size: int) -> None:
+    seed_db(n_invites)
+    with SessionLocal() as db:
+        stats = rescore_finished_invites(db, batch_size=batch_size)
+    print(f"end-to-end (SQLite): {stats.invites:,} invite, {stats.answers:,} javob, "
+          f"{stats.batches} batch, {stats.seconds:.2f}s ({stats.invites_per_sec:,.0f} invite/s)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invites", type=int, default=1_000_000)
+    parser.add_argument("--db-invites", type=int, default=50_000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    bench_in_memory(args.invites, args.batch_size)
+    if args.db_invites:
+        bench_db(args.db_invites, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
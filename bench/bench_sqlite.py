@@ -0,0 +1,183 @@
+# bench/bench_sqlite.py
+"""
+SQLite: default rejim vs production rejim (WAL + pragmalar + serialized writer).
+
+    python -m bench.bench_sqlite --submits 600 --concurrency 32 --processes 2
+    python -m bench.bench_sqlite --dir /var/lib/app      # prod diskida (fsync narxi real)
+
+Har rejim uchun yangi vaqtinchalik baza: seed (girl ma'lumoti kiritilgan invite'lar),
+keyin --processes ta process (gunicorn worker'lari kabi) bir vaqtda POST /i/{token}
+(quiz submit - eng og'ir yozuvchi so'rov) yuboradi. Har process o'z event loop'ida,
+ASGI ichida (tarmoqsiz), --concurrency parallel so'rov bilan.
+
+Rejim SQLITE_PRODUCTION env orqali tanlanadi (app.db.database import paytida o'qiladi),
+shuning uchun har bosqich alohida subprocess. Natija: submit/s, xatolar
+(303 bo'lmagan javob - masalan "database is locked"), p50/p95 (ms).
+
+Eslatma: CPU yadrolari kam bo'lsa submit/s Python CPU'ga tiraladi; fsync arzon diskda
+(virtual disk cache, tmpfs) WAL'ning commit yutug'i ko'rinmaydi - farq xatolar va p95 da.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+MODES = {"default": "0", "production": "1"}
+
+
+# ----------------------------
+# Child: seed / worker
+# ----------------------------
+def seed(n: int, out: Path) -> None:
+    from app.db import crud
+    from app.db.database import SessionLocal
+    from app.db.init_db import init_db
+    from app.db.models import Question
+
+    init_db(drop_all=True)
+    with SessionLocal() as db:
+        qids = [q.id for q in db.query(Question).filter(Question.is_active == True)]  # noqa: E712
+        tokens = []
+        for i in range(n):
+            inv = crud.create_invite(db, "Ali", 24, "Arslon", token=f"sq-{i}")
+            crud.set_girl_data_by_token(db, inv.token, "Laylo", 22, "Baliq")
+            tokens.append(inv.token)
+    out.write_text(json.dumps({"tokens": tokens, "qids": qids}), encoding="utf-8")
+
+
+async def _work(tokens: list[str], qids: list[int], concurrency: int) -> dict:
+    import httpx
+    from app.main import app
+
+    sem = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+    form = {f"q_{q}": "A" for q in qids}
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def one(token: str) -> None:
+                async with sem:
+                    t0 = time.perf_counter()
+                    r = await client.post(f"/i/{token}", data=form, follow_redirects=False)
+                    latencies.append(time.perf_counter() - t0)
+                    if r.status_code != 303:
+                        key = "locked" if "locked" in r.text else str(r.status_code)
+                        errors[key] = errors.get(key, 0) + 1
+
+            t0 = time.perf_counter()
+            await asyncio.gather(*(one(t) for t in tokens))
+            seconds = time.perf_counter() - t0
+
+    return {"n": len(tokens), "seconds": seconds, "latencies": latencies, "errors": errors}
+
+
+def worker(data: Path, part: int, parts: int, concurrency: int) -> None:
+    payload = json.loads(data.read_text(encoding="utf-8"))
+    tokens = payload["tokens"][part::parts]
+    result = asyncio.run(_work(tokens, payload["qids"], concurrency))
+    print(json.dumps(result))
+
+
+# ----------------------------
+# Parent
+# ----------------------------
+def _child(args: list[str], env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "bench.bench_sqlite", *args],
+        env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+
+
+def run_mode(mode: str, submits: int, concurrency: int, processes: int, base_dir=None) -> dict:
+    tmp = Path(tempfile.mkdtemp(prefix=f"sevgi_sqlite_{mode}_", dir=base_dir))
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+        "SQLITE_PRODUCTION": MODES[mode],
+        "RETENTION_INTERVAL": "0",
+        "OUTBOX_POLL_INTERVAL": "0",
+    }
+    data = tmp / "seed.json"
+    if _child(["--seed", str(submits), "--data", str(data)], env).wait() != 0:
+        raise SystemExit(f"{mode}: seed xatosi")
+
+    t0 = time.perf_counter()
+    procs = [
+        _child(["--worker", str(i), "--parts", str(processes), "--data", str(data),
+                "--concurrency", str(concurrency)], env)
+        for i in range(processes)
+    ]
+    results = []
+    for p in procs:
+        out, _ = p.communicate()
+        if p.returncode != 0:
+            raise SystemExit(f"{mode}: worker xatosi")
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    wall = time.perf_counter() - t0
+
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    latencies = sorted(x for r in results for x in r["latencies"])
+    errors: dict[str, int] = {}
+    for r in results:
+        for k, v in r["errors"].items():
+            errors[k] = errors.get(k, 0) + v
+    ok = len(latencies) - sum(errors.values())
+    return {
+        "mode": mode,
+        "ok": ok,
+        "errors": errors,
+        # process start/lifespan'ni hisobga olmaslik uchun - eng sekin worker vaqti
+        "throughput": ok / max(r["seconds"] for r in results),
+        "wall": wall,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SQLite default vs production rejim")
+    parser.add_argument("--submits", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--modes", default="default,production")
+    parser.add_argument("--dir", default=None, help="vaqtinchalik baza papkasi (default: tizim temp)")
+    # ichki (child) rejimlar
+    parser.add_argument("--seed", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--worker", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--parts", type=int, default=1, help=argparse.SUPPRESS)
+    parser.add_argument("--data", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        seed(args.seed, Path(args.data))
+        return
+    if args.worker is not None:
+        worker(Path(args.data), args.worker, args.parts, args.concurrency)
+        return
+
+    print(f"submits={args.submits} concurrency={args.concurrency} processes={args.processes}\n")
+    print(f"{'rejim':<12} {'submit/s':>9} {'ok':>6} {'p50 ms':>8} {'p95 ms':>8}  xatolar")
+    rows = []
+    for mode in args.modes.split(","):
+        r = run_mode(mode, args.submits, args.concurrency, args.processes, args.dir)
+        rows.append(r)
+        print(f"{r['mode']:<12} {r['throughput']:>9.1f} {r['ok']:>6} {r['p50']:>8.1f} {r['p95']:>8.1f}  "
+              f"{r['errors'] or '-'}")
+    if len(rows) == 2 and rows[0]["throughput"]:
+        print(f"\n⚡ production / default: x{rows[1]['throughput'] / rows[0]['throughput']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
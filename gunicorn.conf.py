@@ -0,0 +1,48 @@
+# gunicorn.conf.py
+"""
+Ko'p worker'li deploy: gunicorn + uvicorn worker'lari.
+
+    gunicorn app.main:app -c gunicorn.conf.py
+
+- workers: WEB_CONCURRENCY (bo'lmasa CPU yadrolari soni) - har yadroda bitta event loop;
+- preload_app: ilova master'da bir marta import qilinadi (shablonlar, profil/zodiak
+  jadvallari, kod) - fork'dan keyin worker'lar bu xotirani copy-on-write bo'lishadi;
+- post_fork: master'da import paytida yaratilgan engine pool'lari bolada tashlanadi
+  (dispose(close=False)) - ota ulanishlari ikki process orasida bo'linmaydi, har worker
+  o'z ulanishlarini ochadi;
+- APP_WORKERS: post_fork'da arbiter'dagi haqiqiy worker soni (-w/--workers, TTIN/TTOU
+  bilan ham to'g'ri) config'ga yoziladi: DB pool'lar DB_MAX_CONNECTIONS (host bo'yicha
+  jami) dan shu son va engine'lar soniga bo'linib qayta yaratiladi, Telegram rate limit
+  ham worker'larga bo'linadi.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY") or multiprocessing.cpu_count())
+
+try:
+    import uvicorn_worker  # noqa: F401
+
+    worker_class = "uvicorn_worker.UvicornWorker"
+except ImportError:
+    worker_class = "uvicorn.workers.UvicornWorker"
+
+preload_app = True
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "20"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+# xotira sizib chiqsa ham worker'lar vaqti-vaqti bilan yangilanadi (jitter bilan - bir vaqtda emas)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "1000"))
+accesslog = os.getenv("GUNICORN_ACCESSLOG") or None
+
+
+def post_fork(server, worker):
+    from app.core import config
+    from app.db.database import dispose_after_fork
+
+    # modul darajasidagi `workers` emas: CLI -w/--workers uni bekor qiladi
+    config.APP_WORKERS = server.num_workers
+    dispose_after_fork()
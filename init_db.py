@@ -1,10 +1,10 @@
 # init_db.py
 from app.db.database import engine
-from app.db.models import Base
 from app.db import models  # noqa: F401  (model'lar ro'yxatdan o'tsin)
+from app.db.migrations import migrate
 
 def main():
-    Base.metadata.create_all(bind=engine)
+    migrate(engine)
     print("✅ DB tables created successfully")
 
 if __name__ == "__main__":
@@ -0,0 +1,141 @@
+import os
+import tempfile
+
+# app.db.database import paytida DATABASE_URL o'qiydi - shuning uchun eng oldin
+_TMP_DIR = tempfile.mkdtemp(prefix="sevgi_test_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP_DIR}/test.db"
+os.environ["RETENTION_INTERVAL"] = "0"
+os.environ["OUTBOX_POLL_INTERVAL"] = "0"
+os.environ["ARCHIVE_DIR"] = f"{_TMP_DIR}/archive"
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _init_db():
+    from app.db.init_db import init_db
+
+    init_db(drop_all=True)
+    yield
+
+
+@pytest.fixture()
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+class LocalServer:
+    """aiohttp.web ilovasini alohida thread/event loop'da 127.0.0.1:<port> da ishlatadi."""
+
+    def __init__(self, app):
+        import asyncio
+        import threading
+
+        self.app = app
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.url = ""
+
+    def __enter__(self):
+        import asyncio
+        from aiohttp import web
+
+        async def start():
+            self._runner = web.AppRunner(self.app)
+            await self._runner.setup()
+            site = web.TCPSite(self._runner, "127.0.0.1", 0)
+            await site.start()
+            return site._server.sockets[0].getsockname()[1]
+
+        self._thread.start()
+        port = asyncio.run_coroutine_threadsafe(start(), self.loop).result(5)
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+    def __exit__(self, *exc):
+        import asyncio
+
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(5)
+
+
+@pytest.fixture()
+def fake_payme(monkeypatch):
+    """Payme o'rnini bosuvchi lokal server: POST /checkout (imzo tekshiriladi)."""
+    import json
+    from aiohttp import web
+    from app.core import config
+    from app.services import payment_service
+
+    secret = "test-payme-secret"
+    calls = []
+
+    async def checkout(request):
+        body = await request.read()
+        if not payment_service.verify_signature(secret, body, request.headers.get("X-Signature", "")):
+            return web.json_response({"error": "bad signature"}, status=403)
+        data = json.loads(body)
+        calls.append(data)
+        if data["amount"] == 1:  # timeout ssenariysi
+            import asyncio
+            await asyncio.sleep(1)
+        txn = f"txn-{data['order_id']}"
+        return web.json_response({"txn_id": txn, "checkout_url": f"{server.url}/pay/{txn}"})
+
+    app = web.Application()
+    app.router.add_post("/checkout", checkout)
+    with LocalServer(app) as server:
+        monkeypatch.setattr(config, "PAYME_API_URL", server.url)
+        monkeypatch.setattr(config, "PAYME_MERCHANT_ID", "m-1")
+        monkeypatch.setattr(config, "PAYME_SECRET_KEY", secret)
+        server.secret = secret
+        server.calls = calls
+        yield server
+
+
+@pytest.fixture()
+def fake_bot_api(monkeypatch):
+    """
+    Telegram Bot API o'rnini bosuvchi lokal server: /bot<token>/sendMessage.
+    Birinchi so'rovga 429 (retry_after=0) qaytaradi - retry yo'li ham tekshiriladi.
+    server.bad_gateway dagi chat_id'larga bir marta HTML 502 (proxy sahifasi) qaytariladi.
+    """
+    import time
+    from aiohttp import web
+    from app.core import config
+
+    token = "123:test"
+    sent = []
+    state = {"throttled": False}
+    bad_gateway: set[int] = set()
+
+    async def send_message(request):
+        if request.match_info["token"] != token:
+            return web.json_response({"ok": False, "description": "Unauthorized"}, status=401)
+        data = await request.json()
+        if data["chat_id"] in bad_gateway:
+            bad_gateway.discard(data["chat_id"])
+            return web.Response(text="<html><h1>502 Bad Gateway</h1></html>", status=502,
+                                content_type="text/html")
+        if not state["throttled"]:
+            state["throttled"] = True
+            return web.json_response(
+                {"ok": False, "error_code": 429, "parameters": {"retry_after": 0}}, status=429
+            )
+        sent.append({**data, "t": time.monotonic(), "peer": request.transport.get_extra_info("peername")})
+        return web.json_response({"ok": True, "result": {"message_id": len(sent)}})
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/sendMessage", send_message)
+    with LocalServer(app) as server:
+        monkeypatch.setattr(config, "TELEGRAM_BOT_TOKEN", token)
+        monkeypatch.setattr(config, "TELEGRAM_API_URL", server.url)
+        server.token = token
+        server.sent = sent
+        server.bad_gateway = bad_gateway
+        yield server
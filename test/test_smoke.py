@@ -0,0 +1,808 @@
+import re
+
+
+def _start(client) -> str:
+    r = client.post(
+        "/start",
+        data={"boy_name": "Ali", "boy_age": 24, "boy_zodiac": "Arslon"},
+        follow_redirects=False,
+    )
+    assert r.status_code == 303
+    return r.headers["location"].rsplit("/", 1)[-1]
+
+
+def test_index(client):
+    assert client.get("/").status_code == 200
+
+
+def test_full_flow(client):
+    token = _start(client)
+    assert client.get(f"/share/{token}").status_code == 200
+
+    r = client.post(
+        f"/girl/{token}",
+        data={"girl_name": "Laylo", "girl_age": 22, "girl_zodiac": "Tarozi"},
+        follow_redirects=False,
+    )
+    assert r.status_code == 303
+
+    r = client.get(f"/i/{token}")
+    assert r.status_code == 200
+    qids = re.findall(r'name="q_(\d+)"', r.text)
+    assert qids
+
+    r = client.post(f"/i/{token}", data={f"q_{q}": "A" for q in set(qids)}, follow_redirects=False)
+    assert r.status_code == 303
+
+    assert client.get(f"/result/{token}").status_code == 200
+
+    data = client.get(f"/api/result/{token}").json()
+    assert data["status"] == "finished"
+    assert data["profile"]["key"] == "emotion"
+    assert data["zodiac"]["score"] == 70
+    assert data["blocks"]["block1"]["title"]
+
+
+def test_api_invite(client):
+    r = client.post("/api/invites", json={"boy_name": "Vali", "boy_age": 30, "boy_zodiac": "Baliq"})
+    assert r.status_code == 200
+    token = r.json()["token"]
+    assert client.get(f"/api/invites/{token}").json()["status"] == "created"
+    assert client.get("/api/invites/yoq-token").status_code == 404
+
+
+def test_question_bank_cache():
+    from app.db.database import SessionLocal
+    from app.db.models import Question
+    from app.services import question_bank
+
+    with SessionLocal() as db:
+        bank = question_bank.get_bank(db)
+        assert question_bank.get_bank(db) is bank
+
+        picked = question_bank.sample_questions(db)
+        assert len({q.id for q in picked}) == len(picked) == min(12, len(bank.items))
+
+        q = db.get(Question, bank.items[0].id)
+        q.is_active = False
+        db.commit()
+        try:
+            fresh = question_bank.get_bank(db)
+            assert fresh.version > bank.version
+            assert q.id not in fresh.by_id
+        finally:
+            q.is_active = True
+            db.commit()
+
+
+def test_save_answers_upsert_matches_loop():
+    from app.db import crud
+    from app.db.database import SessionLocal
+    from app.db.models import Answer, Question
+
+    with SessionLocal() as db:
+        qids = [q.id for q in db.query(Question).limit(3)]
+        a = crud.create_invite(db, "Ali", 24, "Arslon", token="upsert-a")
+        b = crud.create_invite(db, "Ali", 24, "Arslon", token="upsert-b")
+
+        first = {qids[0]: "A", qids[1]: "b", qids[2]: "x"}
+        second = {qids[1]: "A", qids[2]: "B"}
+
+        crud.save_answers(db, a.id, first)
+        crud.save_answers(db, a.id, second)
+
+        crud._save_answers_loop(db, b.id, crud._normalize_answers(first))
+        db.commit()
+        crud._save_answers_loop(db, b.id, crud._normalize_answers(second))
+        db.commit()
+
+        def snapshot(invite_id):
+            rows = db.query(Answer).filter(Answer.invite_id == invite_id)
+            return sorted((r.question_id, r.choice.value) for r in rows)
+
+        assert snapshot(a.id) == snapshot(b.id) == [(qids[0], "A"), (qids[1], "A"), (qids[2], "B")]
+
+
+def test_submit_quiz_single_transaction():
+    import pytest
+    from app.db import crud
+    from app.db.database import SessionLocal
+    from app.db.models import Answer, InviteStatus, Question
+    from app.services import quiz_service
+
+    with SessionLocal() as db:
+        qids = [q.id for q in db.query(Question).limit(5)]
+        inv = crud.create_invite(db, "Ali", 24, "Arslon", token="uow-1")
+
+        with pytest.raises(quiz_service.QuizError):
+            quiz_service.submit_quiz_by_token(db, "uow-1", {"foo": "A"})
+        db.refresh(inv)
+        assert inv.status == InviteStatus.created
+
+        quiz_service.submit_quiz_by_token(db, "uow-1", {f"q_{q}": "B" for q in qids})
+        db.expire_all()
+        assert inv.status == InviteStatus.finished
+        assert inv.opened_at is not None
+        assert db.query(Answer).filter(Answer.invite_id == inv.id).count() == len(qids)
+        assert quiz_service.get_profile_for_invite(db, "uow-1")["key"] == "attention"
+
+
+def test_concurrent_submit_finishes_once():
+    import json
+    import pytest
+    from app.db import crud
+    from app.db.database import SessionLocal
+    from app.db.models import InviteStatus, OutboxEvent, Question
+    from app.services import quiz_service
+
+    with SessionLocal() as a, SessionLocal() as b:
+        qids = [q.id for q in a.query(Question).limit(5)]
+        form = {f"q_{q}": "A" for q in qids}
+        inv = crud.create_invite(a, "Ali", 24, "Arslon", token="cas-1")
+        a.commit()
+        def finished():
+            return sum(row["finished"] for row in crud.get_funnel_stats(a, days=1))
+
+        finished_before = finished()
+        # a: status tekshiruvidan o'tgan, lekin hali yakunlamagan submit (eskirgan snapshot)
+        assert crud.get_invite_by_token(a, "cas-1").status != InviteStatus.finished
+
+        quiz_service.submit_quiz_by_token(b, "cas-1", form)
+        with pytest.raises(quiz_service.QuizError):
+            quiz_service.submit_quiz_by_token(a, "cas-1", form)
+        a.refresh(inv)
+        assert inv.status == InviteStatus.finished  # eskirgan "opened" ustidan yozilmadi
+
+        events = [e for e in a.query(OutboxEvent).filter(OutboxEvent.topic == "invite.finished")
+                  if json.loads(e.payload)["invite_id"] == inv.id]
+        assert len(events) == 1
+        assert finished() == finished_before + 1
+
+
+def test_girl_data_counts_opened_once():
+    from app.db import crud
+    from app.db.database import SessionLocal
+
+    with SessionLocal() as a, SessionLocal() as b:
+        crud.create_invite(a, "Ali", 24, "Arslon", token="girl-once")
+        def opened():
+            return sum(row["opened"] for row in crud.get_funnel_stats(a, days=1))
+
+        opened_before = opened()
+        stale = crud.get_invite_by_token(b, "girl-once")  # b: "created" snapshot
+        crud.set_girl_data_by_token(a, "girl-once", "Laylo", 22, "Baliq")
+        crud.set_girl_data_by_token(b, "girl-once", "Laylo", 23, "Baliq")
+        crud.set_girl_data_by_token(a, "girl-once", "Laylo", 23, "Baliq")
+        assert opened() == opened_before + 1
+        assert stale.girl_age == 23
+
+
+def test_signed_invite_tokens(monkeypatch):
+    from app.core import config, security
+    from app.db import crud
+    from app.db.database import SessionLocal
+    from app.services import invite_service
+    from app.services.invite_service import CreateInviteDTO
+
+    monkeypatch.setattr(config, "INVITE_TOKEN_SECRET", "test-secret")
+
+    with SessionLocal() as db:
+        inv = invite_service.create_invite(db, CreateInviteDTO("Ali", 24, "Arslon"))
+        assert security.verify_invite_token(inv.token) == inv.id
+        assert crud.get_invite_by_token(db, inv.token).id == inv.id
+        token = inv.token
+
+        legacy = crud.create_invite(db, "Ali", 24, "Arslon", token="legacy-token-1")
+        assert crud.get_invite_by_token(db, "legacy-token-1").id == legacy.id
+
+    invite_id, nonce, _sig = token.split(".")
+    forged = f"{invite_id}.{nonce}.{'A' * 22}"
+    # soxta/axlat token DBga bormaydi (db=None)
+    assert crud.get_invite_by_token(None, forged) is None
+    assert crud.get_invite_by_token(None, "<script>") is None
+
+
+def test_create_invite_retries_on_token_collision(monkeypatch):
+    from app.db import crud
+    from app.db.database import SessionLocal
+    from app.services import invite_service
+    from app.services.invite_service import CreateInviteDTO
+
+    tokens = iter(["dup-token-1", "fresh-token-1"])
+    monkeypatch.setattr(invite_service, "generate_token", lambda: next(tokens))
+
+    with SessionLocal() as db:
+        crud.create_invite(db, "Ali", 24, "Arslon", token="dup-token-1")
+        inv = invite_service.create_invite(db, CreateInviteDTO("Vali", 30, "Baliq"))
+        assert inv.token == "fresh-token-1"
+        assert inv.boy_name == "Vali"
+
+
+def test_conditional_caching(client):
+    from datetime import datetime
+    from sqlalchemy import update
+    from app.db.database import SessionLocal
+    from app.db.models import Invite
+
+    token = _start(client)
+
+    r = client.get(f"/share/{token}")
+    etag = r.headers["etag"]
+    assert r.headers["cache-control"] == "private, no-cache"
+
+    r = client.get(f"/share/{token}", headers={"If-None-Match": etag})
+    assert r.status_code == 304 and r.content == b""
+
+    # Last-Modified faqat butun soniyadagi updated_at uchun; shu soniya ichidagi keyingi
+    # o'zgarish If-Modified-Since bo'yicha 304 bermasligi kerak
+    second = datetime.utcnow().replace(microsecond=0)
+    with SessionLocal() as db:
+        db.execute(update(Invite).where(Invite.token == token).values(updated_at=second))
+        db.commit()
+    r = client.get(f"/api/invites/{token}")
+    last_modified = r.headers["last-modified"]
+    r = client.get(f"/api/invites/{token}", headers={"If-Modified-Since": last_modified})
+    assert r.status_code == 304
+    with SessionLocal() as db:
+        db.execute(update(Invite).where(Invite.token == token).values(updated_at=second.replace(microsecond=500000)))
+        db.commit()
+    r = client.get(f"/api/invites/{token}", headers={"If-Modified-Since": last_modified})
+    assert r.status_code == 200 and "last-modified" not in r.headers
+    etag = client.get(f"/share/{token}").headers["etag"]
+
+    client.post(
+        f"/girl/{token}",
+        data={"girl_name": "Laylo", "girl_age": 22, "girl_zodiac": "Tarozi"},
+        follow_redirects=False,
+    )
+    r = client.get(f"/share/{token}", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["etag"] != etag
+
+
+def test_fingerprinted_static_assets(client):
+    r = client.get("/")
+    href = re.search(r'href="(/static/css/style\.[0-9a-f]{10}\.css)"', r.text).group(1)
+
+    r = client.get(href, headers={"Accept-Encoding": "gzip"})
+    assert r.status_code == 200
+    assert r.headers["content-encoding"] == "gzip"
+    assert "immutable" in r.headers["cache-control"]
+    assert r.headers["content-type"].startswith("text/css")
+
+    r = client.get(href, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in r.headers
+    assert b"{" in r.content
+
+    assert client.get("/static/css/style.css").status_code == 200
+
+
+def test_zodiac_parsing_and_tables():
+    from app.profiles import DEFAULT_PROFILE, PROFILES, get_profile
+    from app.services.zodiac_service import Zodiac, parse_zodiac, zodiac_compatibility
+
+    assert parse_zodiac("Qo‘y") is parse_zodiac("qo'y") is parse_zodiac(" Aries ") is parse_zodiac("Овен") is Zodiac.aries
+    assert parse_zodiac("nimadir") is None
+
+    assert get_profile("Qo‘y", "tarozi") is PROFILES[("Aries", "Libra")]
+    assert get_profile("Libra", "aries") is PROFILES[("Aries", "Libra")]
+    assert get_profile("nimadir", "Baliq") is DEFAULT_PROFILE
+
+    assert zodiac_compatibility("Arslon", "Leo")["score"] == 90
+    assert zodiac_compatibility("Arslon", "Baliq")["score"] == 70
+    assert zodiac_compatibility("Arslon", "")["score"] is None
+
+
+def test_batch_rescoring_matches_build_result():
+    from app.db.database import SessionLocal
+    from app.db.models import Invite, InviteStatus
+    from app.services import quiz_service
+    from app.services.rescoring_service import rescore_finished_invites
+
+    with SessionLocal() as db:
+        finished = db.query(Invite).filter(Invite.status == InviteStatus.finished).all()
+        assert finished
+        expected = {
+            inv.id: quiz_service.build_result(db, inv, quiz_service._get_invite_answers(db, inv.id))
+            for inv in finished
+        }
+        for inv in finished:
+            inv.result_data = None
+        db.commit()
+
+        stats = rescore_finished_invites(db, batch_size=1)
+        assert stats.invites == len(finished)
+
+        db.expire_all()
+        for inv in finished:
+            assert quiz_service.load_result(inv) == expected[inv.id]
+
+
+def test_tag_weighted_dimensions():
+    from types import SimpleNamespace
+
+    from app.services.scoring_service import DIMENSIONS, compile_tag_weights, score_dimensions
+
+    bank = [
+        SimpleNamespace(id=1, tag="care", a_score=2, b_score=1),
+        SimpleNamespace(id=2, tag="care", a_score=1, b_score=3),
+        SimpleNamespace(id=3, tag="trust", a_score=2, b_score=2),
+        SimpleNamespace(id=4, tag="respect", a_score=5, b_score=5),
+    ]
+    weights = compile_tag_weights(bank, version=1)
+
+    dims = score_dimensions(weights, {1: "A", 2: "B", 3: "A", 4: "A", 99: "B"})
+    assert set(dims) == set(DIMENSIONS)
+    assert dims["care"] == {"score": 5, "a": 2, "b": 3, "max": 5}
+    assert dims["trust"] == {"score": 2, "a": 2, "b": 0, "max": 2}
+    assert dims["romance"]["max"] == 0
+
+
+def test_funnel_rollup(client):
+    from app.db import crud
+    from app.db.database import SessionLocal
+    from app.db.models import Question
+
+    def today(db):
+        return crud.get_funnel_stats(db, days=1)[0]
+
+    with SessionLocal() as db:
+        before = today(db)
+        qids = [q.id for q in db.query(Question).limit(4)]
+        inv = crud.create_invite(db, "Ali", 24, "Arslon", token="funnel-1")
+        p = crud.create_payment(db, inv.id)
+        crud.mark_payment_paid(db, p.id)
+        crud.mark_payment_paid(db, p.id)  # takroriy webhook - qayta sanalmaydi
+        crud.set_girl_data_by_token(db, "funnel-1", "Laylo", 22, "Baliq")
+        from app.services import quiz_service
+        quiz_service.submit_quiz_by_token(db, "funnel-1", {f"q_{q}": "A" for q in qids})
+
+        after = today(db)
+        for metric in crud.FUNNEL_METRICS:
+            assert after[metric] - before[metric] == 1, metric
+
+        # inkremental rollup == invites/payments dan qayta hisoblangan
+        incremental = crud.get_funnel_stats(db, days=3)
+        crud.rebuild_funnel(db)
+        assert crud.get_funnel_stats(db, days=3) == incremental
+
+    r = client.get("/api/stats?days=7")
+    assert r.status_code == 200
+    data = r.json()
+    assert len(data["days"]) == 7
+    assert data["days"][-1] == after
+    assert data["totals"]["finished"] >= 1
+
+
+def test_migrations_upgrade_legacy_db(tmp_path):
+    from sqlalchemy import create_engine, inspect, text
+    from app.db.migrations import MIGRATIONS, applied_versions, migrate
+    from app.db.models import Base
+
+    eng = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+    # create_all davridagi baza: result_data va hot indekslar yo'q
+    Base.metadata.create_all(eng)
+    with eng.begin() as conn:
+        conn.execute(text("DROP TABLE schema_migrations"))
+        for name in ("ix_payments_invite_id", "ix_invites_status_created_at", "ix_questions_is_active"):
+            conn.execute(text(f"DROP INDEX {name}"))
+        conn.execute(text("ALTER TABLE invites DROP COLUMN result_data"))
+
+    assert len(migrate(eng)) == len(MIGRATIONS)
+    assert migrate(eng) == []
+    assert applied_versions(eng) == {m.version for m in MIGRATIONS}
+
+    insp = inspect(eng)
+    assert "result_data" in {c["name"] for c in insp.get_columns("invites")}
+    assert "ix_invites_status_created_at" in {i["name"] for i in insp.get_indexes("invites")}
+    assert "ix_payments_invite_id" in {i["name"] for i in insp.get_indexes("payments")}
+
+
+def test_retention_expire_purge_archive(client, monkeypatch):
+    import gzip
+    import json
+    from datetime import datetime, timedelta
+    from pathlib import Path
+    from app.core import config
+    from app.db import crud
+    from app.db.database import SessionLocal
+    from app.db.models import Answer, Invite, InviteStatus, Payment, PaymentStatus, Question
+    from app.services import retention_service
+    from app.services.quiz_service import submit_quiz_by_token
+
+    monkeypatch.setattr(config, "RETENTION_BATCH_SIZE", 1)
+    monkeypatch.setattr(retention_service, "BATCH_PAUSE", 0)
+    now = datetime.utcnow()
+
+    with SessionLocal() as db:
+        qids = [q.id for q in db.query(Question).limit(3)]
+
+        def make(token, age_days):
+            inv = crud.create_invite(db, "Ali", 24, "Arslon", token=token)
+            inv.created_at = now - timedelta(days=age_days)
+            db.commit()
+            return inv.id
+
+        fresh = make("ret-fresh", 1)
+        stale = make("ret-stale", 20)
+        dead = make("ret-dead", 60)
+        old = make("ret-old", 0)
+        submit_quiz_by_token(db, "ret-old", {f"q_{q}": "A" for q in qids})
+        db.get(Invite, old).created_at = now - timedelta(days=200)
+        db.commit()
+        # TTL dan oldin boshlangan checkout: paid webhook invite expired bo'lgach keladi
+        late = make("ret-late-paid", 60)
+        late_payment = crud.create_payment(db, late, amount=1, provider="payme").id
+        db.get(Invite, late).status = InviteStatus.expired
+        db.commit()
+        assert crud.apply_payment_paid(db, late_payment)
+        db.commit()
+
+        # TTL o'tgan, lekin hali fon vazifasi ishlamagan - darhol expired
+        assert client.get("/i/ret-stale").status_code == 410
+        assert client.get("/girl/ret-stale").status_code == 410
+        assert client.get("/girl/ret-fresh").status_code == 200
+
+        stats = retention_service.run_retention(db, now=now)
+        assert (stats.expired, stats.purged, stats.archived, stats.files) == (2, 1, 1, 1)
+
+        db.expire_all()
+        assert db.get(Invite, fresh).status == InviteStatus.created
+        assert db.get(Invite, stale).status == InviteStatus.expired
+        assert db.get(Invite, dead) is None
+        assert db.get(Invite, old) is None
+        assert db.query(Answer).filter(Answer.invite_id == old).count() == 0
+        # to'langan invite purge'ga tushmaydi - paid payment o'chmaydi
+        assert db.get(Invite, late).status == InviteStatus.paid
+        assert db.get(Payment, late_payment).status == PaymentStatus.paid
+
+    [path] = Path(config.ARCHIVE_DIR).glob("*.ndjson.gz")
+    [rec] = [json.loads(line) for line in gzip.open(path, "rt", encoding="utf-8")]
+    assert rec["id"] == old and rec["status"] == "finished"
+    assert sorted(a["question_id"] for a in rec["answers"]) == sorted(qids)
+
+
+def test_payme_checkout_and_idempotent_webhook(client, fake_payme, monkeypatch):
+    import json
+    from app.core import config
+    from app.db import crud
+    from app.db.database import SessionLocal
+    from app.db.models import InviteStatus, Payment, PaymentStatus
+    from app.services.payment_service import sign
+
+    with SessionLocal() as db:
+        inv = crud.create_invite(db, "Ali", 24, "Arslon", token="pay-1")
+        invite_id = inv.id
+        paid_before = crud.get_funnel_stats(db, days=1)[0]["paid"]
+
+    page = client.get("/pay/pay-1")
+    assert page.status_code == 200 and 'value="payme"' in page.text
+
+    r = client.post("/pay/pay-1", data={"provider": "payme"}, follow_redirects=False)
+    assert r.status_code == 303
+    assert r.headers["location"].startswith(f"{fake_payme.url}/pay/txn-")
+    [call] = fake_payme.calls
+    assert call["merchant_id"] == "m-1" and call["amount"] == config.PAYMENT_AMOUNT
+
+    payload = {"txn_id": f"txn-{call['order_id']}", "order_id": call["order_id"],
+               "amount": config.PAYMENT_AMOUNT, "status": "paid"}
+    body = json.dumps(payload).encode()
+
+    def webhook(body, secret=fake_payme.secret):
+        return client.post("/payments/webhook/payme", content=body,
+                           headers={"X-Signature": sign(secret, body)})
+
+    assert webhook(body, secret="wrong").status_code == 403
+    assert webhook(body).json()["result"] == "paid"
+    assert webhook(body).json()["result"] == "duplicate"
+    bad_amount = json.dumps({**payload, "amount": 1}).encode()
+    assert webhook(bad_amount).status_code == 400
+    # noto'g'ri tipdagi/ulkan qiymatlar - 500 emas, 400
+    for bad in ({"amount": "abc"}, {"amount": [1]}, {"amount": 1e400},
+                {"txn_id": "txn-new", "order_id": "²"}, {"txn_id": "txn-new", "order_id": "9" * 40}):
+        assert webhook(json.dumps({**payload, **bad}).encode()).status_code == 400, bad
+
+
+    # demo provider default o'chiq: sahifada yo'q, POST rad etiladi
+    assert 'value="demo"' not in page.text
+    assert client.post("/pay/pay-1", data={"provider": "demo"}).status_code == 502
+
+    with SessionLocal() as db:
+        p = db.get(Payment, call["order_id"])
+        assert p.status == PaymentStatus.paid and p.provider_txn_id == payload["txn_id"]
+        assert crud.get_invite(db, invite_id).status == InviteStatus.paid
+        assert crud.get_funnel_stats(db, days=1)[0]["paid"] == paid_before + 1
+
+    # checkout javobidan oldin kelgan webhook: rad etilgani txn'ni bog'lab qo'ymaydi
+    with SessionLocal() as db:
+        late = crud.create_payment(db, invite_id, amount=config.PAYMENT_AMOUNT, provider="payme").id
+    late_payload = {**payload, "txn_id": "txn-late", "order_id": late}
+    for bad in ({"amount": 1}, {"status": "refunded"}):
+        assert webhook(json.dumps({**late_payload, **bad}).encode()).status_code == 400, bad
+    with SessionLocal() as db:
+        assert db.get(Payment, late).provider_txn_id is None
+    assert webhook(json.dumps(late_payload).encode()).json()["result"] == "paid"
+
+    # provider javob bermasa: timeout -> 502, payment failed
+    monkeypatch.setattr(config, "PAYMENT_TIMEOUT", 0.3)
+    monkeypatch.setattr(config, "PAYMENT_AMOUNT", 1)
+    from app.services import payment_service
+    client.portal.call(payment_service.close_http)  # yangi timeout bilan qayta yaratilsin
+    r = client.post("/pay/pay-1", data={"provider": "payme"}, follow_redirects=False)
+    assert r.status_code == 502
+    with SessionLocal() as db:
+        last = db.query(Payment).order_by(Payment.id.desc()).first()
+        assert last.status == PaymentStatus.failed
+
+
+def test_outbox_written_with_status_and_drained_with_retry(client):
+    import json
+    from datetime import datetime, timedelta
+    from app.db import crud
+    from app.db.database import SessionLocal
+    from app.db.models import OutboxEvent, OutboxStatus, Question
+    from app.services import outbox_service, quiz_service
+
+    with SessionLocal() as db:
+        qids = [q.id for q in db.query(Question).limit(3)]
+        db.query(OutboxEvent).delete()
+        db.commit()
+        inv = crud.create_invite(db, "Ali", 24, "Arslon", token="outbox-1")
+        quiz_service.submit_quiz_by_token(db, "outbox-1", {f"q_{q}": "A" for q in qids})
+        [ev] = db.query(OutboxEvent).all()
+        assert ev.topic == "invite.finished" and json.loads(ev.payload) == {"invite_id": inv.id}
+
+    seen = []
+
+    async def flaky(payload):
+        seen.append(payload)
+        if len(seen) == 1:
+            raise RuntimeError("vaqtincha xato")
+
+    outbox_service.register("invite.finished")(flaky)
+    try:
+        assert client.portal.call(outbox_service.drain_once) == 1
+        with SessionLocal() as db:
+            ev = db.query(OutboxEvent).one()
+            assert ev.status == OutboxStatus.pending and ev.attempts == 1
+            assert "vaqtincha" in ev.last_error
+            retry_at = ev.available_at
+
+        # backoff: vaqti kelmaguncha olinmaydi
+        assert client.portal.call(outbox_service.drain_once) == 0
+        later = retry_at + timedelta(seconds=1)
+        assert client.portal.call(lambda: outbox_service.drain_once(now=later)) == 1
+    finally:
+        outbox_service.unregister("invite.finished", flaky)
+
+    with SessionLocal() as db:
+        ev = db.query(OutboxEvent).one()
+        assert ev.status == OutboxStatus.done and ev.attempts == 2 and ev.processed_at is not None
+    assert seen == [{"invite_id": inv.id}] * 2
+
+    # retention: yosh bajarilgan vaqtdan (processed_at) hisoblanadi, lease (available_at) emas
+    from app.services.retention_service import purge_outbox
+    with SessionLocal() as db:
+        ev = db.query(OutboxEvent).one()
+        ev.available_at = ev.processed_at - timedelta(days=30)
+        db.commit()
+        done_at = ev.processed_at
+        assert purge_outbox(db, done_at + timedelta(days=1), older_than_days=7, batch_size=10) == 0
+        assert purge_outbox(db, done_at + timedelta(days=8), older_than_days=7, batch_size=10) == 1
+
+
+def test_telegram_dispatcher_rate_limit_and_retry(fake_bot_api):
+    import asyncio
+    from app.services.notification_service import Notification, TelegramDispatcher
+
+    async def run():
+        d = TelegramDispatcher(fake_bot_api.token, api_url=fake_bot_api.url, queue_size=4,
+                               batch_size=3, rate=20)
+        d.bucket.capacity = d.bucket._tokens = 2
+        await d.start()
+        accepted = [d.submit(Notification(i, f"xabar {i}")) for i in range(6)]
+        await d.stop()
+        return d, accepted
+
+    d, accepted = asyncio.run(run())
+    assert accepted == [True] * 4 + [False] * 2  # chegaralangan navbat
+    assert d.sent == 4 and d.failed == 0
+    sent = fake_bot_api.sent
+    assert sorted(m["chat_id"] for m in sent) == [0, 1, 2, 3]
+    # 5 ta so'rov (bittasi 429), bucket 2 + 20/s -> kamida ~0.15s
+    assert sent[-1]["t"] - sent[0]["t"] >= 0.09
+    # bitta session: barcha so'rovlar keep-alive ulanishlar ustida
+    assert len({m["peer"] for m in sent}) <= 3
+
+
+def test_telegram_dispatcher_survives_html_5xx_and_bad_message(fake_bot_api):
+    import asyncio
+    from app.services.notification_service import Notification, TelegramDispatcher
+
+    fake_bot_api.bad_gateway.add(1)
+
+    async def run():
+        d = TelegramDispatcher(fake_bot_api.token, api_url=fake_bot_api.url, rate=100)
+        await d.start()
+        d.submit(Notification(1, "502 dan keyin"))
+        d.submit(Notification(2, object()))  # JSON'ga aylanmaydi - faqat shu xabar failed
+        await asyncio.wait_for(d.queue.join(), 5)
+        d.submit(Notification(3, "keyingi batch"))
+        await d.stop()
+        return d
+
+    d = asyncio.run(run())
+    assert d.sent == 2 and d.failed == 1
+    assert sorted(m["chat_id"] for m in fake_bot_api.sent) == [1, 3]
+
+
+def test_finished_invite_sends_telegram_message(fake_bot_api, client):
+    import time
+    from app.db.database import SessionLocal
+    from app.db.models import Question
+    from app.services import outbox_service
+
+    r = client.post("/api/invites", json={
+        "boy_name": "Ali", "boy_age": 24, "boy_zodiac": "Arslon", "telegram_chat_id": 777,
+    })
+    token = r.json()["token"]
+    with SessionLocal() as db:
+        qids = [q.id for q in db.query(Question).limit(12)]
+    client.post(f"/girl/{token}", data={"girl_name": "Laylo", "girl_age": 22, "girl_zodiac": "Baliq"})
+    client.post(f"/i/{token}", data={f"q_{q}": "A" for q in qids}, follow_redirects=False)
+
+    # testlarda outbox worker o'chiq - qo'lda drain
+    while client.portal.call(outbox_service.drain_once):
+        pass
+    deadline = time.monotonic() + 3
+    while not fake_bot_api.sent and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+    [msg] = fake_bot_api.sent
+    assert msg["chat_id"] == 777
+    assert "Laylo" in msg["text"] and f"/result/{token}" in msg["text"]
+
+
+def test_metrics_endpoint(client, monkeypatch):
+    from app.core import config, metrics
+
+    metrics.reset()
+    token = _start(client)
+    client.get(f"/i/{token}")
+    client.get(f"/i/{token}")
+    client.get("/yoq/sahifa")
+    client.get("/static/style.css")
+
+    text = client.get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="GET",route="/i/{token}"} 2' in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/i/{token}",le="+Inf"} 2' in text
+    assert 'http_requests_total{method="POST",route="/start",status="303"} 1' in text
+    assert 'http_requests_total{method="GET",route="<unmatched>",status="404"} 1' in text
+    assert token not in text and "/static" not in text and 'route="/metrics"' not in text
+    assert "http_requests_in_flight 0" in text
+    assert 'db_pool_checkout_seconds_count{engine="async"}' in text
+    assert 'db_pool_checked_out{engine="async"} 0' in text
+
+    monkeypatch.setattr(config, "METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+
+def test_query_stats_header_and_n_plus_one(client, monkeypatch, caplog):
+    from app.core import config
+    from app.db import crud, query_stats
+    from app.db.database import SessionLocal
+
+    monkeypatch.setattr(config, "DEBUG", True)
+    token = _start(client)
+    r = client.get(f"/share/{token}")
+    assert r.headers["x-db-queries"] == "1"
+    assert r.headers["server-timing"].startswith("db;dur=")
+
+    with query_stats.track() as stats, SessionLocal() as db:
+        for i in range(1, 6):
+            crud.get_invite(db, i)
+    assert stats.count == 5 and len(stats.shapes) == 1
+
+    with caplog.at_level("WARNING", logger="app.db.query_stats"):
+        query_stats.finish(stats, "/test")
+    assert "N+1 /test: 5 marta: SELECT" in caplog.text
+    assert 'db_n_plus_one_total{route="/test"} 1' in client.get("/metrics").text
+
+
+def test_sqlite_production_pragmas_and_routing():
+    from sqlalchemy import text
+    from app.db import crud, database
+
+    assert database.SQLITE_SPLIT
+    with database.read_engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() > 0
+        conn.exec_driver_sql("SELECT 1 FROM invites LIMIT 1").all()
+        assert not conn.connection.dbapi_connection.in_transaction  # reader autocommit, BEGIN yo'q
+    assert database.engine.pool.size() == 1
+
+    with database.SessionLocal() as db:
+        assert db.get_bind(clause=text("SELECT 1")) is database.read_engine
+        inv = crud.create_invite(db, "Ali", 24, "Arslon", token="sqlite-routing")
+        crud.apply_invite_opened(db, inv)
+        crud.upsert_answers(db, inv.id, {1: "A"})
+        # yozuvdan keyin o'qish writer'da - commitsiz javob ko'rinadi
+        assert db.get_bind(clause=text("SELECT 1")) is database.engine
+        assert crud.get_answer_choices(db, inv.id) == {1: "A"}
+        db.commit()
+        assert db.get_bind(clause=text("SELECT 1")) is database.read_engine
+
+
+def test_fork_dispose_and_single_retention_runner(monkeypatch):
+    from app.core import config
+    from app.db import crud, database
+    from app.services import retention_service
+
+    old_pool = database.engine.pool
+    # gunicorn -w 3: byudjet 30 ulanish / 3 worker = 10 = 2 writer + 2 reader engine x 4
+    monkeypatch.setattr(config, "DB_MAX_CONNECTIONS", 30)
+    monkeypatch.setattr(config, "APP_WORKERS", 3)
+    try:
+        database.dispose_after_fork()
+        assert database.engine.pool is not old_pool
+        assert type(database.engine.pool) is type(old_pool)  # metrics (checkout vaqti) saqlanadi
+        assert database.engine.pool.size() == 1
+        for eng in (database.read_engine, database.async_read_engine.sync_engine):
+            assert eng.pool.size() + eng.pool._max_overflow == 4
+        with database.SessionLocal() as db:
+            assert crud.create_invite(db, "Ali", 24, "Arslon", token="after-fork").id
+    finally:
+        monkeypatch.undo()
+        database.dispose_after_fork()
+
+    first = retention_service._acquire_runner_lock()
+    assert first is not None
+    assert retention_service._acquire_runner_lock() is None  # boshqa worker
+    first.close()
+    again = retention_service._acquire_runner_lock()
+    assert again is not None
+    again.close()
+
+
+def test_retention_loop_survives_lock_error(monkeypatch):
+    import asyncio
+    from app.services import retention_service
+    from app.services.retention_service import RetentionStats
+
+    attempts = iter([OSError("read-only fs"), True])
+
+    def acquire():
+        result = next(attempts)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    runs = []
+    monkeypatch.setattr(retention_service, "_acquire_runner_lock", acquire)
+    monkeypatch.setattr(retention_service, "_run_once", lambda: runs.append(1) or RetentionStats())
+
+    async def run():
+        task = asyncio.create_task(retention_service.retention_loop(0.01))
+        while not runs:
+            assert not task.done()
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+
+
+def test_question_bank_cold_cache_concurrent_async():
+    import asyncio
+    from app.db.database import AsyncSessionLocal
+    from app.services import question_bank, quiz_service_async
+
+    async def one():
+        async with AsyncSessionLocal() as db:
+            return await quiz_service_async.get_quiz_questions(db)
+
+    async def main():
+        question_bank.invalidate()
+        return await asyncio.wait_for(asyncio.gather(*(one() for _ in range(20))), 10)
+
+    assert all(len(qs) == 12 for qs in asyncio.run(main()))